@@ -0,0 +1,5 @@
+"""
+Ad-hoc performance benchmarks. Run from the project root, e.g.
+
+    python -m benchmarks.bench_transcription --minutes 30
+"""
@@ -0,0 +1,113 @@
+"""
+Compares transcription backends (see core/asr.py) on the same audio: model
+load time, wall time and real-time factor of a single pass, and how closely
+each backend's words agree with the first one's (1 - word error rate).
+
+    python -m benchmarks.bench_asr --backends whisper:base faster-whisper:base
+    python -m benchmarks.bench_asr --audio fixtures/*.wav --threads 4 --beam-size 1
+
+Without --audio, a synthetic lecture of --minutes is used. It has no speech,
+so it measures speed only; agreement needs recordings of real lectures.
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from .common import make_lecture_audio, print_report, setup_django
+
+_WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+
+
+def words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + insertions + deletions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp))
+            )
+        previous = current
+    return previous[-1]
+
+
+def agreement(reference, hypothesis):
+    """1 - WER of `hypothesis` against `reference` (word lists), floored at 0."""
+    if not reference:
+        return 1.0 if not hypothesis else 0.0
+    return round(max(0.0, 1 - word_errors(reference, hypothesis) / len(reference)), 4)
+
+
+def run_backend(spec, samples, threads, beam_size):
+    """Transcribes `samples` once with a warm model; returns (seconds, load seconds, result)."""
+    from core import model_pool, transcription
+
+    backend, _, model = spec.partition(":")
+    options = transcription.options_for(
+        backend=backend, model=model or None, threads=threads, beam_size=beam_size
+    )
+    pool = model_pool.get_pool(options.model, options.backend, options.threads)
+    pool.warm_up()
+    start = time.perf_counter()
+    result = transcription.transcribe_single(samples, options)
+    return time.perf_counter() - start, pool.stats.load_seconds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["whisper:base", "faster-whisper:base"],
+        help="backend:model pairs; the first is the reference for agreement",
+    )
+    parser.add_argument("--audio", nargs="*", default=[], help="Fixture recordings")
+    parser.add_argument("--minutes", type=float, default=2, help="synthetic audio length")
+    parser.add_argument("--threads", type=int, default=0, help="0 = each backend's default")
+    parser.add_argument("--beam-size", type=int, default=0, help="0 = each backend's default")
+    args = parser.parse_args()
+
+    setup_django()
+    from core import transcription
+
+    report = {"threads": args.threads, "beam_size": args.beam_size, "files": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.audio or [
+            make_lecture_audio(os.path.join(tmp, "synthetic.mp3"), args.minutes * 60)
+        ]
+        for path in paths:
+            samples = transcription.load_audio(path)
+            audio_seconds = len(samples) / transcription.SAMPLE_RATE
+            reference = None
+            results = {}
+            for spec in args.backends:
+                seconds, load_seconds, result = run_backend(
+                    spec, samples, args.threads, args.beam_size
+                )
+                hypothesis = words(result["text"])
+                if reference is None:
+                    reference = hypothesis
+                results[spec] = {
+                    "load_seconds": round(load_seconds, 2),
+                    "wall_seconds": round(seconds, 2),
+                    "real_time_factor": round(seconds / audio_seconds, 4),
+                    "segments": len(result["segments"]),
+                    "words": len(hypothesis),
+                    "agreement": agreement(reference, hypothesis),
+                }
+            report["files"][os.path.basename(path)] = {
+                "audio_seconds": round(audio_seconds, 1),
+                "backends": results,
+            }
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Time and peak Python memory of generate_lecture_pdf for long transcripts.
+
+    python -m benchmarks.bench_pdf --sizes 10000 100000 1000000
+    python -m benchmarks.bench_pdf --legacy   # also time the old single-Paragraph layout
+"""
+
+import argparse
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from .common import print_report, setup_django
+
+SENTENCE = "Today we look at how gradient descent updates the weights of a network. "
+
+
+def make_lecture(chars, with_segments=True):
+    """A stand-in Lecture with `chars` of transcript, in ~5 second segments."""
+    segments = []
+    text = ""
+    t = 0.0
+    while len(text) < chars:
+        segments.append({"start": t, "end": t + 5.0, "text": SENTENCE})
+        text += SENTENCE
+        t += 5.0
+    if not with_segments:
+        segments = []
+    return SimpleNamespace(
+        title="Benchmark Lecture",
+        summary="<b>Core Subject:</b> Benchmarks.",
+        transcript=text,
+        segment_count=len(segments),
+        iter_segments=lambda: iter(segments),
+        original_size_mb=200.0,
+        data_saved_percentage=95.0,
+    )
+
+
+def legacy_pdf(lecture):
+    """The previous layout: the whole transcript in one Paragraph."""
+    from io import BytesIO
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    from core.pdf_generator import BODY_STYLE
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build([Paragraph(lecture.transcript.replace("\n", "<br/>"), BODY_STYLE)])
+    return buffer
+
+
+def measure(fn, lecture):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        buffer = fn(lecture)
+        error = None
+    except Exception as e:  # the legacy layout can fail on very long input
+        buffer, error = None, repr(e)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_mb": round(peak / (1024 * 1024), 1),
+        "pdf_kb": round(buffer.getbuffer().nbytes / 1024, 1) if buffer else None,
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from core.pdf_generator import generate_lecture_pdf
+
+    results = []
+    for chars in args.sizes:
+        row = {
+            "chars": chars,
+            "segmented": measure(generate_lecture_pdf, make_lecture(chars)),
+            "plain_text": measure(generate_lecture_pdf, make_lecture(chars, False)),
+        }
+        if args.legacy:
+            row["legacy"] = measure(legacy_pdf, make_lecture(chars, False))
+        results.append(row)
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+End-to-end benchmark of ContentProcessor.process_lecture on synthetic lectures
+of fixed lengths, with the chosen Whisper model and the offline Gemini stub.
+
+Reports, per lecture length: wall time and real-time factor of the whole run,
+and for each stage (encode, transcribe, summarize) wall and CPU seconds, peak
+RSS, bytes in/out and throughput in audio seconds per second; plus the size of
+every rendition. Results are compared with a stored baseline, and any metric
+more than --tolerance worse is listed under "regressions" (exit status 1).
+
+    python -m benchmarks.bench_pipeline --minutes 1 5 --model tiny
+    python -m benchmarks.bench_pipeline --minutes 1 5 --model tiny --save-baseline
+    python -m benchmarks.bench_pipeline --minutes 1 5 --backend faster-whisper
+    python -m benchmarks.bench_pipeline --video --output report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import make_lecture_audio, make_lecture_video, print_report, setup_django
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+
+# Changes smaller than these are noise, whatever the percentage.
+NOISE_FLOOR = {"seconds": 0.05, "mb": 5.0, "bytes": 1024, "rtf": 0.005}
+
+
+def environment(model, backend):
+    ffmpeg = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+    return {
+        "model": model,
+        "backend": backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": ffmpeg.stdout.split("\n", 1)[0],
+    }
+
+
+def run_once(processor, source, output_dir):
+    """One process_lecture run; returns (wall seconds, stage samples, result)."""
+    from core import metrics
+
+    with metrics.recording() as recorder:
+        start = time.perf_counter()
+        result = processor.process_lecture(source, output_dir)
+        wall = time.perf_counter() - start
+    return wall, recorder.samples, result
+
+
+def summarize_case(audio_seconds, runs):
+    """Medians over the runs of one lecture length."""
+    walls = [wall for wall, _, _ in runs]
+    stages = {}
+    for name in dict.fromkeys(s.stage for _, samples, _ in runs for s in samples):
+        picked = [s for _, samples, _ in runs for s in samples if s.stage == name]
+        wall = statistics.median(s.wall_seconds for s in picked)
+        stages[name] = {
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(statistics.median(s.cpu_seconds for s in picked), 3),
+            "peak_rss_mb": max(s.peak_rss_mb for s in picked),
+            "bytes_in": picked[-1].bytes_in,
+            "bytes_out": picked[-1].bytes_out,
+            "audio_seconds_per_second": round(audio_seconds / wall, 1) if wall else None,
+        }
+    wall = statistics.median(walls)
+    result = runs[-1][2]
+    return {
+        "audio_seconds": audio_seconds,
+        "runs": len(runs),
+        "wall_seconds": round(wall, 3),
+        "real_time_factor": round(wall / audio_seconds, 4),
+        "peak_rss_mb": max(stage["peak_rss_mb"] for stage in stages.values()),
+        "segments": len(result["segments"]),
+        "stages": stages,
+        "outputs": {
+            rendition["name"]: os.path.getsize(rendition["path"])
+            for rendition in result["renditions"]
+        },
+    }
+
+
+def _metrics(case):
+    """(name, kind, value) for every compared metric of a case; lower is better."""
+    yield "wall_seconds", "seconds", case["wall_seconds"]
+    yield "real_time_factor", "rtf", case["real_time_factor"]
+    yield "peak_rss_mb", "mb", case["peak_rss_mb"]
+    for name, stage in case["stages"].items():
+        yield f"stages.{name}.wall_seconds", "seconds", stage["wall_seconds"]
+        yield f"stages.{name}.cpu_seconds", "seconds", stage["cpu_seconds"]
+        yield f"stages.{name}.peak_rss_mb", "mb", stage["peak_rss_mb"]
+    for name, size in case["outputs"].items():
+        yield f"outputs.{name}", "bytes", size
+
+
+def compare(cases, baseline, tolerance):
+    """Metrics more than `tolerance` (a fraction) worse than the baseline."""
+    regressions = []
+    for key, case in cases.items():
+        before = baseline.get("cases", {}).get(key)
+        if before is None:
+            continue
+        old = {name: value for name, _, value in _metrics(before)}
+        for name, kind, value in _metrics(case):
+            if name not in old:
+                continue
+            limit = old[name] * (1 + tolerance)
+            if value > limit and value - old[name] > NOISE_FLOOR[kind]:
+                regressions.append(
+                    {
+                        "case": key,
+                        "metric": name,
+                        "baseline": old[name],
+                        "current": value,
+                        "change": f"{(value / old[name] - 1):+.0%}" if old[name] else "from 0",
+                    }
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--model", default="tiny", help="Whisper model, e.g. tiny or base")
+    parser.add_argument("--backend", default="whisper", help="e.g. whisper or faster-whisper")
+    parser.add_argument("--runs", type=int, default=3, help="per lecture length")
+    parser.add_argument("--video", action="store_true", help="Use MP4 sources, not MP3")
+    parser.add_argument("--trim-silence", action="store_true")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="e.g. 0.25 = 25%% worse")
+    parser.add_argument("--output", help="Also write the JSON report here.")
+    args = parser.parse_args()
+
+    # Gemini is replaced by the stub below; media_processor only checks a key exists.
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    setup_django()
+    from django.conf import settings
+
+    settings.LITELEARN_LLM_BACKEND = "stub"
+    settings.LITELEARN_LLM_CACHE = False
+    settings.LITELEARN_WHISPER_MODEL = args.model
+    settings.LITELEARN_TRANSCRIPTION_BACKEND = args.backend
+    settings.LITELEARN_TRIM_SILENCE = args.trim_silence
+
+    from core import model_pool
+    from core.media_processor import ContentProcessor
+
+    processor = ContentProcessor(args.model)
+    # Load the model before timing so every run starts warm.
+    model_pool.warm_up([args.model])
+
+    cases = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # One untimed run first, so first-call costs (imports, caches) are not measured.
+        warm_up = make_lecture_audio(os.path.join(tmp, "warm_up.mp3"), 10)
+        run_once(processor, warm_up, tempfile.mkdtemp(dir=tmp))
+
+        for minutes in args.minutes:
+            seconds = minutes * 60
+            if args.video:
+                source = make_lecture_video(os.path.join(tmp, f"{minutes}.mp4"), seconds)
+            else:
+                source = make_lecture_audio(os.path.join(tmp, f"{minutes}.mp3"), seconds)
+            runs = []
+            for _ in range(args.runs):
+                output_dir = tempfile.mkdtemp(dir=tmp)
+                runs.append(run_once(processor, source, output_dir))
+            key = f"{'video' if args.video else 'audio'}/{minutes:g}min"
+            cases[key] = summarize_case(seconds, runs)
+
+    report = {"environment": environment(args.model, args.backend), "cases": cases}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != report["environment"]:
+            print("Note: the baseline was recorded in a different environment.")
+        report["regressions"] = compare(cases, baseline, args.tolerance)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        report["regressions"] = []
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": report["environment"], "cases": cases}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif report["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Query latency of the full-text search index with many lectures.
+
+Fills a throwaway test database with synthetic lectures (Zipf-distributed
+words, ~5 second segments), indexes them with the configured backend and times
+a mix of common, rare, multi-word and prefix queries.
+
+    python -m benchmarks.bench_search --lectures 100000
+    python -m benchmarks.bench_search --lectures 2000 --backend core.search.SimpleBackend
+"""
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from .common import print_report, setup_django
+
+VOCABULARY_SIZE = 20_000
+# Rank in the Zipf distribution -> how often a query word occurs.
+QUERIES = {
+    "common": ["w3"],
+    "mid": ["w400"],
+    "rare": ["w15000"],
+    "two_words": ["w40", "w900"],
+    "prefix": ["w12*"],  # matches w12, w120..w129, w1200...
+}
+
+
+# Zipf-like: word rank r is drawn with probability ~ 1/r.
+_CUM_WEIGHTS = list(itertools.accumulate(1 / r for r in range(1, VOCABULARY_SIZE + 1)))
+
+
+def make_words(rng, count):
+    ranks = rng.choices(range(1, VOCABULARY_SIZE + 1), cum_weights=_CUM_WEIGHTS, k=count)
+    return [f"w{rank}" for rank in ranks]
+
+
+def make_lecture(rng, segments, words_per_segment=12):
+    """An unsaved Lecture and its segments."""
+    from core.models import Lecture
+
+    parts = [
+        {
+            "start": i * 5.0,
+            "end": i * 5.0 + 5.0,
+            "text": " " + " ".join(make_words(rng, words_per_segment)),
+        }
+        for i in range(segments)
+    ]
+    lecture = Lecture(
+        title=" ".join(make_words(rng, 4)),
+        summary="<b>Core Subject:</b> " + " ".join(make_words(rng, 40)),
+        transcript="".join(part["text"] for part in parts),
+    )
+    return lecture, parts
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lectures", type=int, default=100_000)
+    parser.add_argument("--segments", type=int, default=20, help="per lecture")
+    parser.add_argument("--runs", type=int, default=50, help="per query")
+    parser.add_argument("--backend", help="Dotted path (default: the configured one).")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection, transaction
+
+    from core import search
+    from core.models import Lecture
+
+    if args.backend:
+        settings.LITELEARN_SEARCH_BACKEND = args.backend
+    # An on-disk database like production (the in-memory test database uses
+    # SQLite's shared cache, which is noticeably slower for FTS5).
+    tmp_dir = tempfile.mkdtemp()
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp_dir, "search.sqlite3")
+    settings.MEDIA_ROOT = tmp_dir  # segment files
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        rng = random.Random(0)
+        backend = search.get_backend()
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            for i in range(0, args.lectures, 1000):
+                made = [
+                    make_lecture(rng, args.segments)
+                    for _ in range(min(1000, args.lectures - i))
+                ]
+                batch = Lecture.objects.bulk_create(lecture for lecture, _ in made)
+                for lecture, (_, segments) in zip(batch, made):
+                    lecture.replace_segments(segments)
+                    backend.index_lecture(lecture)
+                Lecture.objects.bulk_update(batch, ["segments_file", "segment_count"])
+        index_seconds = time.perf_counter() - start
+
+        queries = {}
+        for name, words in QUERIES.items():
+            text = " ".join(words)
+            timings = []
+            for _ in range(args.runs):
+                hits, ms = search.search(text)
+                timings.append(ms)
+            queries[name] = {
+                "query": text,
+                "hits": len(hits),
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(percentile(timings, 0.95), 2),
+            }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print_report(
+        {
+            "backend": settings.LITELEARN_SEARCH_BACKEND,
+            "lectures": args.lectures,
+            "segments_per_lecture": args.segments,
+            "index_seconds": round(index_seconds, 1),
+            "queries": queries,
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Start-up cost of the three kinds of process: `manage.py check`, a web process
+(Django set up, URLconf and WSGI app loaded) and a job worker after
+jobs.preload(). Each is measured in a fresh interpreter, several times.
+
+Reports the median import/set-up seconds, peak RSS, and which heavy modules
+each one ended up importing (web processes should import none).
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from .common import print_report
+
+HEAVY_MODULES = [
+    "torch",
+    "whisper",
+    "google.generativeai",
+    "yt_dlp",
+    "reportlab",
+    "markdown",
+]
+
+PROCESSES = {
+    "check": "from django.core.management import call_command; call_command('check')",
+    "web": "import config.urls, config.wsgi",
+    "worker": "from core import jobs; jobs.preload()",
+}
+
+# Runs in the child: time the set-up, then report peak RSS and loaded modules.
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+import django
+django.setup()
+{body}
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print("BENCH" + json.dumps({{"seconds": seconds, "peak_rss_mb": peak_kb / 1024, "heavy": heavy}}))
+"""
+
+
+def measure(body, root):
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(body=body, heavy=HEAVY_MODULES)],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"{body!r} failed:\n{proc.stderr}")
+    line = next(line for line in proc.stdout.splitlines() if line.startswith("BENCH"))
+    return json.loads(line[len("BENCH"):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", choices=list(PROCESSES), nargs="+")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {}
+    for name in args.only or PROCESSES:
+        runs = [measure(PROCESSES[name], root) for _ in range(args.runs)]
+        report[name] = {
+            "seconds": round(statistics.median(r["seconds"] for r in runs), 3),
+            "peak_rss_mb": round(statistics.median(r["peak_rss_mb"] for r in runs), 1),
+            "heavy_modules": runs[-1]["heavy"],
+        }
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Wall-clock comparison of single-pass vs. segmented (parallel) transcription
+on a synthetic long lecture.
+
+    python -m benchmarks.bench_transcription --minutes 30 --model tiny
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from .common import make_lecture_audio, print_report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--chunk-seconds", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    setup_django()
+    from core import model_pool, transcription
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_lecture_audio(os.path.join(tmp, "lecture.mp3"), args.minutes * 60)
+        samples = transcription.load_audio(path)
+
+        # Load the model before timing so both paths start warm.
+        model_pool.warm_up([args.model])
+        options = transcription.options_for(model=args.model)
+
+        start = time.perf_counter()
+        single = transcription.transcribe_single(samples, options)
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunked = transcription.transcribe_chunked(
+            samples, options, chunk_seconds=args.chunk_seconds, workers=args.workers
+        )
+        chunked_seconds = time.perf_counter() - start
+
+    audio_seconds = len(samples) / transcription.SAMPLE_RATE
+    print_report(
+        {
+            "audio_seconds": audio_seconds,
+            "model": args.model,
+            "chunk_seconds": args.chunk_seconds,
+            "workers": args.workers,
+            "chunks": len(transcription.split_audio(samples, args.chunk_seconds)),
+            "single_pass": {
+                "wall_seconds": round(single_seconds, 2),
+                "real_time_factor": round(single_seconds / audio_seconds, 4),
+                "segments": len(single["segments"]),
+            },
+            "chunked": {
+                "wall_seconds": round(chunked_seconds, 2),
+                "real_time_factor": round(chunked_seconds / audio_seconds, 4),
+                "segments": len(chunked["segments"]),
+            },
+            "speedup": round(single_seconds / chunked_seconds, 2),
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
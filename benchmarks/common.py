@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+import django
+
+# 8 s of a voiced tone, then 2 s of silence, repeated (an ffmpeg aevalsrc expression)
+VOICED_TONE = "0.4*sin(2*PI*180*t)*sin(2*PI*3*t)*lt(mod(t\\,10)\\,8)"
+
+
+def setup_django():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+def make_lecture_audio(path, seconds, sample_rate=22050):
+    """
+    Writes a synthetic "lecture" with ffmpeg's lavfi sources: 8 s of a voiced
+    tone followed by 2 s of silence, repeated, encoded like process_lecture does.
+    """
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"aevalsrc={VOICED_TONE}:s={sample_rate}:d={seconds}",
+            "-ac", "1", "-ab", "32k", "-ar", str(sample_rate), "-y", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def make_lecture_video(path, seconds, size="640x360", rate=10):
+    """
+    Like make_lecture_audio, with a moving test pattern as the picture: what an
+    uploaded screen recording looks like to the pipeline (a video container it
+    has to demux and drop).
+    """
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={seconds}",
+            "-f", "lavfi", "-i", f"aevalsrc={VOICED_TONE}:s=22050:d={seconds}",
+            "-ac", "1", "-ab", "64k", "-shortest", "-y", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def print_report(report):
+    print(json.dumps(report, indent=2))
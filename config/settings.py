@@ -77,6 +77,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Web requests and job workers share this file; wait for locks instead of failing.
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -117,4 +122,168 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads are streamed to disk in fixed-size chunks (see core/upload_handlers.py).
+# The temp dir sits on the same filesystem as MEDIA_ROOT, so saving is a rename.
+FILE_UPLOAD_HANDLERS = ['core.upload_handlers.HashingFileUploadHandler']
+FILE_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'incoming'
+LITELEARN_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Logging: the worker, pipeline and downloads report progress on the core.* loggers.
+# Set the level to DEBUG for per-stage timings and cache stats after every job.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {'plain': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'}},
+    'handlers': {'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'}},
+    'loggers': {'core': {'handlers': ['console'], 'level': 'INFO'}},
+}
+
+# Background processing (see core/jobs.py and `manage.py runworker`)
+# The job table in the default database acts as the queue, so no broker is needed.
+LITELEARN_JOB_CONCURRENCY = 2  # worker processes, i.e. max jobs running at once
+LITELEARN_JOB_MAX_ATTEMPTS = 3
+LITELEARN_JOB_RETRY_BACKOFF = 30  # seconds before the first retry, doubled each time
+LITELEARN_JOB_RETRY_BACKOFF_MAX = 15 * 60
+LITELEARN_JOB_POLL_INTERVAL = 2  # seconds
+LITELEARN_JOB_HEARTBEAT_SECONDS = 30  # how often a running job checks in
+# A running job silent for this long lost its worker; `resume_stalled` (and
+# runworker on start) queue it again, to resume after its last completed stage
+LITELEARN_JOB_STALL_SECONDS = 5 * 60
+# Imported by `runworker` before it forks its workers (see jobs.preload). Web
+# processes never import these: each stage loads what it needs on first use.
+LITELEARN_WORKER_PRELOAD = [
+    "core.pipeline",
+    "core.pdf_generator",  # ReportLab
+    "whisper",  # and torch
+    "google.generativeai",
+    "yt_dlp",
+    "markdown",
+]
+
+# Whisper model pool (see core/model_pool.py)
+LITELEARN_WHISPER_MODEL = "base"
+LITELEARN_WHISPER_POOL_SIZE = 1  # loaded copies per worker process
+LITELEARN_WHISPER_WARMUP = False  # load the model when a worker starts
+
+# Segmented transcription for long lectures (see core/transcription.py)
+LITELEARN_CHUNKED_TRANSCRIPTION = True  # used when audio is longer than two chunks
+LITELEARN_TRANSCRIBE_CHUNK_SECONDS = 300
+LITELEARN_TRANSCRIBE_WORKERS = None  # None = one process per CPU core
+LITELEARN_TRANSCRIBE_STREAM_SECONDS = 30  # window size when streaming short lectures
+LITELEARN_TRANSCRIPT_POLL_INTERVAL = 5  # seconds between a lecture page's transcript polls
+
+# Transcription backends (see core/asr.py); any core.asr.TranscriptionBackend subclass
+LITELEARN_TRANSCRIPTION_BACKENDS = {
+    "whisper": "core.asr.WhisperBackend",  # openai-whisper on PyTorch, float32
+    "faster-whisper": "core.asr.FasterWhisperBackend",  # CTranslate2; needs faster-whisper
+}
+LITELEARN_TRANSCRIPTION_BACKEND = "whisper"
+LITELEARN_FASTER_WHISPER_COMPUTE_TYPE = "int8"  # or "int8_float32", "float32"
+LITELEARN_TRANSCRIBE_THREADS = 0  # CPU threads per model; 0 = the backend's default
+LITELEARN_TRANSCRIBE_BEAM_SIZE = 0  # 0 = the backend's default (whisper: greedy, faster-whisper: 5)
+# Options by lecture length: the first rule whose max_minutes covers the lecture
+# wins (no max_minutes = any length); per-job overrides (ProcessingJob.transcription)
+# go on top. E.g. [{"max_minutes": 20, "model": "small"},
+#                  {"backend": "faster-whisper", "model": "base", "beam_size": 1}]
+LITELEARN_TRANSCRIPTION_BY_DURATION = []
+
+# Dedup cache for repeated uploads / YouTube links (see core/dedup.py)
+# Counts only files no lecture uses any more (those of deleted lectures)
+LITELEARN_DEDUP_CACHE_MAX_MB = 5 * 1024
+
+# Bulk ingestion (`manage.py ingest` and /api/ingest/, see core/ingest.py)
+LITELEARN_INGEST_IO_WORKERS = 4  # downloads, ffmpeg and Gemini calls
+LITELEARN_INGEST_CPU_WORKERS = 2  # Whisper processes
+# /api/ingest/ requires "Authorization: Bearer <token>"; empty = the API is off
+LITELEARN_INGEST_TOKEN = ""
+
+# Study-guide generation (see core/summarizer.py)
+LITELEARN_LLM_BACKEND = "gemini"  # or "stub" to run offline without an API key
+LITELEARN_LLM_MODEL = "gemini-2.5-flash"
+LITELEARN_SUMMARY_TOKEN_BUDGET = 30_000  # max tokens per request before map-reduce kicks in
+LITELEARN_SUMMARY_MAX_WORKERS = 4  # concurrent chunk requests
+
+# LLM response cache (see core/llm_cache.py)
+LITELEARN_LLM_CACHE = True
+LITELEARN_LLM_CACHE_DIR = BASE_DIR / 'cache' / 'llm'
+LITELEARN_LLM_CACHE_TTL = 30 * 24 * 3600  # seconds; 0 = never expire
+LITELEARN_LLM_CACHE_MAX_MB = 200
+
+# Audio renditions produced for every lecture, from one ffmpeg decode (see core/renditions.py).
+# bitrate is in kbps; options are extra ffmpeg output flags.
+LITELEARN_AUDIO_RENDITIONS = [
+    {
+        "name": "opus-12k",
+        "codec": "libopus",
+        "bitrate": 12,
+        "sample_rate": 16000,
+        "ext": "ogg",
+        "mime_type": "audio/ogg",
+        "options": ["-application", "voip"],
+    },
+    {
+        "name": "opus-24k",
+        "codec": "libopus",
+        "bitrate": 24,
+        "sample_rate": 24000,
+        "ext": "ogg",
+        "mime_type": "audio/ogg",
+        "options": ["-application", "voip"],
+    },
+    {
+        "name": "mp3-32k",
+        "codec": "libmp3lame",
+        "bitrate": 32,
+        "sample_rate": 22050,
+        "ext": "mp3",
+        "mime_type": "audio/mpeg",
+    },
+]
+# Stored as Lecture.processed_audio and served when the client sends no hints (plays everywhere)
+LITELEARN_DEFAULT_RENDITION = "mp3-32k"
+# Share of the client's reported bandwidth a rendition's bitrate may use
+LITELEARN_AUDIO_BANDWIDTH_SHARE = 0.5
+
+# Audio delivery (see core/audio_streaming.py)
+LITELEARN_AUDIO_CACHE_MAX_AGE = 365 * 24 * 3600  # for versioned audio URLs, which never change
+LITELEARN_AUDIO_SEGMENTS = True  # also cut each rendition into segments + an HLS playlist
+LITELEARN_AUDIO_SEGMENT_SECONDS = 10
+
+# Dead-air trimming before encoding (see core/silence.py)
+LITELEARN_TRIM_SILENCE = False  # costs a second ffmpeg decode of the source
+LITELEARN_SILENCE_MIN_SECONDS = 1.0  # only pauses at least this long are shortened
+LITELEARN_SILENCE_KEEP_SECONDS = 0.3  # what is left of each shortened pause
+LITELEARN_SILENCE_THRESHOLD_DB = None  # dBFS; None = 30 dB below the loud end of the lecture
+
+# Full-text search (see core/search.py); any core.search.SearchBackend subclass
+LITELEARN_SEARCH_BACKEND = "core.search.SQLiteFTSBackend"  # or "core.search.SimpleBackend"
+LITELEARN_SEARCH_PAGE_SIZE = 20
+# Queries matching more lectures than this rank only the newest ones (keeps them fast)
+LITELEARN_SEARCH_MAX_CANDIDATES = 5_000
+
+# Pipeline stage metrics and profiling (see core/metrics.py)
+LITELEARN_METRICS_WINDOW_HOURS = 24  # p50/p95 at /metrics and in the admin cover this window
+LITELEARN_METRICS_TOKEN = ""  # if set, /metrics requires "Authorization: Bearer <token>"
+LITELEARN_PROFILER = "cprofile"  # or "pyinstrument" (if installed), for jobs flagged to be profiled
+LITELEARN_PROFILE_DIR = BASE_DIR / "profiles"
+
+# YouTube ingestion (see core/youtube.py)
+LITELEARN_YOUTUBE_MAX_DURATION = 4 * 3600  # seconds; longer videos are rejected before downloading (0 = no limit)
+LITELEARN_YOUTUBE_MIN_AUDIO_KBPS = 48  # smallest audio stream worth encoding from (renditions top out at 32k)
+LITELEARN_YOUTUBE_CONCURRENT_DOWNLOADS = 3  # per bulk ingest
+LITELEARN_YOUTUBE_DOWNLOAD_RETRIES = 3  # each resumes where the last stopped
+
+# Lecture listing and its JSON API (see core/catalog.py)
+LITELEARN_LIST_PAGE_SIZE = 24
+LITELEARN_LIST_MAX_PAGE_SIZE = 100  # largest ?size= the API accepts
+LITELEARN_LIST_CACHE_SECONDS = 300  # cached pages and cards; saves and deletes invalidate them sooner
+
+# On disk so the web processes and workers see the same entries (and invalidations)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "django",
+    }
+}
@@ -23,6 +23,34 @@ from core import views
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("upload/", views.upload_lecture, name="upload_lecture"),
+    path("search/", views.search_lectures, name="search"),
+    path("lectures/", views.lecture_list, name="lecture_list"),
+    path("api/lectures/", views.lectures_api, name="lectures_api"),
     path("lecture/<int:pk>/", views.lecture_detail, name="lecture_detail"),
     path("lecture/<int:pk>/pdf/", views.download_pdf, name="download_pdf"),
+    path("lecture/<int:pk>/bundle/", views.download_bundle, name="download_bundle"),
+    path(
+        "lecture/<int:pk>/captions.<str:fmt>",
+        views.download_captions,
+        name="download_captions",
+    ),
+    path("lecture/<int:pk>/audio/", views.lecture_audio, name="lecture_audio"),
+    path(
+        "lecture/<int:pk>/audio/<slug:name>/",
+        views.stream_audio,
+        name="stream_audio",
+    ),
+    path(
+        "lecture/<int:pk>/audio/<slug:name>/hls/<str:filename>",
+        views.audio_segment,
+        name="audio_segment",
+    ),
+    path(
+        "lecture/<int:pk>/transcript/",
+        views.transcript_updates,
+        name="transcript_updates",
+    ),
+    path("jobs/<int:pk>/", views.job_status, name="job_status"),
+    path("api/ingest/", views.ingest_api, name="ingest_api"),
+    path("metrics", views.metrics_endpoint, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,3 +1,89 @@
+from django.conf import settings
 from django.contrib import admin
+from django.utils import timezone
+from django.utils.html import format_html_join
 
-# Register your models here.
+from . import metrics
+from .models import AudioRendition, Lecture, MediaCacheEntry, ProcessingJob, StageMetric
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "lecture",
+        "playlist_url",
+        "status",
+        "stage",
+        "progress",
+        "attempts",
+        "created_at",
+    ]
+    list_filter = ["status"]
+    readonly_fields = ["started_at", "finished_at", "heartbeat_at", "worker", "profiles"]
+    actions = ["rerun_with_profiling"]
+
+    @admin.display(description="Profiles")
+    def profiles(self, job):
+        paths = metrics.profile_files(job)
+        if not paths:
+            return "-"
+        return format_html_join("\n", "<div>{}</div>", ((path,) for path in paths))
+
+    @admin.action(description="Re-run with profiling")
+    def rerun_with_profiling(self, request, queryset):
+        from .pipeline import restart
+
+        queryset = queryset.exclude(status=ProcessingJob.RUNNING)
+        restart(Lecture.objects.filter(jobs__in=queryset))
+        # reprocess: the lecture's own earlier result is in the dedup cache, and a
+        # cache hit would leave nothing to profile.
+        count = queryset.update(
+            status=ProcessingJob.QUEUED,
+            run_after=timezone.now(),
+            attempts=0,
+            profile=True,
+            reprocess=True,
+        )
+        self.message_user(
+            request, f"{count} job(s) queued; profiles are written to the profile directory."
+        )
+
+
+@admin.register(StageMetric)
+class StageMetricAdmin(admin.ModelAdmin):
+    list_display = [
+        "stage",
+        "lecture",
+        "wall_seconds",
+        "cpu_seconds",
+        "peak_rss_mb",
+        "bytes_in",
+        "bytes_out",
+        "ok",
+        "created_at",
+    ]
+    list_filter = ["stage", "ok"]
+    list_select_related = ["lecture"]
+    date_hierarchy = "created_at"
+
+    def changelist_view(self, request, extra_context=None):
+        # p50/p95 per stage above the list (template: admin/core/stagemetric/change_list.html)
+        extra_context = {
+            **(extra_context or {}),
+            "stage_summary": metrics.stage_summary(),
+            "window_hours": settings.LITELEARN_METRICS_WINDOW_HOURS,
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(MediaCacheEntry)
+class MediaCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ["source_key", "title", "hits", "size_bytes", "last_used_at"]
+    search_fields = ["source_key", "title"]
+
+
+@admin.register(AudioRendition)
+class AudioRenditionAdmin(admin.ModelAdmin):
+    list_display = ["lecture", "name", "bitrate_kbps", "size_mb"]
+    list_filter = ["name"]
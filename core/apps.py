@@ -1,5 +1,14 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Uploads are streamed here (FILE_UPLOAD_TEMP_DIR). Git does not keep
+        # empty directories, and Django's checks fail if it is missing.
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
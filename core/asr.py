@@ -0,0 +1,108 @@
+"""
+Speech-recognition backends: the engines that turn 16 kHz audio into Whisper
+segments.
+
+LITELEARN_TRANSCRIPTION_BACKENDS maps a backend name to a dotted path of a
+TranscriptionBackend subclass. Two ship with LiteLearn:
+
+- "whisper": openai-whisper on PyTorch, in float32 (no fp16 on CPU).
+- "faster-whisper": the same Whisper models converted to CTranslate2 and run
+  with int8 weights (LITELEARN_FASTER_WHISPER_COMPUTE_TYPE). On CPU-only boxes
+  this is several times faster and needs much less memory, for near-identical
+  transcripts. Needs `pip install faster-whisper`; the models download on
+  first use.
+
+Other engines (whisper.cpp bindings, a remote service) plug in the same way.
+Which backend, model size, thread count and beam size a lecture gets is
+decided in core/transcription.py (TranscriptionOptions).
+"""
+
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class TranscriptionBackend:
+    """Interface for transcription backends; see WhisperBackend."""
+
+    def load(self, model_name, threads=0):
+        """Loads model `model_name` ("tiny", "base", ...) using `threads` CPU threads (0 = default)."""
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, beam_size=0):
+        """
+        Transcribes 16 kHz float32 mono samples with a loaded model. Returns
+        {"text", "segments"}, each segment a dict with at least start, end,
+        text and avg_logprob. beam_size 0 means the backend's default.
+        """
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper (PyTorch). Greedy decoding unless a beam size is given."""
+
+    def load(self, model_name, threads=0):
+        import whisper
+
+        if threads:
+            import torch
+
+            # Process-wide; jobs that share a process should agree on it.
+            torch.set_num_threads(threads)
+        return whisper.load_model(model_name)
+
+    def transcribe(self, model, audio, beam_size=0):
+        options = {"beam_size": beam_size} if beam_size else {}
+        # fp16=False prevents warnings on CPU
+        result = model.transcribe(audio, fp16=False, **options)
+        return {"text": result["text"], "segments": result["segments"]}
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """faster-whisper (CTranslate2), quantized for CPU. Beam size 5 by default."""
+
+    default_beam_size = 5
+
+    def load(self, model_name, threads=0):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=settings.LITELEARN_FASTER_WHISPER_COMPUTE_TYPE,
+            cpu_threads=threads,
+        )
+
+    def transcribe(self, model, audio, beam_size=0):
+        # Segments are decoded lazily, as the generator is consumed.
+        pieces, _ = model.transcribe(audio, beam_size=beam_size or self.default_beam_size)
+        segments = [
+            {
+                "id": i,
+                "start": piece.start,
+                "end": piece.end,
+                "text": piece.text,
+                "avg_logprob": piece.avg_logprob,
+            }
+            for i, piece in enumerate(pieces)
+        ]
+        return {"text": "".join(s["text"] for s in segments), "segments": segments}
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """The backend registered as `name` (default LITELEARN_TRANSCRIPTION_BACKEND), created once per process."""
+    name = name or settings.LITELEARN_TRANSCRIPTION_BACKEND
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            try:
+                path = settings.LITELEARN_TRANSCRIPTION_BACKENDS[name]
+            except KeyError:
+                raise ValueError(f"Unknown transcription backend: {name!r}") from None
+            backend = _backends[name] = import_string(path)()
+    return backend
@@ -0,0 +1,246 @@
+"""
+Serving lecture audio to flaky connections.
+
+Files are served with byte-range support, so an interrupted download resumes
+where it stopped and seeking fetches only the bytes needed. They also get a
+strong ETag, and long-lived cache headers when the URL carries the file's
+version. Optionally, each rendition is also cut into fixed-duration segments
+plus an HLS playlist. This is a stream copy, with no re-encoding. Only MPEG
+audio is segmented: HLS players cannot play Ogg/Opus segments.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+PLAYLIST_NAME = "index.m3u8"
+SEGMENT_NAME_RE = re.compile(r"^seg_\d{5}\.\w+$")
+PLAYLIST_MIME_TYPE = "application/vnd.apple.mpegurl"
+# Renditions HLS players can play segment by segment
+SEGMENTED_MIME_TYPES = {"audio/mpeg"}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) byte offsets, both inclusive, for a single
+    `bytes=` range. Returns None when the whole file should be sent: no header,
+    a malformed header, or several ranges (which we answer with a plain 200).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def file_version(path):
+    """A strong validator for a file that is replaced, never edited in place."""
+    st = os.stat(path)
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def patch_versioned_cache_control(request, response, version):
+    """Long-lived caching when the URL's `?v=` matches `version`, else revalidate."""
+    if request.GET.get("v") == version:
+        # Versioned URL: its content never changes.
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.LITELEARN_AUDIO_CACHE_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        # Stable URL: keep it, but revalidate with the ETag first.
+        patch_cache_control(response, public=True, no_cache=True)
+
+
+def ranged_file_response(request, path, content_type, version=None):
+    """
+    Serves `path` with Range/If-Range support and conditional GET. `version`
+    (default: the file's own) is used as the ETag and compared against `?v=`.
+    """
+    st = os.stat(path)
+    size = st.st_size
+    version = version or file_version(path)
+    etag = f'"{version}"'
+
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(st.st_mtime)
+    )
+    if conditional is not None:
+        patch_versioned_cache_control(request, conditional, version)
+        return conditional
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    # A stale If-Range means the client's partial copy is outdated: send it all.
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+    length = end - start + 1 if size else 0
+
+    if request.method == "HEAD":
+        response = HttpResponse(status=status, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            _iter_file(path, start, length), status=status, content_type=content_type
+        )
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(st.st_mtime)
+    patch_versioned_cache_control(request, response, version)
+    return response
+
+
+def stream_url(rendition):
+    """URL of the ranged view for an AudioRendition, pinned to the file's version."""
+    url = reverse("stream_audio", args=[rendition.lecture_id, rendition.name])
+    return f"{url}?v={file_version(rendition.file.path)}"
+
+
+def playlist_url(rendition):
+    """None when the rendition is not segmented (see SEGMENTED_MIME_TYPES)."""
+    if rendition.mime_type not in SEGMENTED_MIME_TYPES:
+        return None
+    url = reverse(
+        "audio_segment", args=[rendition.lecture_id, rendition.name, PLAYLIST_NAME]
+    )
+    return f"{url}?v={file_version(rendition.file.path)}"
+
+
+# --- Segmented mode -------------------------------------------------------
+
+
+def segment_dir(file_path):
+    """
+    Where one audio file's segments live. Keyed by the file's unique storage
+    name, so lectures that share a file through the dedup cache share these too.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(settings.MEDIA_ROOT, "segments", stem)
+
+
+def build_segments(file_path, segment_seconds=None):
+    """
+    Cuts an encoded audio file into ~segment_seconds pieces plus an HLS
+    playlist, copying the packets instead of re-encoding. Returns the directory.
+    """
+    segment_seconds = segment_seconds or settings.LITELEARN_AUDIO_SEGMENT_SECONDS
+    destination = segment_dir(file_path)
+    extension = os.path.splitext(file_path)[1]
+
+    # Build in a temp dir and rename, so a request never sees half a playlist.
+    parent = os.path.dirname(destination)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp")
+    command = [
+        "ffmpeg",
+        "-i",
+        file_path,
+        "-y",
+        "-loglevel",
+        "error",
+        "-map",
+        "0:a:0",
+        "-c",
+        "copy",
+        "-f",
+        "segment",
+        "-segment_time",
+        str(segment_seconds),
+        "-segment_list",
+        os.path.join(work_dir, PLAYLIST_NAME),
+        "-segment_list_type",
+        "m3u8",
+        os.path.join(work_dir, f"seg_%05d{extension}"),
+    ]
+    try:
+        subprocess.run(command, check=True)
+        try:
+            os.replace(work_dir, destination)
+        except OSError:
+            # Another worker built it first; theirs is identical.
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return destination
+
+
+def ensure_segments(file_path):
+    directory = segment_dir(file_path)
+    if not os.path.exists(os.path.join(directory, PLAYLIST_NAME)):
+        build_segments(file_path)
+    return directory
+
+
+def playlist_response(request, directory, version):
+    """
+    Serves the HLS playlist with `?v=` appended to every segment URI, so the
+    segments themselves can be cached forever.
+    """
+    etag = f'"{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        lines = []
+        with open(os.path.join(directory, PLAYLIST_NAME), encoding="utf-8") as f:
+            for line in f.read().splitlines():
+                if line and not line.startswith("#"):
+                    line = f"{line}?v={version}"
+                lines.append(line)
+        response = HttpResponse("\n".join(lines) + "\n", content_type=PLAYLIST_MIME_TYPE)
+        response["ETag"] = etag
+    patch_versioned_cache_control(request, response, version)
+    return response
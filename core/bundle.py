@@ -0,0 +1,278 @@
+"""
+Offline bundles: one zip per lecture with the audio, a timestamped transcript,
+the study guide and a manifest, for students who download once and study offline.
+
+The archive is written straight into the response (zipfile copes with an
+unseekable output), with no temp file. It is also teed into media/bundles/
+under the bundle's content key, so the next download of the same content is a
+plain, resumable file response. The key comes from the lecture's content hash
+and the audio file's version, so a cache hit renders no text. A client that already holds some parts lists
+their ids in `?have=` and gets a delta bundle without them.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from . import audio_streaming, captions, renditions
+from .pdf_cache import compute_content_hash
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+COPY_CHUNK_SIZE = 256 * 1024
+# Fixed entry timestamps: the same content always gives the same bytes.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass
+class Part:
+    path: str  # name inside the archive
+    part_id: str  # changes whenever the part's bytes change
+    compress: bool
+    size: int = None  # text parts: known once rendered
+    data: bytes = None  # text parts, once rendered
+    file_path: str = None  # audio, copied from disk
+    render: object = None  # text parts: returns the text
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def pick_rendition(lecture, name=None):
+    """The AudioRendition called `name` (default: the default one), if any."""
+    ladder = {r.name: r for r in lecture.renditions.all()}
+    return ladder.get(name or renditions.default_name())
+
+
+def collect_parts(lecture, rendition):
+    """
+    Everything that goes in the bundle, except the manifest. Text parts are
+    identified without being rendered; render_texts() fills them in.
+    """
+    parts = []
+    audio_id = ""
+
+    if rendition is not None:
+        audio_path = rendition.file.path
+        extension = os.path.splitext(audio_path)[1]
+    elif lecture.processed_audio:
+        audio_path = lecture.processed_audio.path
+        extension = ".mp3"
+    else:
+        audio_path = None
+    if audio_path:
+        # Already compressed, so stored as-is. Identified by file version, not a
+        # full read, since the file is replaced rather than edited.
+        version = audio_streaming.file_version(audio_path)
+        audio_id = _sha256(f"{os.path.basename(audio_path)}:{version}".encode())
+        parts.append(
+            Part(
+                path=f"audio{extension}",
+                part_id=audio_id,
+                size=os.path.getsize(audio_path),
+                compress=False,
+                file_path=audio_path,
+            )
+        )
+
+    # The content hash covers the summary, transcript and segments.
+    content = lecture.content_hash or compute_content_hash(lecture)
+    texts = [("summary.html", content, lambda: lecture.summary)]
+    if lecture.segment_count:
+        # Cue times follow the bundled (possibly silence-trimmed) audio.
+        texts.append(
+            (
+                "transcript.vtt",
+                f"{content}:{audio_id}",
+                lambda: captions.render(lecture, "vtt"),
+            )
+        )
+    else:
+        texts.append(("transcript.txt", content, lambda: lecture.transcript))
+    for path, source, render in texts:
+        parts.append(
+            Part(
+                path=path,
+                part_id=_sha256(f"{path}:{source}".encode()),
+                compress=True,
+                render=render,
+            )
+        )
+    return parts
+
+
+def render_texts(parts):
+    """Renders the text parts; only needed when the bundle is built."""
+    for part in parts:
+        if part.render is not None and part.data is None:
+            part.data = part.render().encode("utf-8")
+            part.size = len(part.data)
+
+
+def bundle_key(parts):
+    """Content key of a full bundle: it changes exactly when some part does."""
+    ids = "\n".join(f"{part.path}:{part.part_id}" for part in parts)
+    return _sha256(f"{BUNDLE_FORMAT}\n{ids}".encode())
+
+
+def delta_key(key, have):
+    """Key of the bundle `key` minus the parts in `have`."""
+    if not have:
+        return key
+    return _sha256(f"{key}:{','.join(sorted(have))}".encode())
+
+
+def build_manifest(lecture, rendition, parts, key, have=()):
+    return {
+        "format": BUNDLE_FORMAT,
+        "bundle": key,
+        "lecture_id": lecture.pk,
+        "title": lecture.title,
+        "created_at": lecture.created_at.isoformat() if lecture.created_at else None,
+        "original_size_mb": lecture.original_size_mb,
+        "rendition": None
+        if rendition is None
+        else {
+            "name": rendition.name,
+            "codec": rendition.codec,
+            "bitrate_kbps": rendition.bitrate_kbps,
+            "mime_type": rendition.mime_type,
+            "size_mb": rendition.size_mb,
+            "data_saved_percentage": rendition.data_saved_percentage,
+        },
+        # A delta bundle lists every part but only carries the ones not in `have`.
+        "delta": bool(have),
+        "parts": [
+            {
+                "path": part.path,
+                "id": part.part_id,
+                "bytes": part.size,
+                "included": part.part_id not in have,
+            }
+            for part in parts
+        ],
+    }
+
+
+class _Sink:
+    """Write-only, unseekable file object that hands written bytes to a generator."""
+
+    def __init__(self, tee=None):
+        self._chunks = []
+        self._tee = tee
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        if self._tee is not None:
+            self._tee.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_info(path, compress):
+    info = zipfile.ZipInfo(path, date_time=ZIP_DATE_TIME)
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def iter_bundle(lecture, rendition, parts, key, have=(), tee_path=None):
+    """
+    Yields the zip archive in chunks as it is built. With tee_path, the bytes
+    are also written to that file (atomically, only once the archive is complete).
+    """
+    tee = tmp_path = None
+    if tee_path:
+        os.makedirs(os.path.dirname(tee_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(tee_path), suffix=".part")
+        tee = os.fdopen(fd, "wb")
+
+    render_texts(parts)
+    sink = _Sink(tee)
+    complete = False
+    try:
+        with zipfile.ZipFile(sink, "w", compresslevel=9) as archive:
+            manifest = build_manifest(lecture, rendition, parts, key, have)
+            archive.writestr(
+                _zip_info(MANIFEST_NAME, True), json.dumps(manifest, indent=2)
+            )
+            yield sink.drain()
+
+            for part in parts:
+                if part.part_id in have:
+                    continue
+                if part.data is not None:
+                    archive.writestr(_zip_info(part.path, part.compress), part.data)
+                    yield sink.drain()
+                    continue
+                with open(part.file_path, "rb") as src, archive.open(
+                    _zip_info(part.path, part.compress), "w"
+                ) as dest:
+                    for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                        dest.write(chunk)
+                        yield sink.drain()
+        yield sink.drain()
+        complete = True
+    finally:
+        if tee is not None:
+            tee.close()
+            if complete:
+                os.replace(tmp_path, tee_path)
+                invalidate(lecture.pk, rendition, keep=tee_path)
+            else:
+                # The client went away mid-download; do not cache half an archive.
+                os.remove(tmp_path)
+
+
+def _cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, "bundles")
+
+
+def _rendition_name(rendition):
+    return rendition.name if rendition is not None else "audio"
+
+
+def bundle_path(lecture_id, rendition, key):
+    name = f"lecture_{lecture_id}_{_rendition_name(rendition)}_{key[:16]}.zip"
+    return os.path.join(_cache_dir(), name)
+
+
+def cached_bundle_path(lecture_id, rendition, key):
+    """Path of the full bundle if it was already built, else None."""
+    path = bundle_path(lecture_id, rendition, key)
+    return path if os.path.exists(path) else None
+
+
+def invalidate(lecture_id, rendition, keep=None):
+    """Deletes older bundles of this lecture and rendition."""
+    pattern = f"lecture_{lecture_id}_{_rendition_name(rendition)}_*.zip"
+    for path in glob.glob(os.path.join(_cache_dir(), pattern)):
+        if path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def invalidate_lecture(lecture_id):
+    """Deletes every cached bundle of a lecture (its text changed)."""
+    for path in glob.glob(os.path.join(_cache_dir(), f"lecture_{lecture_id}_*.zip")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
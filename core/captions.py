@@ -0,0 +1,67 @@
+"""
+WebVTT and SRT subtitles from a lecture's Whisper segments.
+
+Cue times follow the audio students actually play: when silence was trimmed
+(see silence.py) they are moved from the original recording onto the trimmed
+timeline. Segments are read from the segment store one block at a time.
+"""
+
+from . import silence
+
+FORMATS = {
+    "vtt": "text/vtt; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+}
+
+
+def _timestamp(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def _cue_text(segment):
+    # A blank line would end the cue early in both formats.
+    return "\n".join(line for line in segment["text"].strip().splitlines() if line)
+
+
+def webvtt(segments):
+    """WebVTT captions from Whisper segments (players show them next to the audio)."""
+    cues = ["WEBVTT", ""]
+    for segment in segments:
+        cues.append(
+            f"{_timestamp(segment['start'], '.')} --> {_timestamp(segment['end'], '.')}"
+        )
+        cues.append(_cue_text(segment))
+        cues.append("")
+    return "\n".join(cues)
+
+
+def srt(segments):
+    """SubRip subtitles: numbered cues, comma before the milliseconds."""
+    cues = []
+    for number, segment in enumerate(segments, start=1):
+        cues.append(str(number))
+        cues.append(
+            f"{_timestamp(segment['start'], ',')} --> {_timestamp(segment['end'], ',')}"
+        )
+        cues.append(_cue_text(segment))
+        cues.append("")
+    return "\n".join(cues)
+
+
+def playback_segments(lecture):
+    """The lecture's segments with times on the (possibly trimmed) audio's timeline."""
+    for segment in lecture.iter_segments():
+        if lecture.time_map:
+            segment["start"] = silence.to_trimmed(segment["start"], lecture.time_map)
+            segment["end"] = silence.to_trimmed(segment["end"], lecture.time_map)
+        yield segment
+
+
+def render(lecture, fmt):
+    """Subtitles for `lecture` in `fmt` ("vtt" or "srt")."""
+    writer = webvtt if fmt == "vtt" else srt
+    return writer(playback_segments(lecture))
@@ -0,0 +1,216 @@
+"""
+The lecture listing: keyset-paginated, cached, and with library-wide stats
+that are kept up to date instead of recomputed.
+
+- Pages are ordered newest first by (created_at, id). The cursor is the last
+  row's key, so page 500 costs the same as page 1 (no OFFSET scan), and rows
+  added meanwhile do not shift the pages.
+- Only the columns a card shows are loaded (LIST_FIELDS). The transcript and
+  study guide never leave the database.
+- A page is cached as a list of lecture IDs, keyed by LibraryStats.list_version,
+  which is bumped whenever a lecture is added or removed. Each card is cached
+  on its own and dropped when that lecture is saved. Editing one lecture
+  therefore costs one cache entry, not every page.
+- LibraryStats holds running totals (lectures, processed, MB before and after).
+  Lecture.save and deletes apply the difference with F() expressions.
+  `manage.py recount_stats` rebuilds the totals from scratch.
+"""
+
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, Sum
+from django.urls import reverse
+
+LIST_FIELDS = [
+    "id",
+    "title",
+    "youtube_url",
+    "created_at",
+    "original_size_mb",
+    "new_size_mb",
+    "duration_seconds",
+    "trimmed_seconds",
+    "segment_count",
+]
+
+_CARD_KEY = "catalog:card:{}"
+_PAGE_KEY = "catalog:page:{}:{}:{}"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# --- Cursors -------------------------------------------------------------------
+
+
+def encode_cursor(lecture):
+    raw = f"{lecture.created_at.isoformat()}|{lecture.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Bad cursor: {cursor!r}") from e
+
+
+# --- Stats -----------------------------------------------------------------------
+
+
+def _contribution(original_mb, new_mb):
+    """(processed, original MB, compressed MB) one lecture adds to the totals."""
+    if original_mb > 0 and new_mb > 0:
+        return 1, original_mb, new_mb
+    return 0, 0.0, 0.0
+
+
+def get_stats():
+    from .models import LibraryStats
+
+    stats, _ = LibraryStats.objects.get_or_create(pk=1)
+    return stats
+
+
+def _apply(lectures=0, processed=0, original_mb=0.0, compressed_mb=0.0, list_changed=False):
+    from .models import LibraryStats
+
+    if not (lectures or processed or original_mb or compressed_mb or list_changed):
+        return
+    get_stats()  # make sure the row exists
+    LibraryStats.objects.filter(pk=1).update(
+        lectures=F("lectures") + lectures,
+        processed=F("processed") + processed,
+        original_mb=F("original_mb") + original_mb,
+        compressed_mb=F("compressed_mb") + compressed_mb,
+        list_version=F("list_version") + (1 if list_changed else 0),
+    )
+
+
+def lecture_saved(lecture, old_sizes, created):
+    """
+    Called by Lecture.save. old_sizes is (original_size_mb, new_size_mb) as
+    stored before the save, or None when the sizes were not touched.
+    """
+    cache.delete(_CARD_KEY.format(lecture.pk))
+    if created:
+        old = (0, 0.0, 0.0)
+    elif old_sizes is not None:
+        old = _contribution(*old_sizes)
+    else:
+        return
+    new = _contribution(lecture.original_size_mb, lecture.new_size_mb)
+    _apply(
+        lectures=1 if created else 0,
+        processed=new[0] - old[0],
+        original_mb=new[1] - old[1],
+        compressed_mb=new[2] - old[2],
+        list_changed=created,
+    )
+
+
+def lecture_deleted(lecture):
+    cache.delete(_CARD_KEY.format(lecture.pk))
+    processed, original_mb, compressed_mb = _contribution(
+        lecture.original_size_mb, lecture.new_size_mb
+    )
+    _apply(-1, -processed, -original_mb, -compressed_mb, list_changed=True)
+
+
+def recount_stats():
+    """Recomputes the totals from every lecture (after bulk changes); returns them."""
+    from .models import Lecture, LibraryStats
+
+    processed = Lecture.objects.filter(original_size_mb__gt=0, new_size_mb__gt=0)
+    totals = processed.aggregate(original=Sum("original_size_mb"), new=Sum("new_size_mb"))
+    get_stats()
+    LibraryStats.objects.filter(pk=1).update(
+        lectures=Lecture.objects.count(),
+        processed=processed.count(),
+        original_mb=totals["original"] or 0.0,
+        compressed_mb=totals["new"] or 0.0,
+        list_version=F("list_version") + 1,
+    )
+    return get_stats()
+
+
+# --- Pages -----------------------------------------------------------------------
+
+
+def card(lecture):
+    """What the listing shows for one lecture (JSON-ready)."""
+    return {
+        "id": lecture.pk,
+        "title": lecture.title,
+        "url": reverse("lecture_detail", args=[lecture.pk]),
+        "youtube_url": lecture.youtube_url or "",
+        "created_at": lecture.created_at.isoformat(),
+        "processed": lecture.new_size_mb > 0,
+        "original_size_mb": lecture.original_size_mb,
+        "new_size_mb": lecture.new_size_mb,
+        "data_saved_percentage": lecture.data_saved_percentage,
+        "duration_seconds": lecture.duration_seconds,
+        "trimmed_seconds": lecture.trimmed_seconds,
+        "segment_count": lecture.segment_count,
+    }
+
+
+def _page_ids(cursor, size):
+    """IDs on the page after `cursor` (newest first) and the next page's cursor."""
+    from .models import Lecture
+
+    lectures = Lecture.objects.only("id", "created_at").order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        lectures = lectures.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(lectures[: size + 1])
+    next_cursor = encode_cursor(rows[size - 1]) if len(rows) > size else None
+    return [row.pk for row in rows[:size]], next_cursor
+
+
+def page(cursor=None, size=None):
+    """
+    One page of the listing: {"lectures": [card, ...], "next": cursor or None,
+    "stats": {...}}. Raises InvalidCursor for a cursor we did not issue.
+    """
+    from .models import Lecture
+
+    if size is None:
+        size = settings.LITELEARN_LIST_PAGE_SIZE
+    size = max(1, min(size, settings.LITELEARN_LIST_MAX_PAGE_SIZE))
+    if cursor:
+        decode_cursor(cursor)  # reject garbage before it becomes a cache key
+    stats = get_stats()
+    timeout = settings.LITELEARN_LIST_CACHE_SECONDS
+
+    page_key = _PAGE_KEY.format(stats.list_version, cursor or "first", size)
+    cached = cache.get(page_key)
+    if cached is None:
+        cached = _page_ids(cursor, size)
+        cache.set(page_key, cached, timeout)
+    ids, next_cursor = cached
+
+    cards = cache.get_many([_CARD_KEY.format(pk) for pk in ids])
+    missing = [pk for pk in ids if _CARD_KEY.format(pk) not in cards]
+    if missing:
+        loaded = {
+            _CARD_KEY.format(lecture.pk): card(lecture)
+            for lecture in Lecture.objects.only(*LIST_FIELDS).filter(pk__in=missing)
+        }
+        cache.set_many(loaded, timeout)
+        cards.update(loaded)
+
+    return {
+        # A lecture deleted since the IDs were cached simply drops out.
+        "lectures": [cards[key] for key in map(_CARD_KEY.format, ids) if key in cards],
+        "next": next_cursor,
+        "stats": stats.as_dict(),
+    }
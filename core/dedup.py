@@ -0,0 +1,311 @@
+"""
+Content-addressed cache of processed lectures.
+
+Sources are keyed by a streaming SHA-256 of the uploaded file or by the canonical
+YouTube video ID. A hit copies the cached audio/transcript/segments/summary onto
+the new Lecture (pointing at the same files on disk) without running the pipeline.
+
+Files a lecture still uses cost the cache nothing, so the size limit
+(LITELEARN_DEDUP_CACHE_MAX_MB) only counts the ones it alone keeps alive: those
+of lectures deleted since. Eviction frees exactly those.
+"""
+
+import hashlib
+import shutil
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import audio_streaming
+from .models import AudioRendition, Lecture, MediaCacheEntry
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0.0
+
+
+_stats = CacheStats()
+_stats_lock = threading.Lock()
+
+
+def _count(field, n=1):
+    with _stats_lock:
+        setattr(_stats, field, getattr(_stats, field) + n)
+
+
+def file_digest(fileobj):
+    """SHA-256 of a file object or path, read in fixed-size chunks."""
+    if isinstance(fileobj, str):
+        with open(fileobj, "rb") as f:
+            return file_digest(f)
+
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def youtube_video_id(url):
+    """Returns the 11-character video ID for the common YouTube URL shapes, or None."""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    path = parsed.path.strip("/").split("/")
+
+    if host in ("youtu.be", "www.youtu.be"):
+        video_id = path[0]
+    elif host in YOUTUBE_HOSTS:
+        if path[0] == "watch":
+            video_id = parse_qs(parsed.query).get("v", [""])[0]
+        elif path[0] in ("shorts", "embed", "live", "v") and len(path) > 1:
+            video_id = path[1]
+        else:
+            return None
+    else:
+        return None
+
+    if len(video_id) == 11 and all(c.isalnum() or c in "-_" for c in video_id):
+        return video_id
+    return None
+
+
+def source_key(lecture):
+    """The cache key for a lecture's source, or None if it cannot be derived."""
+    if lecture.youtube_url:
+        video_id = youtube_video_id(lecture.youtube_url)
+        return f"youtube:{video_id}" if video_id else None
+    if lecture.source_hash:
+        return f"sha256:{lecture.source_hash}"
+    if lecture.original_video:
+        with lecture.original_video.open("rb") as f:
+            return f"sha256:{file_digest(f)}"
+    return None
+
+
+def lookup(key):
+    """Returns the cache entry for `key` (and records the hit), or None."""
+    entry = MediaCacheEntry.objects.filter(source_key=key).first() if key else None
+    if entry is None:
+        _count("misses")
+        return None
+
+    MediaCacheEntry.objects.filter(pk=entry.pk).update(
+        hits=F("hits") + 1, last_used_at=timezone.now()
+    )
+    _count("hits")
+    return entry
+
+
+def apply(entry, lecture):
+    """Fills a lecture from a cache entry, reusing the entry's files in place."""
+    if (
+        lecture.original_video
+        and entry.original_video
+        and lecture.original_video.name != entry.original_video.name
+    ):
+        # This upload is a byte-identical copy of one we already have.
+        lecture.original_video.delete(save=False)
+        lecture.original_video.name = entry.original_video.name
+
+    if not lecture.title:
+        lecture.title = entry.title
+    lecture.processed_audio.name = entry.processed_audio.name
+    lecture.transcript = entry.transcript
+    lecture.set_segments_file(entry.segments_file.name, entry.segment_count)
+    lecture.summary = entry.summary
+    lecture.new_size_mb = entry.new_size_mb
+    lecture.original_size_mb = lecture.original_size_mb or entry.original_size_mb
+    lecture.duration_seconds = entry.duration_seconds
+    lecture.trimmed_seconds = entry.trimmed_seconds
+    lecture.time_map = entry.time_map
+    lecture.save()
+
+    replaced = [rendition.file.name for rendition in lecture.renditions.all()]
+    lecture.renditions.all().delete()
+    AudioRendition.objects.bulk_create(
+        AudioRendition(lecture=lecture, **rendition) for rendition in entry.renditions
+    )
+    delete_unused_files(replaced)
+    return lecture
+
+
+def store(key, lecture):
+    """Records a freshly processed lecture under `key` and enforces the size limit."""
+    if not key or not lecture.processed_audio:
+        return None
+
+    ladder = [
+        {
+            "name": r.name,
+            "codec": r.codec,
+            "bitrate_kbps": r.bitrate_kbps,
+            "mime_type": r.mime_type,
+            "file": r.file.name,
+            "size_mb": r.size_mb,
+        }
+        for r in lecture.renditions.all()
+    ]
+    files = {lecture.processed_audio, *(r.file for r in lecture.renditions.all())}
+    if lecture.original_video:
+        files.add(lecture.original_video)
+    if lecture.segments_file:
+        files.add(lecture.segments_file)
+    size_bytes = sum(f.size for f in files)
+
+    previous = MediaCacheEntry.objects.filter(source_key=key).first()
+    entry, _ = MediaCacheEntry.objects.update_or_create(
+        source_key=key,
+        defaults={
+            "title": lecture.title,
+            "original_video": lecture.original_video.name or None,
+            "processed_audio": lecture.processed_audio.name,
+            "transcript": lecture.transcript,
+            "segments_file": lecture.segments_file.name or None,
+            "segment_count": lecture.segment_count,
+            "renditions": ladder,
+            "summary": lecture.summary,
+            "original_size_mb": lecture.original_size_mb,
+            "new_size_mb": lecture.new_size_mb,
+            "duration_seconds": lecture.duration_seconds,
+            "trimmed_seconds": lecture.trimmed_seconds,
+            "time_map": lecture.time_map,
+            "size_bytes": size_bytes,
+            "last_used_at": timezone.now(),
+        },
+    )
+    if previous is not None:
+        # Reprocessed: the files of the result it replaces may be unused now.
+        delete_unused_files(_entry_files(previous))
+    evict()
+    return entry
+
+
+def _entry_files(entry):
+    names = {entry.processed_audio.name, entry.original_video.name, entry.segments_file.name}
+    names.update(rendition["file"] for rendition in entry.renditions)
+    names.discard(None)
+    names.discard("")
+    return names
+
+
+def _lecture_files():
+    """Every file name a Lecture or AudioRendition points at."""
+    names = set(AudioRendition.objects.values_list("file", flat=True))
+    for row in Lecture.objects.values_list("processed_audio", "original_video", "segments_file"):
+        names.update(row)
+    return names
+
+
+def delete_unused_files(names):
+    """
+    Deletes the named media files, and their HLS segments, that no Lecture,
+    AudioRendition or cache entry points at any more (e.g. renditions a
+    reprocess replaced). Files still in use, say by a lecture that got them
+    from the cache, stay.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+    names -= set(AudioRendition.objects.filter(file__in=names).values_list("file", flat=True))
+    for field in ("processed_audio", "original_video", "segments_file"):
+        for model in (Lecture, MediaCacheEntry):
+            names -= set(
+                model.objects.filter(**{f"{field}__in": names}).values_list(field, flat=True)
+            )
+    if names:
+        for entry in MediaCacheEntry.objects.only("renditions"):
+            names -= {rendition["file"] for rendition in entry.renditions}
+    for name in names:
+        _delete_file(name)
+
+
+def _delete_file(name):
+    storage = MediaCacheEntry._meta.get_field("processed_audio").storage
+    shutil.rmtree(audio_streaming.segment_dir(storage.path(name)), ignore_errors=True)
+    storage.delete(name)
+
+
+def evict(max_bytes=None):
+    """
+    Drops least-recently-used entries, and the files only they kept, until those
+    cache-only files fit in max_bytes. Entries whose files all belong to lectures
+    free nothing, so they stay.
+    """
+    if max_bytes is None:
+        max_bytes = settings.LITELEARN_DEDUP_CACHE_MAX_MB * 1024 * 1024
+
+    # Everything the entries point at is an upper bound on what only they keep.
+    total = MediaCacheEntry.objects.aggregate(total=Sum("size_bytes"))["total"] or 0
+    if total <= max_bytes:
+        return 0
+
+    storage = MediaCacheEntry._meta.get_field("processed_audio").storage
+    entries = list(MediaCacheEntry.objects.order_by("last_used_at"))
+    in_use = _lecture_files()
+    held = {entry.pk: _entry_files(entry) - in_use for entry in entries}
+    holders = Counter(name for names in held.values() for name in names)
+    sizes = {}
+    for name in holders:
+        try:
+            sizes[name] = storage.size(name)
+        except OSError:
+            sizes[name] = 0
+    total = sum(sizes.values())
+
+    evicted = 0
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        names = held[entry.pk]
+        if not names:
+            continue
+        entry.delete()
+        evicted += 1
+        for name in names:
+            holders[name] -= 1
+            if not holders[name]:  # another entry may still point at it
+                _delete_file(name)
+                total -= sizes[name]
+
+    _count("evictions", evicted)
+    return evicted
+
+
+def stats():
+    """Process-local hit/miss counters plus the persisted size of the cache."""
+    with _stats_lock:
+        counters = asdict(_stats)
+        counters["hit_rate"] = _stats.hit_rate
+
+    totals = MediaCacheEntry.objects.aggregate(
+        size=Sum("size_bytes"), lifetime_hits=Sum("hits")
+    )
+    counters.update(
+        entries=MediaCacheEntry.objects.count(),
+        size_mb=round((totals["size"] or 0) / (1024 * 1024), 2),
+        lifetime_hits=totals["lifetime_hits"] or 0,
+    )
+    return counters
@@ -0,0 +1,299 @@
+"""
+Bulk ingestion of whole courses: lists of YouTube links, playlists, or folders
+of video files.
+
+Each item goes through three stages with their own concurrency limits:
+fetch (download / ffmpeg, I/O-bound threads), transcribe (Whisper, CPU-bound
+processes) and summarize (Gemini, I/O-bound threads again).
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import dedup, metrics, silence, transcription, youtube
+from .media_processor import ContentProcessor
+from .models import Lecture, MediaCacheEntry
+from .pipeline import finalize_lecture
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".webm", ".mov", ".avi", ".m4a", ".mp3", ".wav"}
+
+
+@dataclass
+class Source:
+    kind: str  # "youtube", "file" or "playlist" (not yet listed)
+    location: str  # URL or absolute path
+    title: str = ""
+
+    def __str__(self):
+        return self.location
+
+
+@dataclass
+class IngestReport:
+    processed: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    audio_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    def as_dict(self):
+        hours = self.wall_seconds / 3600
+        minutes = self.wall_seconds / 60
+        return {
+            "processed": len(self.processed),
+            "skipped": len(self.skipped),
+            "failed": len(self.failed),
+            "wall_seconds": round(self.wall_seconds, 1),
+            "audio_minutes": round(self.audio_seconds / 60, 1),
+            "lectures_per_hour": round(len(self.processed) / hours, 1) if hours else 0,
+            "audio_minutes_per_minute": round(self.audio_seconds / 60 / minutes, 2)
+            if minutes
+            else 0,
+        }
+
+
+def is_playlist(url):
+    return "/playlist" in url or ("list=" in url and not dedup.youtube_video_id(url))
+
+
+def expand_playlist(url):
+    """The videos of a playlist, as Sources. Raises ValueError if yt-dlp cannot list it."""
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": "in_playlist"}) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise ValueError(f"Could not list playlist {url}: {e}") from e
+    entries = info.get("entries") or []
+    return [
+        Source(
+            "youtube",
+            entry.get("url") or f"https://www.youtube.com/watch?v={entry['id']}",
+            entry.get("title") or "",
+        )
+        for entry in entries
+        if entry
+    ]
+
+
+def expand_sources(items, allow_paths=True, expand_playlists=True):
+    """
+    Turns user input (URLs, playlist URLs, files, folders) into a flat list of
+    Sources, dropping duplicates. Paths are only accepted when allow_paths is set.
+    With expand_playlists=False, playlists are kept as "playlist" Sources for a
+    worker to list (see enqueue_sources), so no request has to wait on yt-dlp.
+    """
+    sources = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith(("http://", "https://")):
+            if not is_playlist(item):
+                sources.append(Source("youtube", item))
+            elif expand_playlists:
+                sources.extend(expand_playlist(item))
+            else:
+                sources.append(Source("playlist", item))
+        elif allow_paths and os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                path = os.path.join(item, name)
+                is_video = os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+                if is_video and os.path.isfile(path):
+                    sources.append(Source("file", os.path.abspath(path)))
+        elif allow_paths and os.path.isfile(item):
+            sources.append(Source("file", os.path.abspath(item)))
+        else:
+            raise ValueError(f"Not a URL, file or folder: {item}")
+
+    unique = {}
+    for source in sources:
+        unique.setdefault(source.location, source)
+    return list(unique.values())
+
+
+def source_cache_key(source):
+    if source.kind == "youtube":
+        video_id = dedup.youtube_video_id(source.location)
+        return f"youtube:{video_id}" if video_id else None
+    return f"sha256:{dedup.file_digest(source.location)}"
+
+
+def already_processed(source, cache_key):
+    if cache_key and MediaCacheEntry.objects.filter(source_key=cache_key).exists():
+        return True
+    if source.kind == "youtube":
+        return (
+            Lecture.objects.filter(youtube_url=source.location)
+            .exclude(transcript="")
+            .exists()
+        )
+    return False
+
+
+class BatchIngestor:
+    def __init__(
+        self, io_workers=None, cpu_workers=None, whisper_model=None, transcription=None
+    ):
+        self.io_workers = io_workers or settings.LITELEARN_INGEST_IO_WORKERS
+        self.cpu_workers = cpu_workers or settings.LITELEARN_INGEST_CPU_WORKERS
+        self.processor = ContentProcessor(whisper_model, transcription)
+        self.output_dir = os.path.join(settings.MEDIA_ROOT, "processed")
+        self._lock = threading.Lock()
+
+    def _fetch(self, source, video, downloads):
+        if source.kind == "youtube":
+            encoded, meta = self.processor.download_youtube(
+                source.location, self.output_dir, video, downloads.download
+            )
+            return encoded, source.title or meta["title"]
+        encoded = self.processor.extract_audio(source.location, self.output_dir)
+        title = source.title or os.path.splitext(os.path.basename(source.location))[0]
+        return encoded, title
+
+    def _ingest_one(self, source, cpu_pool, downloads, report, on_item):
+        close_old_connections()
+        with metrics.recording() as recorder:
+            lecture = self._ingest_stages(source, cpu_pool, downloads, report, on_item)
+            metrics.save(recorder, lecture)
+
+    def _skip(self, source, report, on_item):
+        with self._lock:
+            report.skipped.append(source.location)
+        on_item(source, "skipped")
+
+    def _ingest_stages(self, source, cpu_pool, downloads, report, on_item):
+        """Runs one source through the three stages; returns its Lecture, or None."""
+        lecture = None
+        try:
+            cache_key = source_cache_key(source)
+            if already_processed(source, cache_key):
+                self._skip(source, report, on_item)
+                return None
+
+            # Metadata before downloading: rejects over-long videos and dedups
+            # by the canonical video ID.
+            video = None
+            if source.kind == "youtube":
+                video = youtube.fetch_metadata(source.location)
+                if video.cache_key != cache_key:
+                    cache_key = video.cache_key
+                    if already_processed(source, cache_key):
+                        self._skip(source, report, on_item)
+                        return None
+
+            # Stage 1 (I/O): download / extract + compress. Downloads wait for
+            # one of the queue's LITELEARN_YOUTUBE_CONCURRENT_DOWNLOADS slots.
+            encoded, title = self._fetch(source, video, downloads)
+            audio_seconds = encoded.duration
+
+            # Stage 2 (CPU): Whisper, bounded by the process pool size. The CPU
+            # time is spent in the pool's processes, so only wall time shows here.
+            # They read the PCM from disk: pickling the array would copy it whole.
+            with metrics.stage("transcribe") as sample:
+                sample.bytes_in = encoded.samples.nbytes
+                options = self.processor.transcription_options(encoded.samples)
+                fd, pcm_path = tempfile.mkstemp(suffix="_pcm.npy", dir=self.output_dir)
+                os.close(fd)
+                try:
+                    transcription.save_pcm(pcm_path, encoded.samples)
+                    result = cpu_pool.submit(
+                        transcription.transcribe_saved, pcm_path, options
+                    ).result()
+                finally:
+                    os.remove(pcm_path)
+                sample.bytes_out = len(result["text"].encode("utf-8"))
+            result["segments"] = silence.remap_segments(result["segments"], encoded.time_map)
+            encoded.samples = None
+
+            # Stage 3 (I/O): Gemini
+            summary = self.processor.generate_ai_summary(result["text"])
+
+            lecture = Lecture(title=title[:200])
+            if source.kind == "youtube":
+                lecture.youtube_url = source.location
+            else:
+                lecture.source_hash = cache_key.split(":", 1)[1]
+                lecture.original_size_mb = round(
+                    os.path.getsize(source.location) / (1024 * 1024), 2
+                )
+            lecture.save()
+            finalize_lecture(
+                lecture,
+                self.processor.build_result(title, encoded, result, summary),
+                cache_key,
+            )
+        except Exception as e:
+            logger.warning("Ingest failed for %s: %s", source, e)
+            with self._lock:
+                report.failed.append((source.location, str(e)))
+            on_item(source, "failed")
+            # Keep the stages of a lecture that got as far as being saved.
+            return lecture if lecture is not None and lecture.pk else None
+
+        with self._lock:
+            report.processed.append(lecture.pk)
+            report.audio_seconds += audio_seconds
+        on_item(source, "processed")
+        return lecture
+
+    def run(self, sources, on_item=None):
+        on_item = on_item or (lambda source, outcome: None)
+        os.makedirs(self.output_dir, exist_ok=True)
+        report = IngestReport()
+        start = time.perf_counter()
+
+        with youtube.DownloadQueue() as downloads, transcription.process_pool(
+            self.cpu_workers
+        ) as cpu_pool:
+            with ThreadPoolExecutor(max_workers=self.io_workers) as io_pool:
+                futures = [
+                    io_pool.submit(
+                        self._ingest_one, source, cpu_pool, downloads, report, on_item
+                    )
+                    for source in sources
+                ]
+                for future in as_completed(futures):
+                    future.result()
+
+        report.wall_seconds = time.perf_counter() - start
+        return report
+
+
+def enqueue_sources(sources, transcription=None):
+    """
+    Creates a Lecture + queued job per new source (for the HTTP API and
+    `ingest --queue`). Only YouTube sources can be queued, since workers need
+    the file inside MEDIA_ROOT. A playlist gets a job of its own, which lists it
+    and calls this again with its videos. transcription overrides every job's
+    transcription options; invalid ones raise ValueError before anything is queued.
+    """
+    from .jobs import enqueue, enqueue_playlist
+    from .transcription import options_for
+
+    if transcription:
+        options_for(**transcription)
+    queued, playlists, skipped = [], [], []
+    for source in sources:
+        if source.kind == "playlist":
+            job = enqueue_playlist(source.location, transcription=transcription)
+            playlists.append({"url": source.location, "job_id": job.pk})
+            continue
+        if source.kind != "youtube" or already_processed(source, source_cache_key(source)):
+            skipped.append(source.location)
+            continue
+        lecture = Lecture.objects.create(title=source.title[:200], youtube_url=source.location)
+        job = enqueue(lecture, transcription=transcription)
+        queued.append({"url": source.location, "lecture_id": lecture.pk, "job_id": job.pk})
+    return {"queued": queued, "playlists": playlists, "skipped": skipped}
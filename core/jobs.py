@@ -0,0 +1,288 @@
+"""
+A small database-backed job queue.
+
+The ProcessingJob table doubles as the broker, so the whole thing runs against
+SQLite with no external services. Workers (see `manage.py runworker`) claim jobs
+with a conditional UPDATE, which is atomic even when several processes poll the
+same database.
+"""
+
+import importlib
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import dedup, llm_cache, metrics, model_pool, youtube
+from .models import ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(lecture, max_attempts=None, transcription=None):
+    """
+    Creates a queued job for the lecture and returns it immediately.
+    transcription overrides the job's transcription options, e.g.
+    {"backend": "faster-whisper", "model": "small"} (see core/transcription.py).
+    """
+    if max_attempts is None:
+        max_attempts = settings.LITELEARN_JOB_MAX_ATTEMPTS
+    if transcription:
+        from .transcription import options_for
+
+        options_for(**transcription)  # reject bad options now, not in the worker
+    return ProcessingJob.objects.create(
+        lecture=lecture, max_attempts=max_attempts, transcription=transcription or {}
+    )
+
+
+def enqueue_playlist(url, max_attempts=None, transcription=None):
+    """
+    Queues the listing of a playlist. The worker that runs it queues one lecture
+    job per new video, with these transcription options.
+    """
+    if max_attempts is None:
+        max_attempts = settings.LITELEARN_JOB_MAX_ATTEMPTS
+    return ProcessingJob.objects.create(
+        playlist_url=url, max_attempts=max_attempts, transcription=transcription or {}
+    )
+
+
+def run_playlist(job):
+    """Lists a playlist job's videos and queues the new ones."""
+    from .ingest import enqueue_sources, expand_playlist
+
+    result = enqueue_sources(expand_playlist(job.playlist_url), job.transcription)
+    logger.info(
+        "Playlist %s: %d queued, %d already processed.",
+        job.playlist_url,
+        len(result["queued"]),
+        len(result["skipped"]),
+    )
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts` (exponential, capped)."""
+    delay = settings.LITELEARN_JOB_RETRY_BACKOFF * (2 ** max(attempts - 1, 0))
+    return min(delay, settings.LITELEARN_JOB_RETRY_BACKOFF_MAX)
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(worker_name):
+    """
+    Atomically moves the oldest runnable job to RUNNING and returns it.
+    Returns None when nothing is due.
+    """
+    now = timezone.now()
+    candidates = (
+        ProcessingJob.objects.filter(status=ProcessingJob.QUEUED, run_after__lte=now)
+        .order_by("run_after", "pk")
+        .values_list("pk", flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = ProcessingJob.objects.filter(
+            pk=pk, status=ProcessingJob.QUEUED
+        ).update(
+            status=ProcessingJob.RUNNING,
+            worker=worker_name,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+            stage="",
+            progress=0,
+        )
+        if claimed:
+            return ProcessingJob.objects.select_related("lecture").get(pk=pk)
+        # Another worker won the race for this row, try the next one.
+    return None
+
+
+def report_progress(job_id, stage, progress):
+    ProcessingJob.objects.filter(pk=job_id).update(
+        stage=stage, progress=progress, heartbeat_at=timezone.now()
+    )
+
+
+@contextmanager
+def heartbeat(job_id, interval=None):
+    """
+    Touches the job's heartbeat_at every `interval` seconds
+    (LITELEARN_JOB_HEARTBEAT_SECONDS) from a background thread while the block
+    runs, so long stages (Whisper) do not look like a dead worker.
+    """
+    if interval is None:
+        interval = settings.LITELEARN_JOB_HEARTBEAT_SECONDS
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                ProcessingJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def requeue_stalled(stall_seconds=None, dry_run=False):
+    """
+    Finds running jobs without a heartbeat for stall_seconds
+    (LITELEARN_JOB_STALL_SECONDS): their worker died. Each is queued again,
+    and resumes after its lecture's last completed stage, or failed if it has
+    no attempts left. Returns the stalled jobs.
+    """
+    if stall_seconds is None:
+        stall_seconds = settings.LITELEARN_JOB_STALL_SECONDS
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=stall_seconds)
+    stalled = list(
+        ProcessingJob.objects.filter(status=ProcessingJob.RUNNING).filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
+    )
+    if dry_run:
+        return stalled
+
+    for job in stalled:
+        error = (
+            f"Worker {job.worker or '?'} stopped responding during "
+            f"{job.stage or 'startup'} (last heartbeat {job.heartbeat_at or job.started_at})."
+        )
+        if job.attempts < job.max_attempts:
+            changes = {"status": ProcessingJob.QUEUED, "run_after": now}
+        else:
+            changes = {"status": ProcessingJob.FAILED, "finished_at": now}
+        # Only if it is still silent: the worker may have come back meanwhile.
+        ProcessingJob.objects.filter(
+            pk=job.pk, status=ProcessingJob.RUNNING, heartbeat_at=job.heartbeat_at
+        ).update(error=error, **changes)
+    return stalled
+
+
+def preload(modules=None):
+    """
+    Imports the pipeline and its heavy dependencies (LITELEARN_WORKER_PRELOAD)
+    now rather than during the first job. Called by runworker before it forks,
+    so the worker processes share these pages copy-on-write. Returns seconds
+    per module; a missing optional module is reported and skipped.
+    """
+    if modules is None:
+        modules = settings.LITELEARN_WORKER_PRELOAD
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Preload: could not import %s (%s)", name, e)
+            continue
+        timings[name] = round(time.perf_counter() - start, 2)
+    return timings
+
+
+def run_job(job):
+    """Runs one claimed job and records the outcome (success, retry or failure)."""
+    # Imported here so the queue can be used without loading the pipeline.
+    from .pipeline import process_lecture_record
+
+    if job.profile:
+        # One attempt only: the flag is cleared whatever the outcome.
+        profiler = metrics.profiled(metrics.profile_base(job))
+        ProcessingJob.objects.filter(pk=job.pk).update(profile=False)
+    else:
+        profiler = nullcontext()
+
+    try:
+        with heartbeat(job.pk), metrics.recording() as recorder, profiler:
+            try:
+                if job.playlist_url:
+                    run_playlist(job)
+                else:
+                    process_lecture_record(
+                        job.lecture,
+                        on_progress=lambda stage, progress: report_progress(
+                            job.pk, stage, progress
+                        ),
+                        transcription=job.transcription,
+                        # Gemini failures are retried; the last attempt stores a fallback.
+                        summary_fallback=job.attempts >= job.max_attempts,
+                        use_cache=not job.reprocess,
+                    )
+            finally:
+                metrics.save(recorder, job.lecture, job)
+    except Exception as e:
+        logger.warning(
+            "Job %s failed (attempt %s/%s): %s", job.pk, job.attempts, job.max_attempts, e
+        )
+        error = "".join(traceback.format_exception(e))
+        # A rejected video (too long, no audio) would be rejected again.
+        if job.attempts < job.max_attempts and not isinstance(e, youtube.VideoRejected):
+            ProcessingJob.objects.filter(pk=job.pk).update(
+                status=ProcessingJob.QUEUED,
+                run_after=timezone.now() + timedelta(seconds=backoff_delay(job.attempts)),
+                error=error,
+            )
+        else:
+            ProcessingJob.objects.filter(pk=job.pk).update(
+                status=ProcessingJob.FAILED, finished_at=timezone.now(), error=error
+            )
+        return False
+
+    ProcessingJob.objects.filter(pk=job.pk).update(
+        status=ProcessingJob.SUCCEEDED,
+        stage="done",
+        progress=100,
+        error="",
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def work(worker_name=None, poll_interval=None, burst=False):
+    """
+    Worker loop: claim a job, run it, repeat.
+    With burst=True the loop exits as soon as the queue has nothing due.
+    """
+    worker_name = worker_name or default_worker_name()
+    if poll_interval is None:
+        poll_interval = settings.LITELEARN_JOB_POLL_INTERVAL
+
+    while True:
+        close_old_connections()
+        job = claim_next_job(worker_name)
+        if job is None:
+            if burst:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(
+            "[%s] Processing job %s (%s)", worker_name, job.pk, job.lecture or job.playlist_url
+        )
+        run_job(job)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[%s] whisper pool %s, dedup cache %s, LLM cache %s",
+                worker_name,
+                model_pool.stats(),
+                dedup.stats(),
+                llm_cache.get_cache().stats_dict(),
+            )
@@ -0,0 +1,273 @@
+"""
+Disk-backed cache for LLM responses, with request coalescing.
+
+Entries are keyed by model name, prompt template version and a hash of the
+whitespace-normalised prompt (which embeds the transcript), so re-uploads and
+re-summarize actions skip the network. Concurrent requests for the same key,
+in this process or (on POSIX) in other worker processes, wait for the one
+upstream call instead of making their own.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing is per-process only
+    fcntl = None
+
+# Other processes write to the same directory, and this process only counts its
+# own writes, so the size on disk is re-measured at least this often.
+EVICT_CHECK_SECONDS = 10 * 60
+
+
+@dataclass
+class LLMCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0  # waited for another caller's request instead of sending one
+    evictions: int = 0
+    hit_seconds: float = 0.0
+    upstream_seconds: float = 0.0
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.split())
+
+
+class ResponseCache:
+    def __init__(self, directory=None, ttl=None, max_mb=None):
+        self.directory = str(directory or settings.LITELEARN_LLM_CACHE_DIR)
+        self.ttl = settings.LITELEARN_LLM_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = (
+            settings.LITELEARN_LLM_CACHE_MAX_MB if max_mb is None else max_mb
+        ) * 1024 * 1024
+        self.stats = LLMCacheStats()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # Size found by the last evict() scan, plus what this process wrote since.
+        self._scanned_bytes = None
+        self._written_bytes = 0
+        self._scanned_at = 0.0
+
+    def key(self, model_name, template_version, prompt):
+        prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+        raw = f"{model_name}\0{template_version}\0{prompt_hash}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if self.ttl and time.time() - entry["created"] > self.ttl:
+            self._remove(path)
+            return None
+        # Touch for LRU eviction
+        os.utime(path)
+        return entry["text"]
+
+    def set(self, key, text):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "text": text}, f)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._written_bytes += size
+            due = (
+                self._scanned_bytes is None
+                or self._scanned_bytes + self._written_bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at > EVICT_CHECK_SECONDS
+            )
+        if due:
+            self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Deletes least-recently-used entries until the cache fits in max_bytes.
+        Walks the whole directory, so set() only calls it when this process's
+        writes may have filled the cache, or every EVICT_CHECK_SECONDS.
+        """
+        scanned_at = time.monotonic()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                with self._lock:
+                    self.stats.evictions += 1
+        with self._lock:
+            self._scanned_bytes = total
+            self._written_bytes = 0
+            self._scanned_at = scanned_at
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_or_compute(self, key, compute):
+        start = time.perf_counter()
+        text = self.get(key)
+        if text is not None:
+            self._record_hit(start)
+            return text
+
+        key_lock = self._key_lock(key)
+        waited = not key_lock.acquire(blocking=False)
+        if waited:
+            key_lock.acquire()
+        try:
+            with self._process_lock(key) as process_lock:
+                # Whoever held the lock before us may have filled the entry.
+                text = self.get(key)
+                if text is not None:
+                    process_lock.unlink()
+                    with self._lock:
+                        self.stats.coalesced += 1
+                    self._record_hit(start)
+                    return text
+
+                upstream_start = time.perf_counter()
+                text = compute()
+                with self._lock:
+                    self.stats.misses += 1
+                    self.stats.upstream_seconds += time.perf_counter() - upstream_start
+                self.set(key, text)
+                # The entry exists now; anyone still waiting finds it once they get the lock.
+                process_lock.unlink()
+                return text
+        finally:
+            key_lock.release()
+            with self._lock:
+                if not waited and self._key_locks.get(key) is key_lock:
+                    self._key_locks.pop(key, None)
+
+    def _record_hit(self, start):
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.hit_seconds += time.perf_counter() - start
+
+    def _process_lock(self, key):
+        # One lock file per key, so only callers of the same prompt wait for each
+        # other. Removed once the entry is written (see _FileLock.unlink).
+        return _FileLock(os.path.join(self.directory, key[:2], f"{key}.lock"))
+
+    def stats_dict(self):
+        with self._lock:
+            data = asdict(self.stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups, 3) if lookups else 0.0
+        data["avg_hit_ms"] = (
+            round(1000 * data["hit_seconds"] / data["hits"], 2) if data["hits"] else 0.0
+        )
+        data["avg_upstream_ms"] = (
+            round(1000 * data["upstream_seconds"] / data["misses"], 1)
+            if data["misses"]
+            else 0.0
+        )
+        return data
+
+
+class _FileLock:
+    """
+    Cross-process exclusive lock (no-op where fcntl is unavailable). The holder
+    may unlink() the file; a waiter that then gets the lock on the removed file
+    notices and locks the path afresh.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            f = open(self.path, "a")
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(f.fileno()).st_ino:
+                self._file = f
+                return self
+            f.close()
+
+    def unlink(self):
+        if self._file is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class CachedModel:
+    """Wraps any model with generate_content(prompt) and serves repeats from the cache."""
+
+    def __init__(self, model, cache, template_version):
+        self.model = model
+        self.cache = cache
+        self.template_version = template_version
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+
+    def generate_content(self, prompt):
+        key = self.cache.key(self.model_name, self.template_version, prompt)
+        text = self.cache.get_or_compute(
+            key, lambda: self.model.generate_content(prompt).text
+        )
+        return SimpleNamespace(text=text)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide cache instance (shared so stats and coalescing are too)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,73 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a lecture's offline bundle (audio, timestamped transcript, study "
+        "guide and manifest) as a zip, streamed to a file or stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("lecture_id", type=int)
+        parser.add_argument(
+            "-o",
+            "--output",
+            default="-",
+            help="Output file (default: stdout).",
+        )
+        parser.add_argument(
+            "--rendition",
+            help="Audio rendition to include (default: LITELEARN_DEFAULT_RENDITION).",
+        )
+        parser.add_argument(
+            "--have",
+            default="",
+            help="Comma-separated part ids (from an earlier manifest) to leave out.",
+        )
+
+    def handle(self, *args, **options):
+        from core import bundle
+        from core.models import Lecture
+
+        try:
+            lecture = Lecture.objects.get(pk=options["lecture_id"])
+        except Lecture.DoesNotExist:
+            raise CommandError(f"Lecture {options['lecture_id']} does not exist.")
+
+        rendition = bundle.pick_rendition(lecture, options["rendition"])
+        if options["rendition"] and rendition is None:
+            raise CommandError(f"Lecture has no rendition {options['rendition']!r}.")
+
+        parts = bundle.collect_parts(lecture, rendition)
+        key = bundle.bundle_key(parts)
+        have = set(options["have"].split(",")) & {p.part_id for p in parts}
+
+        to_stdout = options["output"] == "-"
+        out = sys.stdout.buffer if to_stdout else open(options["output"], "wb")
+        size = 0
+        try:
+            for chunk in bundle.iter_bundle(lecture, rendition, parts, key, have):
+                out.write(chunk)
+                size += len(chunk)
+        finally:
+            if not to_stdout:
+                out.close()
+
+        # Keep stdout clean for the archive itself.
+        report = self.stderr if to_stdout else self.stdout
+        report.write(
+            json.dumps(
+                {
+                    "bundle": key,
+                    "bytes": size,
+                    "parts": [
+                        {"path": p.path, "id": p.part_id, "included": p.part_id not in have}
+                        for p in parts
+                    ],
+                },
+                indent=2,
+            )
+        )
@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-ingests lectures from YouTube URLs, playlists, video files or folders. "
+        "Already processed items are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="*", help="URLs, playlist URLs, files or folders.")
+        parser.add_argument(
+            "--from-file",
+            help="Read additional sources from a text file, one per line.",
+        )
+        parser.add_argument(
+            "--io-workers",
+            type=int,
+            help="Concurrent downloads / ffmpeg runs / Gemini calls.",
+        )
+        parser.add_argument(
+            "--cpu-workers",
+            type=int,
+            help="Concurrent Whisper transcriptions (one process each).",
+        )
+        parser.add_argument(
+            "--backend",
+            help="Transcription backend, e.g. whisper or faster-whisper (default: settings).",
+        )
+        parser.add_argument("--model", help="Whisper model size, e.g. tiny, base or small.")
+        parser.add_argument("--beam-size", type=int, help="Beam size (default: the backend's).")
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Enqueue YouTube sources for `runworker` instead of processing here.",
+        )
+
+    def handle(self, *args, **options):
+        from core.ingest import BatchIngestor, enqueue_sources, expand_sources
+        from core.transcription import options_for
+
+        items = list(options["sources"])
+        if options["from_file"]:
+            with open(options["from_file"], encoding="utf-8") as f:
+                items.extend(line for line in f if not line.startswith("#"))
+        if not items:
+            raise CommandError("Nothing to ingest. Pass URLs, files or folders.")
+
+        try:
+            # Queued playlists are listed by the worker that picks them up.
+            sources = expand_sources(items, expand_playlists=not options["queue"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Found {len(sources)} item(s).")
+
+        transcription = {
+            key: options[key]
+            for key in ("backend", "model", "beam_size")
+            if options[key] is not None
+        }
+        try:
+            options_for(**transcription)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["queue"]:
+            result = enqueue_sources(sources, transcription)
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        def on_item(source, outcome):
+            self.stdout.write(f"[{outcome}] {source}")
+
+        ingestor = BatchIngestor(
+            options["io_workers"], options["cpu_workers"], transcription=transcription
+        )
+        report = ingestor.run(sources, on_item=on_item)
+        for location, error in report.failed:
+            self.stderr.write(f"FAILED {location}: {error}")
+        self.stdout.write(json.dumps(report.as_dict(), indent=2))
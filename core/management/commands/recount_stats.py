@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the library totals shown on the lecture listing (lectures, "
+        "MB saved) from scratch, e.g. after editing lectures outside the ORM."
+    )
+
+    def handle(self, *args, **options):
+        from core import catalog
+
+        stats = catalog.recount_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats.lectures} lectures ({stats.processed} processed), "
+                f"{stats.saved_mb} MB saved ({stats.saved_percentage}%)."
+            )
+        )
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the full-text search index (LITELEARN_SEARCH_BACKEND) from the "
+        "lectures in the database, e.g. after an upgrade or a failed index update."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Empty the index first (drops lectures that no longer exist).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Lectures read from the database at a time (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+
+        from core import search
+        from core.models import Lecture
+
+        backend = search.get_backend()
+        if options["clear"]:
+            backend.clear()
+
+        lectures = Lecture.objects.only(
+            "title", "summary", "transcript", "segments_file"
+        ).order_by("pk")
+        start = time.perf_counter()
+        count = 0
+        # One transaction per batch: far fewer commits than one per lecture.
+        batch = []
+        for lecture in lectures.iterator(chunk_size=options["batch_size"]):
+            batch.append(lecture)
+            if len(batch) >= options["batch_size"]:
+                with transaction.atomic():
+                    for item in batch:
+                        backend.index_lecture(item)
+                count += len(batch)
+                batch = []
+                self.stdout.write(f"Indexed {count} lectures...")
+        with transaction.atomic():
+            for item in batch:
+                backend.index_lecture(item)
+        count += len(batch)
+
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {count} lectures in {elapsed:.1f}s ({rate:.0f}/s)."
+            )
+        )
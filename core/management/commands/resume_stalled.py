@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds running jobs whose worker stopped sending heartbeats (crashed, "
+        "killed, machine restarted) and queues them again. Each resumes after "
+        "its lecture's last completed pipeline stage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stall-seconds",
+            type=int,
+            default=settings.LITELEARN_JOB_STALL_SECONDS,
+            help="Silence after which a running job counts as stalled.",
+        )
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Also retry failed jobs whose lecture got partway through the pipeline.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list what would be resumed.",
+        )
+
+    def handle(self, *args, **options):
+        from core import jobs
+        from core.models import ProcessingJob
+
+        stalled = jobs.requeue_stalled(options["stall_seconds"], dry_run=options["dry_run"])
+        for job in stalled:
+            outcome = "queued" if job.attempts < job.max_attempts else "failed, no attempts left"
+            if options["dry_run"]:
+                outcome = f"would be {outcome}"
+            target = f"lecture {job.lecture_id}" if job.lecture_id else job.playlist_url
+            self.stdout.write(
+                f"Stalled: job {job.pk} ({target}) on {job.worker or '?'}, "
+                f"stage {job.stage or '-'}, attempt {job.attempts}/{job.max_attempts}: {outcome}"
+            )
+
+        retried = []
+        if options["failed"]:
+            # The newest job per lecture only: an older failure may have been retried already.
+            failed = (
+                ProcessingJob.objects.filter(status=ProcessingJob.FAILED, lecture__isnull=False)
+                .exclude(lecture__pipeline_stage__in=["", "render"])
+                .select_related("lecture")
+            )
+            for job in failed:
+                if job.lecture.jobs.filter(created_at__gt=job.created_at).exists():
+                    continue
+                self.stdout.write(
+                    f"Failed: job {job.pk} (lecture {job.lecture_id}), "
+                    f"done through {job.lecture.pipeline_stage}"
+                )
+                if not options["dry_run"]:
+                    jobs.enqueue(job.lecture, transcription=job.transcription)
+                retried.append(job)
+
+        verb = "Would resume" if options["dry_run"] else "Resumed"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {len(stalled)} stalled and {len(retried)} failed job(s).")
+        )
@@ -0,0 +1,106 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_entry(name, poll_interval, burst, warmup, preload):
+    # Under the "spawn" start method (Windows/macOS) the child starts from scratch,
+    # so Django has to be set up again before touching the ORM.
+    import django
+
+    django.setup()
+
+    from core import jobs, model_pool
+    from core.jobs import work
+
+    if preload:
+        # Already imported by the parent under "fork"; this only costs time under "spawn".
+        jobs.preload()
+    if warmup:
+        model_pool.warm_up()
+
+    work(worker_name=name, poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    help = "Runs a pool of local worker processes that execute queued lecture jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.LITELEARN_JOB_CONCURRENCY,
+            help="Maximum number of jobs processed at the same time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.LITELEARN_JOB_POLL_INTERVAL,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue has no runnable jobs left.",
+        )
+        parser.add_argument(
+            "--warmup",
+            action="store_true",
+            default=settings.LITELEARN_WHISPER_WARMUP,
+            help="Load the Whisper model in each worker before taking jobs.",
+        )
+        parser.add_argument(
+            "--no-preload",
+            action="store_false",
+            dest="preload",
+            help="Do not import the ML stack (LITELEARN_WORKER_PRELOAD) up front.",
+        )
+
+    def handle(self, *args, **options):
+        from core.jobs import default_worker_name, preload, requeue_stalled
+
+        concurrency = max(1, options["concurrency"])
+        base_name = default_worker_name()
+
+        # Jobs a crashed worker left running resume after their last checkpoint.
+        stalled = requeue_stalled()
+        if stalled:
+            self.stdout.write(f"Requeued {len(stalled)} stalled job(s).")
+
+        if options["preload"]:
+            timings = preload()
+            self.stdout.write(
+                f"Preloaded {len(timings)} module(s) in {sum(timings.values()):.1f}s."
+            )
+
+        # Never share a database connection across a fork.
+        connections.close_all()
+
+        workers = []
+        for i in range(concurrency):
+            process = multiprocessing.Process(
+                target=_worker_entry,
+                args=(
+                    f"{base_name}-{i}",
+                    options["poll_interval"],
+                    options["burst"],
+                    options["warmup"],
+                    options["preload"],
+                ),
+                daemon=False,
+            )
+            process.start()
+            workers.append(process)
+
+        self.stdout.write(f"Started {concurrency} worker(s). Press Ctrl+C to stop.")
+        try:
+            for process in workers:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+            for process in workers:
+                process.terminate()
+            for process in workers:
+                process.join()
@@ -1,24 +1,35 @@
 import os
 import subprocess
-import whisper
 import shutil
 import uuid
-import yt_dlp
-import google.generativeai as genai
-from dotenv import load_dotenv
-import markdown
+from dataclasses import dataclass, field
 
-load_dotenv()
+import numpy as np
+from django.conf import settings
 
-api_key = os.getenv("GEMINI_API_KEY")
+# Heavy dependencies (Whisper/torch, yt-dlp, Gemini) are imported by the stage
+# that needs them, so importing this module is cheap; see jobs.preload().
+from . import metrics, renditions, silence, transcription, youtube
+from .summarizer import MapReduceSummarizer, get_model
+
+
+@dataclass
+class EncodedAudio:
+    paths: dict  # rendition name -> encoded file
+    samples: np.ndarray  # 16 kHz float32 PCM of what was encoded (Whisper's input)
+    duration: float  # seconds of the source
+    time_map: list = field(default_factory=list)  # see core/silence.py; [] = untrimmed
+    trimmed_seconds: float = 0.0  # silence cut out of the renditions
+
+
+def _report(on_progress, stage, percent):
+    """Forwards pipeline progress to the caller (e.g. the job queue), if it asked."""
+    if on_progress is not None:
+        on_progress(stage, percent)
 
-if not api_key:
-    raise ValueError("No API key found. Please check your .env file.")
 
-# 3. Configure Gemini
-genai.configure(api_key=api_key)
 class ContentProcessor:
-    def __init__(self):
+    def __init__(self, whisper_model=None, transcription=None):
         # 1. Check if FFmpeg is actually visible to Python
         if not shutil.which("ffmpeg"):
             raise FileNotFoundError(
@@ -26,155 +37,278 @@ class ContentProcessor:
                 "Restart VS Code if you just installed it."
             )
 
-        print("Loading Whisper Model...")
-        # Use 'base' or 'tiny' for speed.
-        self.transcriber = whisper.load_model("base")
-        self.ai_model = genai.GenerativeModel("gemini-2.5-flash")
+        # Whisper models are loaded once per process and shared via model_pool.
+        # Use 'base' or 'tiny' for speed (None = LITELEARN_WHISPER_MODEL).
+        self.whisper_model = whisper_model
+        # Overrides of the transcription options (backend, model, threads,
+        # beam_size); the rest follow the settings and the lecture's length.
+        self.transcription = dict(transcription or {})
+        if whisper_model:
+            self.transcription["model"] = whisper_model
+        self.ai_model = get_model()
 
-    def generate_ai_summary(self, transcript_text):
-        """Sends transcript to Gemini for a structured summary."""
+    def generate_ai_summary(self, transcript_text, fallback=True):
+        """
+        Sends transcript to Gemini for a structured summary. Transcripts over the
+        token budget are summarized map-reduce style (see core/summarizer.py).
+        If Gemini fails, returns a transcript preview instead, or with
+        fallback=False raises (so a retry can ask again).
+        """
         print("Contacting Gemini API for summary...")
 
-        prompt = f"""
-        You are an expert academic tutor. 
-        Analyze the following lecture transcript and produce a concise study guide.
-        
-        Structure your response exactly like this:
-        **1. Core Subject:** (One sentence on what this is about)
-        **2. Key Concepts:** (3-5 bullet points of the most important ideas)
-        **3. Detailed Summary:** (A 2-paragraph explanation of the content)
-        
-        TRANSCRIPT:
-        {transcript_text}
-        """
+        import markdown
 
-        try:
-            response_text = self.ai_model.generate_content(prompt).text
-            html_text = markdown.markdown(response_text)
+        with metrics.stage("summarize") as sample:
+            sample.bytes_in = len(transcript_text.encode("utf-8"))
+            try:
+                response_text = MapReduceSummarizer(self.ai_model).summarize(transcript_text)
+                html_text = markdown.markdown(response_text)
+            except Exception as e:
+                print(f"Gemini API Error: {e}")
+                sample.ok = False
+                if not fallback:
+                    raise
+                # Fallback if API fails (no internet, quota limit, etc.)
+                return f"AI Summary Unavailable. Preview: {transcript_text[:500]}..."
+            sample.bytes_out = len(html_text.encode("utf-8"))
             return html_text
-        except Exception as e:
-            print(f"Gemini API Error: {e}")
-            # Fallback if API fails (no internet, quota limit, etc.)
-            return f"AI Summary Unavailable. Preview: {transcript_text[:500]}..."
 
-    def process_lecture(self, video_path, output_dir):
-        # 2. Generate a SAFE, short filename to avoid Windows 260 char limit errors
-        safe_id = str(uuid.uuid4())[:8]
-        filename = f"lecture_{safe_id}"
+    def transcription_options(self, audio):
+        """The TranscriptionOptions for `audio` (16 kHz samples)."""
+        return transcription.options_for(
+            len(audio) / transcription.SAMPLE_RATE, **self.transcription
+        )
+
+    def transcribe(self, audio, on_segments=None, time_map=None):
+        """
+        Transcribes with a pooled Whisper model, on the backend the options pick
+        (see core/asr.py). Long audio is split at silences and transcribed in
+        parallel (see core/transcription.py).
+        on_segments receives partial results as each window completes.
+        For trimmed audio, time_map moves timestamps back onto the original recording.
+        """
+        if time_map and on_segments is not None:
+            forward = on_segments
+
+            def on_segments(partial):
+                segments = silence.remap_segments(partial["segments"], time_map)
+                forward({**partial, "segments": segments})
 
-        audio_path = os.path.join(output_dir, f"{filename}.mp3")
+        with metrics.stage("transcribe") as sample:
+            sample.bytes_in = audio.nbytes
+            options = self.transcription_options(audio)
+            print(f"Transcribing with {options}")
+            result = transcription.transcribe(audio, options, on_segments)
+            sample.bytes_out = len(result["text"].encode("utf-8"))
+        return {**result, "segments": silence.remap_segments(result["segments"], time_map)}
 
-        # 3. Compress Audio
+    def _run_ffmpeg(self, source_path, paths, pcm=True, audio_filter=None):
+        """
+        One decode of the source, written to every rendition in `paths` and,
+        if pcm is set, to 16 kHz float PCM on stdout (returned as an array).
+        """
         # We use -y to overwrite if exists
-        command = [
-            "ffmpeg",
-            "-i",
-            video_path,
-            "-vn",
-            "-ac",
-            "1",
-            "-ab",
-            "32k",
-            "-ar",
-            "22050",
-            "-y",
-            audio_path,
-        ]
+        command = ["ffmpeg", "-i", source_path, "-y"]
+        # Outputs 1..n: distribution renditions
+        for spec in renditions.ladder():
+            if spec["name"] in paths:
+                command += renditions.ffmpeg_output_args(
+                    spec, paths[spec["name"]], audio_filter
+                )
+        # Last output: raw Whisper input, piped back to us
+        if pcm:
+            command += [
+                "-map",
+                "0:a:0",
+                "-ac",
+                "1",
+                "-ar",
+                str(transcription.SAMPLE_RATE),
+                "-f",
+                "f32le",
+                "-acodec",
+                "pcm_f32le",
+                "pipe:1",
+            ]
 
         try:
-            # We allow stdout/stderr to show in console so you can see if FFmpeg errors
-            subprocess.run(command, check=True)
+            # stderr still goes to the console so you can see if FFmpeg errors
+            proc = subprocess.run(command, stdout=subprocess.PIPE, check=True)
         except subprocess.CalledProcessError as e:
             print("FFmpeg failed to convert video.")
             raise e
 
-        # 4. Verify Audio File Exists and isn't empty
-        if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
-            raise FileNotFoundError(f"Audio file was not created: {audio_path}")
+        # 4. Verify Audio Files Exist and aren't empty
+        for path in paths.values():
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                raise FileNotFoundError(f"Audio file was not created: {path}")
 
-        # 5. Transcribe
-        print("Transcribing (this may take a moment)...")
-        try:
-            # fp16=False prevents warnings on CPU
-            result = self.transcriber.transcribe(audio_path, fp16=False)
-            full_text = result["text"]
-        except Exception as e:
-            print(f"Whisper crashed: {e}")
-            raise e
+        return np.frombuffer(proc.stdout, dtype=np.float32) if pcm else None
 
-        # 6. Generate Summary
-        summary = self.generate_ai_summary(full_text)
+    def encode_audio(self, source_path, base_path):
+        """
+        Writes one file per rendition in LITELEARN_AUDIO_RENDITIONS (named
+        `{base_path}_{name}.{ext}`) plus 16 kHz float PCM, which Whisper takes
+        directly as a NumPy array (no second decode of a lossy file).
 
-        # 7. Calculate Stats
-        new_size = os.path.getsize(audio_path)
+        Normally this is a single ffmpeg decode. With LITELEARN_TRIM_SILENCE the
+        pauses are found on the PCM first and cut out of the renditions in a
+        second pass, and Whisper gets the trimmed PCM (see core/silence.py).
+        """
+        with metrics.stage("encode") as sample:
+            sample.bytes_in = metrics.file_size(source_path)
+            encoded = self._encode(source_path, base_path)
+            sample.bytes_out = sum(metrics.file_size(p) for p in encoded.paths.values())
+        return encoded
 
-        return {
-            "title": filename,
-            "audio_url": audio_path,
-            "transcript": full_text,
-            "summary": summary,
-            "new_size_mb": round(new_size / (1024 * 1024), 2),
+    def _encode(self, source_path, base_path):
+        paths = {
+            spec["name"]: renditions.output_path(base_path, spec)
+            for spec in renditions.ladder()
         }
 
-    def process_youtube(self, url, output_dir):
-        # 1. Generate Safe Filename
+        if not settings.LITELEARN_TRIM_SILENCE:
+            samples = self._run_ffmpeg(source_path, paths)
+            duration = len(samples) / transcription.SAMPLE_RATE
+            return EncodedAudio(paths, samples, duration)
+
+        samples = self._run_ffmpeg(source_path, {})
+        duration = len(samples) / transcription.SAMPLE_RATE
+        time_map = silence.build_time_map(silence.keep_intervals(samples))
+        trimmed_seconds = round(duration - silence.trimmed_duration(time_map), 2)
+        if trimmed_seconds < 0.01:
+            # Nothing worth cutting
+            self._run_ffmpeg(source_path, paths, pcm=False)
+            return EncodedAudio(paths, samples, duration)
+
+        self._run_ffmpeg(
+            source_path, paths, pcm=False, audio_filter=silence.ffmpeg_filter(time_map)
+        )
+        print(
+            f"Trimmed {trimmed_seconds}s of silence "
+            f"({trimmed_seconds / duration:.0%} of {duration:.0f}s)."
+        )
+        return EncodedAudio(
+            paths, silence.apply(samples, time_map), duration, time_map, trimmed_seconds
+        )
+
+    def extract_audio(self, video_path, output_dir):
+        """Compresses a local video into the audio renditions; returns EncodedAudio."""
+        # 2. Generate a SAFE, short filename to avoid Windows 260 char limit errors
         safe_id = str(uuid.uuid4())[:8]
-        filename = f"yt_lecture_{safe_id}"
-        audio_path = os.path.join(output_dir, f"{filename}.mp3")
+        filename = f"lecture_{safe_id}"
+
+        # 3. Compress Audio (and decode for Whisper in the same ffmpeg run)
+        return self.encode_audio(video_path, os.path.join(output_dir, filename))
+
+    def fetch_youtube(self, url, output_dir, video=None, downloader=None):
+        """
+        Downloads a YouTube video's audio as-is; returns (path, meta).
+        `video` is its prefetched youtube.VideoInfo, if the caller has one, and
+        `downloader` replaces youtube.download_audio (e.g. a DownloadQueue's).
+        """
+        # 1. Metadata first: over-long videos are rejected before any download
+        if video is None:
+            video = youtube.fetch_metadata(url)
+        meta = {"title": video.title, "duration": video.duration}
 
+        # 2. Download the smallest sufficient audio stream as-is; encode_audio
+        # does the conversion and the Whisper decode in one pass.
         print(f"Downloading Audio from YouTube: {url}")
+        try:
+            with metrics.stage("download") as sample:
+                source_path = (downloader or youtube.download_audio)(video, output_dir)
+                sample.bytes_out = metrics.file_size(source_path)
+        except Exception as e:
+            print(f"YouTube Download Error: {e}")
+            raise e
+        return source_path, meta
 
-        # 2. Configure yt-dlp options
-        ydl_opts = {
-            "format": "bestaudio/best",
-            "outtmpl": os.path.join(output_dir, f"{filename}.%(ext)s"),
-            "postprocessors": [
+    def download_youtube(self, url, output_dir, video=None, downloader=None):
+        """Downloads and compresses a YouTube video's audio; returns (EncodedAudio, meta)."""
+        source_path, meta = self.fetch_youtube(url, output_dir, video, downloader)
+        filename = f"yt_lecture_{str(uuid.uuid4())[:8]}"
+
+        # 3. Compress + decode, then drop the download. If encoding fails it is
+        # kept, so the retry starts from the downloaded file.
+        encoded = self.encode_audio(source_path, os.path.join(output_dir, filename))
+        os.remove(source_path)
+        return encoded, meta
+
+    @staticmethod
+    def rendition_ladder(paths):
+        """What store_renditions records for each encoded file in `paths`."""
+        ladder = []
+        for spec in renditions.ladder():
+            path = paths[spec["name"]]
+            ladder.append(
                 {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "32",  # Low bandwidth target
+                    "name": spec["name"],
+                    "codec": spec["codec"],
+                    "bitrate_kbps": spec["bitrate"],
+                    "mime_type": spec["mime_type"],
+                    "path": path,
+                    "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
                 }
-            ],
-            "quiet": True,
+            )
+        return ladder
+
+    @staticmethod
+    def build_result(title, encoded, result, summary):
+        ladder = ContentProcessor.rendition_ladder(encoded.paths)
+        default = next(r for r in ladder if r["name"] == renditions.default_name())
+        return {
+            "title": title,
+            "audio_url": default["path"],
+            "renditions": ladder,
+            "transcript": result["text"],
+            "segments": result["segments"],
+            "summary": summary,
+            "new_size_mb": default["size_mb"],
+            "duration_seconds": round(encoded.duration, 2),
+            "trimmed_seconds": encoded.trimmed_seconds,
+            "time_map": encoded.time_map,
         }
 
-        # 3. Download
-        meta = {}
+    def process_lecture(
+        self, video_path, output_dir, on_progress=None, on_segments=None
+    ):
+        _report(on_progress, "extract", 10)
+        encoded = self.extract_audio(video_path, output_dir)
+
+        # 5. Transcribe
+        _report(on_progress, "transcribe", 30)
+        print("Transcribing (this may take a moment)...")
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                meta["title"] = info.get("title", "Unknown Title")
-                meta["duration"] = info.get("duration", 0)
-                # yt-dlp might save as .mp3 directly depending on codec,
-                # but we enforced conversion. Let's ensure path is correct.
-                # Sometimes it saves as filename.mp3, check existence:
-                if not os.path.exists(audio_path):
-                    # Fallback check if it saved with a different extension
-                    pass
+            result = self.transcribe(encoded.samples, on_segments, encoded.time_map)
         except Exception as e:
-            print(f"YouTube Download Error: {e}")
+            print(f"Whisper crashed: {e}")
             raise e
 
-        # 4. Transcribe (Reuse the existing logic logic, but easier)
-        # Verify file existence first
-        if not os.path.exists(audio_path):
-            raise FileNotFoundError(f"YouTube audio download failed for {audio_path}")
+        # 6. Generate Summary
+        _report(on_progress, "summarize", 80)
+        summary = self.generate_ai_summary(result["text"])
+
+        # 7. Calculate Stats
+        title = os.path.splitext(os.path.basename(video_path))[0]
+        return self.build_result(title, encoded, result, summary)
+
+    def process_youtube(
+        self, url, output_dir, on_progress=None, on_segments=None, video=None
+    ):
+        _report(on_progress, "download", 10)
+        encoded, meta = self.download_youtube(url, output_dir, video)
 
+        _report(on_progress, "transcribe", 30)
         print("Transcribing YouTube Audio...")
-        result = self.transcriber.transcribe(audio_path, fp16=False)
-        full_text = result["text"]
+        result = self.transcribe(encoded.samples, on_segments, encoded.time_map)
 
         # 5. Summary & Stats
-        summary = self.generate_ai_summary(full_text)
-        new_size = os.path.getsize(audio_path)
+        _report(on_progress, "summarize", 80)
+        summary = self.generate_ai_summary(result["text"])
 
-        return {
-            "title": meta["title"],  # Return the real YouTube title
-            "audio_url": audio_path,
-            "transcript": full_text,
-            "summary": summary,
-            "new_size_mb": round(new_size / (1024 * 1024), 2),
-        }
+        # Return the real YouTube title
+        return self.build_result(meta["title"], encoded, result, summary)
 
 
 # --- Example Usage (If running locally) ---
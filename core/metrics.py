@@ -0,0 +1,392 @@
+"""
+Per-stage instrumentation of the media pipeline.
+
+Every ContentProcessor stage (download, encode, transcribe, summarize) and
+finalize_lecture run inside `stage(name)`. That records wall time, CPU time
+(this process plus finished child processes such as ffmpeg), peak resident
+memory and the bytes the stage read and wrote. A run collects its stages with
+`recording()`, and the job queue stores them as StageMetric rows. From those
+rows come the Prometheus text at /metrics and the p50/p95 table in the admin.
+Each stage is also logged at DEBUG level on the "core.metrics" logger.
+
+CPU time and peak memory are process-wide: Whisper and ffmpeg do their work in
+native threads and child processes that per-thread counters cannot see. When
+several lectures run at once (BatchIngestor threads), a stage's figures include
+whatever the others did meanwhile; only wall time and bytes are its own.
+
+A single job can also be profiled (ProcessingJob.profile), with cProfile or,
+if installed, pyinstrument (LITELEARN_PROFILER).
+"""
+
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory figures
+    resource = None
+
+STAGES = ["download", "encode", "transcribe", "summarize", "finalize"]
+QUANTILES = (0.5, 0.95)
+
+_current = contextvars.ContextVar("litelearn_metrics_recorder", default=None)
+
+logger = logging.getLogger(__name__)
+
+# Stages running in this process right now (see _stage_started).
+_active_stages = 0
+_active_lock = threading.Lock()
+
+
+@dataclass
+class StageSample:
+    stage: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    ok: bool = True
+
+
+@dataclass
+class Recorder:
+    samples: list = field(default_factory=list)
+
+
+# --- Measuring ------------------------------------------------------------
+
+
+def _cpu_seconds():
+    t = os.times()
+    # Children only count once they have been waited for (subprocess.run does).
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its high-water mark, which gives a per-stage peak.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _stage_started():
+    global _active_stages
+    with _active_lock:
+        _active_stages += 1
+        alone = _active_stages == 1
+    # Resetting while another stage runs would lose that stage's peak so far.
+    if alone:
+        _reset_peak_rss()
+
+
+def _stage_finished():
+    global _active_stages
+    with _active_lock:
+        _active_stages -= 1
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    # Elsewhere: the peak over the process lifetime (bytes on macOS, KiB on Linux)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def recording():
+    """Collects the stages run inside the block (per thread / task)."""
+    recorder = Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times the block as pipeline stage `name`. Yields the StageSample so the
+    caller can fill in bytes_in / bytes_out. Exceptions mark the stage failed.
+    """
+    sample = StageSample(name)
+    _stage_started()
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    try:
+        yield sample
+    except BaseException:
+        sample.ok = False
+        raise
+    finally:
+        sample.wall_seconds = round(time.perf_counter() - wall_start, 3)
+        sample.cpu_seconds = round(_cpu_seconds() - cpu_start, 3)
+        sample.peak_rss_mb = _peak_rss_mb()
+        _stage_finished()
+        recorder = _current.get()
+        if recorder is not None:
+            recorder.samples.append(sample)
+        logger.debug(
+            "stage %s ok=%s wall=%ss cpu=%ss peak_rss=%sMB in=%s out=%s",
+            name,
+            sample.ok,
+            sample.wall_seconds,
+            sample.cpu_seconds,
+            sample.peak_rss_mb,
+            sample.bytes_in,
+            sample.bytes_out,
+        )
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def save(recorder, lecture=None, job=None):
+    """Stores a run's stages as StageMetric rows. Never fatal to the run itself."""
+    from .models import StageMetric
+
+    try:
+        StageMetric.objects.bulk_create(
+            StageMetric(lecture=lecture, job=job, **asdict(sample))
+            for sample in recorder.samples
+        )
+    except Exception as e:
+        logger.warning(
+            "Saving stage metrics failed for lecture %s: %s", getattr(lecture, "pk", None), e
+        )
+
+
+# --- Profiling a job -------------------------------------------------------
+
+
+def profile_base(job):
+    """Path (no extension) of a job attempt's profile."""
+    return os.path.join(
+        settings.LITELEARN_PROFILE_DIR, f"job_{job.pk}_attempt_{job.attempts}"
+    )
+
+
+@contextmanager
+def profiled(base_path):
+    """
+    Profiles the block. cProfile writes base.prof (for snakeviz / pstats)
+    plus base.txt with the top functions; pyinstrument writes base.html.
+    """
+    os.makedirs(os.path.dirname(base_path), exist_ok=True)
+    if settings.LITELEARN_PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; using cProfile instead.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{base_path}.html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{base_path}.prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(50)
+        with open(f"{base_path}.txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+
+
+def profile_files(job):
+    """Profiles captured for any attempt of `job`."""
+    directory = settings.LITELEARN_PROFILE_DIR
+    prefix = f"job_{job.pk}_attempt_"
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.join(directory, n) for n in names if n.startswith(prefix))
+
+
+# --- Reporting --------------------------------------------------------------
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def stage_summary(since=None):
+    """
+    Per stage over the recent window (LITELEARN_METRICS_WINDOW_HOURS): run and
+    failure counts, p50/p95 wall and CPU seconds, the worst peak memory and bytes.
+    """
+    from .models import StageMetric
+
+    if since is None:
+        since = timezone.now() - timedelta(hours=settings.LITELEARN_METRICS_WINDOW_HOURS)
+    rows = StageMetric.objects.filter(created_at__gte=since).values_list(
+        "stage", "wall_seconds", "cpu_seconds", "peak_rss_mb", "bytes_in", "bytes_out", "ok"
+    )
+    by_stage = defaultdict(list)
+    for row in rows:
+        by_stage[row[0]].append(row[1:])
+
+    summary = []
+    for name in sorted(by_stage, key=lambda s: (STAGES + [s]).index(s)):
+        runs = by_stage[name]
+        wall = sorted(r[0] for r in runs)
+        cpu = sorted(r[1] for r in runs)
+        summary.append(
+            {
+                "stage": name,
+                "runs": len(runs),
+                "failures": sum(1 for r in runs if not r[5]),
+                "wall_p50": percentile(wall, 0.5),
+                "wall_p95": percentile(wall, 0.95),
+                "cpu_p50": percentile(cpu, 0.5),
+                "cpu_p95": percentile(cpu, 0.95),
+                "peak_rss_mb_max": max(r[2] for r in runs),
+                "bytes_in": sum(r[3] for r in runs),
+                "bytes_out": sum(r[4] for r in runs),
+            }
+        )
+    return summary
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def prometheus_text():
+    """The metrics in Prometheus text exposition format (version 0.0.4)."""
+    from .models import ProcessingJob, StageMetric
+
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{{{labels}}} {value}")
+
+    # Quantiles over the recent window; _sum/_count are all-time, as Prometheus expects.
+    recent = stage_summary()
+    totals = {
+        row["stage"]: row
+        for row in StageMetric.objects.values("stage").annotate(
+            count=Count("id"),
+            wall=Sum("wall_seconds"),
+            cpu=Sum("cpu_seconds"),
+            bytes_in=Sum("bytes_in"),
+            bytes_out=Sum("bytes_out"),
+            peak=Max("peak_rss_mb"),
+        )
+    }
+    failures = dict(
+        StageMetric.objects.filter(ok=False)
+        .values("stage")
+        .annotate(n=Count("id"))
+        .values_list("stage", "n")
+    )
+
+    for name, key, help_text in (
+        ("litelearn_stage_duration_seconds", "wall", "Wall-clock time per pipeline stage."),
+        ("litelearn_stage_cpu_seconds", "cpu", "Process CPU time during each pipeline stage."),
+    ):
+        samples = []
+        for row in recent:
+            for q in QUANTILES:
+                value = row[f"{key}_p{int(q * 100)}"]
+                samples.append(("", _labels(stage=row["stage"], quantile=q), value))
+        for stage_name, row in totals.items():
+            samples.append(("_sum", _labels(stage=stage_name), round(row[key], 3)))
+            samples.append(("_count", _labels(stage=stage_name), row["count"]))
+        metric(name, "summary", help_text, samples)
+
+    metric(
+        "litelearn_stage_failures_total",
+        "counter",
+        "Pipeline stage runs that raised.",
+        [("", _labels(stage=s), failures.get(s, 0)) for s in totals],
+    )
+    for name, key, help_text in (
+        ("litelearn_stage_input_bytes_total", "bytes_in", "Bytes read by each stage."),
+        ("litelearn_stage_output_bytes_total", "bytes_out", "Bytes written by each stage."),
+    ):
+        metric(
+            name,
+            "counter",
+            help_text,
+            [("", _labels(stage=s), row[key]) for s, row in totals.items()],
+        )
+    metric(
+        "litelearn_stage_peak_rss_megabytes",
+        "gauge",
+        "Highest process resident memory seen during each stage.",
+        [("", _labels(stage=s), row["peak"]) for s, row in totals.items()],
+    )
+
+    # Where running jobs are right now, and for how long: what on-call looks at first.
+    jobs = dict(
+        ProcessingJob.objects.values("status")
+        .annotate(n=Count("id"))
+        .values_list("status", "n")
+    )
+    metric(
+        "litelearn_jobs",
+        "gauge",
+        "Processing jobs by status.",
+        [("", _labels(status=s), jobs.get(s, 0)) for s, _ in ProcessingJob.STATUS_CHOICES],
+    )
+    now = timezone.now()
+    oldest = defaultdict(float)
+    for job_stage, started in ProcessingJob.objects.filter(
+        status=ProcessingJob.RUNNING, started_at__isnull=False
+    ).values_list("stage", "started_at"):
+        job_stage = job_stage or "starting"
+        oldest[job_stage] = max(oldest[job_stage], (now - started).total_seconds())
+    metric(
+        "litelearn_running_job_age_seconds",
+        "gauge",
+        "Age of the oldest running job, by the stage it reports.",
+        [("", _labels(stage=s), round(age, 1)) for s, age in oldest.items()],
+    )
+    return "\n".join(lines) + "\n"
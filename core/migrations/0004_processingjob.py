@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-02-02 10:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_lecture_original_video'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('stage', models.CharField(blank=True, max_length=32)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('error', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.lecture')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
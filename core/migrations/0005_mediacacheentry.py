@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-02-09 18:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_processingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(max_length=100, unique=True)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('original_video', models.FileField(blank=True, null=True, upload_to='videos/')),
+                ('processed_audio', models.FileField(upload_to='audio/')),
+                ('transcript', models.TextField(blank=True)),
+                ('summary', models.TextField(blank=True)),
+                ('original_size_mb', models.FloatField(default=0)),
+                ('new_size_mb', models.FloatField(default=0)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'media cache entries',
+            },
+        ),
+    ]
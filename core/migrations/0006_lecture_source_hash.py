@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-02-14 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mediacacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='source_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-02-21 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_lecture_source_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='segments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='segments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
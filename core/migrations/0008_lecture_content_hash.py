@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-02-26 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_lecture_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
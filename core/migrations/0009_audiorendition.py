@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-03-02 10:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_lecture_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('codec', models.CharField(max_length=32)),
+                ('bitrate_kbps', models.PositiveIntegerField()),
+                ('mime_type', models.CharField(max_length=64)),
+                ('file', models.FileField(upload_to='audio/')),
+                ('size_mb', models.FloatField(default=0)),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='core.lecture')),
+            ],
+            options={
+                'ordering': ['bitrate_kbps'],
+                'constraints': [models.UniqueConstraint(fields=('lecture', 'name'), name='unique_rendition_per_lecture')],
+            },
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-03-09 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_audiorendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='duration_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='trimmed_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='time_map',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='duration_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='trimmed_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='time_map',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 6.0.1 on 2026-03-14 10:05
+
+import os
+import struct
+import uuid
+
+from django.db import migrations, models
+
+# A frozen copy of version 1 of the core.segment_store file format, so this
+# migration keeps working whatever later happens to that module.
+MAGIC = b'LLSG'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+BLOCK_HEADER = struct.Struct('<IIII')
+BLOCK_SEGMENTS = 256
+
+
+def _ms(seconds):
+    return max(0, int(round(seconds * 1000)))
+
+
+def _encode_block(segments):
+    texts = [segment['text'].encode('utf-8') for segment in segments]
+    starts = [_ms(s['start']) for s in segments]
+    ends = [_ms(s['end']) for s in segments]
+    logprobs = [s.get('avg_logprob', 0.0) for s in segments]
+    text_ends = []
+    for text in texts:
+        text_ends.append((text_ends[-1] if text_ends else 0) + len(text))
+    blob = b''.join(texts)
+    n = len(segments)
+    return b''.join([
+        BLOCK_HEADER.pack(n, len(blob), starts[0], ends[-1]),
+        struct.pack(f'<{n}I', *starts),
+        struct.pack(f'<{n}I', *ends),
+        struct.pack(f'<{n}e', *logprobs),
+        struct.pack(f'<{n}I', *text_ends),
+        blob,
+    ])
+
+
+def write_segments(path, segments):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+        for i in range(0, len(segments), BLOCK_SEGMENTS):
+            f.write(_encode_block(segments[i:i + BLOCK_SEGMENTS]))
+
+
+def read_segments(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, _ = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a segment store (version {VERSION})')
+    segments = []
+    position = FILE_HEADER.size
+    while position + BLOCK_HEADER.size <= len(data):
+        n, text_bytes, _, _ = BLOCK_HEADER.unpack_from(data, position)
+        end = position + BLOCK_HEADER.size + 14 * n + text_bytes
+        if end > len(data):
+            break  # torn append
+        offset = position + BLOCK_HEADER.size
+        starts = struct.unpack_from(f'<{n}I', data, offset)
+        ends = struct.unpack_from(f'<{n}I', data, offset + 4 * n)
+        logprobs = struct.unpack_from(f'<{n}e', data, offset + 8 * n)
+        text_ends = struct.unpack_from(f'<{n}I', data, offset + 10 * n)
+        blob = data[offset + 14 * n:end]
+        text_start = 0
+        for start, stop, logprob, text_end in zip(starts, ends, logprobs, text_ends):
+            segments.append({
+                'start': start / 1000,
+                'end': stop / 1000,
+                'text': blob[text_start:text_end].decode('utf-8'),
+                'avg_logprob': round(logprob, 3),
+            })
+            text_start = text_end
+        position = end
+    return segments
+
+
+def _write_sidecar(obj, prefix):
+    field = obj._meta.get_field('segments_file')
+    filename = f'{prefix}_{obj.pk}_{uuid.uuid4().hex[:12]}.lseg'
+    name = field.generate_filename(obj, filename)
+    write_segments(field.storage.path(name), obj.segments)
+    obj.segments_file.name = name
+    obj.segment_count = len(obj.segments)
+    obj.save(update_fields=['segments_file', 'segment_count'])
+
+
+def json_to_sidecar(apps, schema_editor):
+    for model_name, prefix in (('Lecture', 'lecture'), ('MediaCacheEntry', 'cache')):
+        model = apps.get_model('core', model_name)
+        for obj in model.objects.only('segments').iterator():
+            if obj.segments:
+                _write_sidecar(obj, prefix)
+
+
+def sidecar_to_json(apps, schema_editor):
+    for model_name in ('Lecture', 'MediaCacheEntry'):
+        model = apps.get_model('core', model_name)
+        for obj in model.objects.exclude(segments_file='').exclude(segments_file=None):
+            obj.segments = read_segments(obj.segments_file.path)
+            obj.save(update_fields=['segments'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lecture_silence_trimming'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='segments_file',
+            field=models.FileField(blank=True, null=True, upload_to='transcripts/'),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='segment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='segments_file',
+            field=models.FileField(blank=True, null=True, upload_to='transcripts/'),
+        ),
+        migrations.AddField(
+            model_name='mediacacheentry',
+            name='segment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(json_to_sidecar, sidecar_to_json),
+        migrations.RemoveField(
+            model_name='lecture',
+            name='segments',
+        ),
+        migrations.RemoveField(
+            model_name='mediacacheentry',
+            name='segments',
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-03-16 09:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_segment_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='profile',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='StageMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=32)),
+                ('wall_seconds', models.FloatField(default=0)),
+                ('cpu_seconds', models.FloatField(default=0)),
+                ('peak_rss_mb', models.FloatField(default=0)),
+                ('bytes_in', models.BigIntegerField(default=0)),
+                ('bytes_out', models.BigIntegerField(default=0)),
+                ('ok', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stage_metrics', to='core.processingjob')),
+                ('lecture', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stage_metrics', to='core.lecture')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['stage', 'created_at'], name='stagemetric_stage_created')],
+            },
+        ),
+    ]
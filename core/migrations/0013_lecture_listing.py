@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-03-17 14:12
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def count_library(apps, schema_editor):
+    Lecture = apps.get_model('core', 'Lecture')
+    LibraryStats = apps.get_model('core', 'LibraryStats')
+    processed = Lecture.objects.filter(original_size_mb__gt=0, new_size_mb__gt=0)
+    totals = processed.aggregate(original=Sum('original_size_mb'), new=Sum('new_size_mb'))
+    LibraryStats.objects.update_or_create(
+        pk=1,
+        defaults={
+            'lectures': Lecture.objects.count(),
+            'processed': processed.count(),
+            'original_mb': totals['original'] or 0.0,
+            'compressed_mb': totals['new'] or 0.0,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_stage_metrics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lecture',
+            name='youtube_url',
+            field=models.URLField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['created_at', 'id'], name='lecture_created_id'),
+        ),
+        migrations.CreateModel(
+            name='LibraryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lectures', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('original_mb', models.FloatField(default=0)),
+                ('compressed_mb', models.FloatField(default=0)),
+                ('list_version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'library stats',
+            },
+        ),
+        migrations.RunPython(count_library, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-03-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_lecture_listing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='transcription',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
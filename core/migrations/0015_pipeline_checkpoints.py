@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-03-19 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_processingjob_transcription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='pipeline_stage',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='processingjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
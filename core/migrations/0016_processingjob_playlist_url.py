@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-03-20 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_pipeline_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='processingjob',
+            name='lecture',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.lecture'),
+        ),
+        migrations.AddField(
+            model_name='processingjob',
+            name='playlist_url',
+            field=models.URLField(blank=True),
+        ),
+    ]
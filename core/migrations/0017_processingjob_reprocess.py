@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-03-20 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_processingjob_playlist_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='reprocess',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-03-20 14:05
+
+from django.db import DatabaseError, migrations, transaction
+
+# Prefix indexes keep short prefix queries ("gr*") from expanding term by term.
+FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+CREATE_TABLES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_lecture "
+    f"USING fts5(title, summary, transcript, {FTS_OPTIONS})",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_segment "
+    f"USING fts5(text, start UNINDEXED, end UNINDEXED, {FTS_OPTIONS})",
+]
+
+
+def create_search_tables(apps, schema_editor):
+    # The FTS5 index of core.search.SQLiteFTSBackend; other databases use another backend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for sql in CREATE_TABLES:
+                schema_editor.execute(sql)
+    except DatabaseError as e:
+        print(
+            f"\n  Skipping the search tables ({e}): this SQLite has no FTS5. "
+            "Set LITELEARN_SEARCH_BACKEND = 'core.search.SimpleBackend'."
+        )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS search_segment")
+    schema_editor.execute("DROP TABLE IF EXISTS search_lecture")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_processingjob_reprocess'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,145 @@
+"""
+Process-wide registry of loaded Whisper models.
+
+Loading a Whisper model takes seconds and hundreds of MB, so each worker process
+loads a given model size at most `LITELEARN_WHISPER_POOL_SIZE` times and hands the
+copies out through a bounded pool: N concurrent transcriptions share K models.
+There is one pool per (backend, model, threads); see core/asr.py.
+"""
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0  # acquired an already-loaded model
+    misses: int = 0  # had to load a new model
+    waits: int = 0  # all models were busy, had to wait for one
+    load_seconds: float = 0.0
+
+
+def _load_whisper(name):
+    from . import asr
+
+    return asr.get_backend("whisper").load(name)
+
+
+class ModelPool:
+    """A bounded pool of up to `size` loaded copies of one model."""
+
+    def __init__(self, name, size=1, loader=_load_whisper, label=None):
+        self.name = name
+        self.label = label or name
+        self.size = max(1, size)
+        self._loader = loader
+        self._idle = []  # most recently returned last
+        self._loaded = 0  # loaded or being loaded
+        self._lock = threading.Lock()
+        # Signalled when a model is returned, or a failed load frees its slot.
+        self._changed = threading.Condition(self._lock)
+        self.stats = PoolStats()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            model = self._loader(self.name)
+        except Exception:
+            with self._changed:
+                self._loaded -= 1
+                # Someone waiting for a model can try loading it instead.
+                self._changed.notify()
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.load_seconds += elapsed
+        logger.info("Loaded Whisper model '%s' in %.1fs", self.label, elapsed)
+        return model
+
+    def get(self, timeout=None):
+        """
+        Takes a model out of the pool, loading one if the pool is not full yet.
+        Raises queue.Empty if none is free within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            if not self._idle and self._loaded >= self.size:
+                self.stats.waits += 1
+            while not self._idle and self._loaded >= self.size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._changed.wait(remaining)
+            if self._idle:
+                self.stats.hits += 1
+                return self._idle.pop()
+            self._loaded += 1
+        return self._load()
+
+    def put(self, model):
+        with self._changed:
+            self._idle.append(model)
+            self._changed.notify()
+
+    @contextmanager
+    def model(self, timeout=None):
+        model = self.get(timeout=timeout)
+        try:
+            yield model
+        finally:
+            self.put(model)
+
+    def warm_up(self):
+        """Loads one copy up front so the first request does not pay for it."""
+        with self.model():
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name=None, backend=None, threads=0):
+    from . import asr
+
+    name = name or settings.LITELEARN_WHISPER_MODEL
+    backend = backend or settings.LITELEARN_TRANSCRIPTION_BACKEND
+    key = (backend, name, threads)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            engine = asr.get_backend(backend)
+            pool = _pools[key] = ModelPool(
+                name,
+                settings.LITELEARN_WHISPER_POOL_SIZE,
+                loader=lambda model_name: engine.load(model_name, threads),
+                label=f"{backend}:{name}",
+            )
+    return pool
+
+
+def acquire(name=None, timeout=None, backend=None, threads=0):
+    """Context manager yielding a loaded Whisper model, e.g. `with acquire() as m:`."""
+    return get_pool(name, backend, threads).model(timeout=timeout)
+
+
+def warm_up(names=None, backend=None):
+    threads = settings.LITELEARN_TRANSCRIBE_THREADS
+    for name in names or [settings.LITELEARN_WHISPER_MODEL]:
+        get_pool(name, backend, threads).warm_up()
+
+
+def stats():
+    """Counters for every pool in this process, keyed by "backend:model"."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.label: asdict(pool.stats) for pool in pools}
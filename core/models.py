@@ -1,25 +1,58 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 import os
+import uuid
 
 
 class Lecture(models.Model):
     title = models.CharField(max_length=200, blank=True)
-    youtube_url = models.URLField(blank=True, null=True)
+    youtube_url = models.URLField(blank=True, null=True, db_index=True)
     # The heavy original video
     original_video = models.FileField(upload_to="videos/", blank=True, null=True)
 
     # The processed lightweight assets (initially blank)
     processed_audio = models.FileField(upload_to="audio/", blank=True, null=True)
     transcript = models.TextField(blank=True)
+    # Whisper segments (start, end, text, avg_logprob) in a compact sidecar file,
+    # appended to while transcribing (see segment_store.py)
+    segments_file = models.FileField(upload_to="transcripts/", blank=True, null=True)
+    segment_count = models.PositiveIntegerField(default=0)
     summary = models.TextField(blank=True)
 
+    # SHA-256 of the uploaded video, computed while it streamed in (see dedup.py)
+    source_hash = models.CharField(max_length=64, blank=True)
+
     # Impact Metrics (to show off to judges)
     original_size_mb = models.FloatField(default=0)
     new_size_mb = models.FloatField(default=0)
 
+    # Silence trimming (see silence.py): source length, seconds cut out, and the
+    # map from the trimmed audio's timeline to the original's
+    duration_seconds = models.FloatField(default=0)
+    trimmed_seconds = models.FloatField(default=0)
+    time_map = models.JSONField(default=list, blank=True)
+
+    # Hash of everything the PDF shows; keys the rendered-PDF cache (see pdf_cache.py)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    # Last completed stage of the job pipeline and what the next stage needs
+    # (file paths, cache key), so retries resume there (see pipeline.py)
+    pipeline_stage = models.CharField(max_length=16, blank=True)
+    checkpoint = models.JSONField(default=dict, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pagination of the listing (see catalog.py)
+        indexes = [models.Index(fields=["created_at", "id"], name="lecture_created_id")]
+
     def save(self, *args, **kwargs):
+        from . import catalog
+        from .bundle import invalidate_lecture
+        from .pdf_cache import compute_content_hash, invalidate
+
         if self.original_video and not self.original_size_mb:
             try:
                 self.original_size_mb = round(
@@ -27,8 +60,32 @@ class Lecture(models.Model):
                 )
             except:
                 pass
+
+        # The sizes as stored, so the library totals can be adjusted by the difference
+        created = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        old_sizes = None
+        if not created and (
+            update_fields is None
+            or {"original_size_mb", "new_size_mb"} & set(update_fields)
+        ):
+            old_sizes = (
+                Lecture.objects.filter(pk=self.pk)
+                .values_list("original_size_mb", "new_size_mb")
+                .first()
+            )
+
+        old_hash = self.content_hash
+        self.content_hash = compute_content_hash(self)
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "content_hash"}
         super().save(*args, **kwargs)
 
+        if old_hash and old_hash != self.content_hash:
+            invalidate(self)
+            invalidate_lecture(self.pk)
+        catalog.lecture_saved(self, old_sizes, created)
+
     def __str__(self):
         return self.title
 
@@ -40,3 +97,302 @@ class Lecture(models.Model):
             ) * 100
             return round(saved, 1)
         return 0
+
+    @property
+    def trimmed_percentage(self):
+        if self.duration_seconds > 0:
+            return round(self.trimmed_seconds / self.duration_seconds * 100, 1)
+        return 0
+
+    # --- Segments (the callers save) ---
+
+    def load_segments(self, start=0, stop=None):
+        """Segments [start:stop], without reading the rest of the file."""
+        from . import segment_store
+
+        if not self.segments_file:
+            return []
+        return segment_store.read(self.segments_file.path, start, stop)
+
+    def segments_between(self, start_seconds, end_seconds):
+        """Segments overlapping [start_seconds, end_seconds), original timeline."""
+        from . import segment_store
+
+        if not self.segments_file:
+            return []
+        return segment_store.read_between(
+            self.segments_file.path, start_seconds, end_seconds
+        )
+
+    def iter_segments(self):
+        """All segments in order, read block by block."""
+        from . import segment_store
+
+        if self.segments_file:
+            yield from segment_store.iter_segments(self.segments_file.path)
+
+    def set_segments_file(self, name, count):
+        """Switches to another segment file, deleting the old one if unshared."""
+        old_name = self.segments_file.name if self.segments_file else None
+        self.segments_file.name = name
+        self.segment_count = count
+        if old_name and old_name != name:
+            shared = (
+                Lecture.objects.filter(segments_file=old_name)
+                .exclude(pk=self.pk)
+                .exists()
+                or MediaCacheEntry.objects.filter(segments_file=old_name).exists()
+            )
+            if not shared:
+                self.segments_file.storage.delete(old_name)
+
+    def replace_segments(self, segments):
+        """
+        Writes `segments` to a new file. Files are never rewritten in place, so
+        the dedup cache can share them and the name doubles as a version.
+        """
+        from . import segment_store
+
+        field = self.segments_file.field
+        name = field.generate_filename(
+            self, f"lecture_{self.pk}_{uuid.uuid4().hex[:12]}.lseg"
+        )
+        segment_store.write(field.storage.path(name), segments)
+        self.set_segments_file(name, len(segments))
+
+    def append_segments(self, segments):
+        """Adds a window of segments to the end (used while transcribing)."""
+        from . import segment_store
+
+        if not self.segments_file:
+            self.replace_segments([])
+        segment_store.append(self.segments_file.path, segments)
+        self.segment_count += len(segments)
+
+
+class AudioRendition(models.Model):
+    """One encoding of a lecture's audio (see core/renditions.py)."""
+
+    lecture = models.ForeignKey(
+        Lecture, on_delete=models.CASCADE, related_name="renditions"
+    )
+    name = models.CharField(max_length=32)
+    codec = models.CharField(max_length=32)
+    bitrate_kbps = models.PositiveIntegerField()
+    mime_type = models.CharField(max_length=64)
+    file = models.FileField(upload_to="audio/")
+    size_mb = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ["bitrate_kbps"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lecture", "name"], name="unique_rendition_per_lecture"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.lecture} ({self.name})"
+
+    @property
+    def trimmed_mb(self):
+        """Download size saved by cutting the lecture's silences from this rendition."""
+        saved_bytes = self.lecture.trimmed_seconds * self.bitrate_kbps * 1000 / 8
+        return round(saved_bytes / (1024 * 1024), 2)
+
+    @property
+    def stream_url(self):
+        """Byte-range URL for the player (see core/audio_streaming.py)."""
+        from .audio_streaming import stream_url
+
+        return stream_url(self)
+
+    @property
+    def playlist_url(self):
+        """HLS playlist of this rendition's segments; None if it has none."""
+        from .audio_streaming import playlist_url
+
+        return playlist_url(self)
+
+    @property
+    def data_saved_percentage(self):
+        original = self.lecture.original_size_mb
+        if original > 0 and self.size_mb > 0:
+            return round((original - self.size_mb) / original * 100, 1)
+        return 0
+
+
+class ProcessingJob(models.Model):
+    """
+    A queued run of the media pipeline for one lecture, or the expansion of a
+    playlist into such runs (playlist_url set, no lecture yet).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    lecture = models.ForeignKey(
+        Lecture, on_delete=models.CASCADE, related_name="jobs", blank=True, null=True
+    )
+    # Listed by the worker, which then queues a lecture job per video (see core/ingest.py)
+    playlist_url = models.URLField(blank=True)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+
+    # Progress reporting for the status endpoint
+    stage = models.CharField(max_length=32, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+
+    # Retry bookkeeping
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    error = models.TextField(blank=True)
+
+    # Capture a cProfile / pyinstrument profile of the next attempt (see core/metrics.py)
+    profile = models.BooleanField(default=False)
+    # Run every stage even if the dedup cache already has this source (admin re-runs)
+    reprocess = models.BooleanField(default=False)
+    # Transcription overrides for this job: backend, model, threads, beam_size
+    # (see core/transcription.py); empty = the settings and duration rules
+    transcription = models.JSONField(default=dict, blank=True)
+
+    worker = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Touched while the job runs; a running job without recent beats has lost its worker
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.status}) for {self.lecture or self.playlist_url}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+
+class MediaCacheEntry(models.Model):
+    """
+    Processed output for one source (an uploaded file's content hash or a
+    YouTube video ID), so repeated uploads reuse it instead of re-running the pipeline.
+    """
+
+    source_key = models.CharField(max_length=100, unique=True)
+    title = models.CharField(max_length=200, blank=True)
+    original_video = models.FileField(upload_to="videos/", blank=True, null=True)
+    processed_audio = models.FileField(upload_to="audio/")
+    transcript = models.TextField(blank=True)
+    segments_file = models.FileField(upload_to="transcripts/", blank=True, null=True)
+    segment_count = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)
+    original_size_mb = models.FloatField(default=0)
+    new_size_mb = models.FloatField(default=0)
+    # AudioRendition fields per rendition: name, codec, bitrate_kbps, mime_type, file, size_mb
+    renditions = models.JSONField(default=list, blank=True)
+    duration_seconds = models.FloatField(default=0)
+    trimmed_seconds = models.FloatField(default=0)
+    time_map = models.JSONField(default=list, blank=True)
+
+    size_bytes = models.BigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "media cache entries"
+
+    def __str__(self):
+        return self.source_key
+
+
+class StageMetric(models.Model):
+    """Timing and resource use of one pipeline stage in one run (see core/metrics.py)."""
+
+    lecture = models.ForeignKey(
+        Lecture, on_delete=models.CASCADE, related_name="stage_metrics", null=True
+    )
+    job = models.ForeignKey(
+        ProcessingJob,
+        on_delete=models.SET_NULL,
+        related_name="stage_metrics",
+        blank=True,
+        null=True,
+    )
+    stage = models.CharField(max_length=32)
+    wall_seconds = models.FloatField(default=0)
+    cpu_seconds = models.FloatField(default=0)
+    peak_rss_mb = models.FloatField(default=0)
+    bytes_in = models.BigIntegerField(default=0)
+    bytes_out = models.BigIntegerField(default=0)
+    ok = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["stage", "created_at"], name="stagemetric_stage_created")]
+
+    def __str__(self):
+        return f"{self.stage} for lecture {self.lecture_id}: {self.wall_seconds}s"
+
+
+class LibraryStats(models.Model):
+    """
+    Running totals over all lectures for the listing's dashboard, kept up to
+    date by Lecture.save and deletes (see core/catalog.py). A single row.
+    """
+
+    lectures = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    original_mb = models.FloatField(default=0)
+    compressed_mb = models.FloatField(default=0)
+    # Bumped when lectures are added or removed; part of the cached page keys
+    list_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "library stats"
+
+    def __str__(self):
+        return f"{self.lectures} lectures, {self.saved_mb} MB saved"
+
+    @property
+    def saved_mb(self):
+        return round(self.original_mb - self.compressed_mb, 2)
+
+    @property
+    def saved_percentage(self):
+        if self.original_mb > 0:
+            return round(self.saved_mb / self.original_mb * 100, 1)
+        return 0
+
+    def as_dict(self):
+        return {
+            "lectures": self.lectures,
+            "processed": self.processed,
+            "original_mb": round(self.original_mb, 2),
+            "compressed_mb": round(self.compressed_mb, 2),
+            "saved_mb": self.saved_mb,
+            "saved_percentage": self.saved_percentage,
+        }
+
+
+@receiver(post_delete, sender=Lecture)
+def _lecture_deleted(sender, instance, **kwargs):
+    # A receiver rather than Lecture.delete(), so queryset and admin bulk deletes count too.
+    from . import catalog, search
+
+    catalog.lecture_deleted(instance)
+    # Otherwise its rows fill result pages with misses, and a reused pk matches stale text.
+    search.remove_lecture(instance.pk)
@@ -0,0 +1,81 @@
+"""
+On-disk cache of rendered lecture PDFs.
+
+Files are named after the lecture ID plus a hash of the content the PDF shows,
+so an edited transcript or summary simply maps to a new file. PDFs are rendered
+once when processing finishes; a download is then a stat() and a sendfile.
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+
+# Bump when the PDF layout changes so old renders are not served.
+LAYOUT_VERSION = "2"
+
+
+def compute_content_hash(lecture):
+    digest = hashlib.sha256(LAYOUT_VERSION.encode())
+    for value in (
+        lecture.title,
+        lecture.summary,
+        lecture.transcript,
+        lecture.original_size_mb,
+        lecture.new_size_mb,
+        # Segment files are never rewritten in place, so name + count identify them
+        lecture.segments_file.name if lecture.segments_file else "",
+        lecture.segment_count,
+    ):
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, "pdf")
+
+
+def pdf_path(lecture_id, content_hash):
+    return os.path.join(_cache_dir(), f"lecture_{lecture_id}_{content_hash[:16]}.pdf")
+
+
+def cached_pdf_path(lecture_id, content_hash):
+    """Path of the rendered PDF if it is already on disk, else None."""
+    path = pdf_path(lecture_id, content_hash)
+    return path if content_hash and os.path.exists(path) else None
+
+
+def ensure_pdf(lecture):
+    """Returns the path of the lecture's PDF, rendering it first if needed."""
+    if not lecture.content_hash:
+        lecture.save(update_fields=["content_hash"])
+
+    path = pdf_path(lecture.pk, lecture.content_hash)
+    if os.path.exists(path):
+        return path
+
+    # ReportLab is only loaded by processes that actually render (usually workers).
+    from .pdf_generator import generate_lecture_pdf
+
+    os.makedirs(_cache_dir(), exist_ok=True)
+    buffer = generate_lecture_pdf(lecture)
+    # Write to a temp file and rename, so a concurrent download never sees half a PDF.
+    fd, tmp_path = tempfile.mkstemp(dir=_cache_dir(), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getbuffer())
+    os.replace(tmp_path, path)
+    return path
+
+
+def invalidate(lecture):
+    """Deletes this lecture's renders except the one matching its current content."""
+    keep = pdf_path(lecture.pk, lecture.content_hash) if lecture.content_hash else None
+    for path in glob.glob(os.path.join(_cache_dir(), f"lecture_{lecture.pk}_*.pdf")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
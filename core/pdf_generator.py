@@ -1,4 +1,6 @@
 from io import BytesIO
+from xml.sax.saxutils import escape
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -11,8 +13,109 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 # For a production Myanmar version, you would register a .ttf font like 'Pyidaungsu' here.
 # For this prototype, we assume English text to avoid complex font setup.
 
-
-def generate_lecture_pdf(lecture):
+# --- Styles ---
+# Built once at import time and shared by every render.
+_styles = getSampleStyleSheet()
+
+# Title Style (Emerald Green)
+TITLE_STYLE = ParagraphStyle(
+    "CustomTitle",
+    parent=_styles["Heading1"],
+    fontSize=18,
+    spaceAfter=30,
+    textColor=colors.HexColor("#059669"),
+    alignment=1,  # Center
+)
+
+# Heading Style
+HEADING_STYLE = ParagraphStyle(
+    "CustomHeading",
+    parent=_styles["Heading2"],
+    fontSize=14,
+    spaceBefore=20,
+    spaceAfter=12,
+    textColor=colors.HexColor("#1e293b"),
+    borderPadding=5,
+    borderColor=colors.HexColor("#e2e8f0"),
+    borderWidth=0,
+    borderBottomWidth=1,
+)
+
+# Body Text
+BODY_STYLE = ParagraphStyle(
+    "Body", parent=_styles["Normal"], fontSize=10, leading=14, spaceAfter=10
+)
+
+META_STYLE = ParagraphStyle(
+    "Meta", parent=BODY_STYLE, alignment=1, textColor=colors.gray
+)
+
+# Small grey "[12:30]" marker above each transcript block
+TIMESTAMP_STYLE = ParagraphStyle(
+    "Timestamp",
+    parent=BODY_STYLE,
+    fontSize=8,
+    leading=10,
+    spaceAfter=2,
+    textColor=colors.HexColor("#64748b"),
+)
+
+# Transcript paragraphs are cut at roughly this many characters (or seconds of
+# audio) so ReportLab lays out many small flowables instead of one giant one.
+BLOCK_CHARS = 1500
+BLOCK_SECONDS = 60
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def _segment_blocks(segments):
+    """Groups Whisper segments into (start_seconds, text) blocks."""
+    start, parts, size = None, [], 0
+    for segment in segments:
+        if start is None:
+            start = segment["start"]
+        parts.append(segment["text"].strip())
+        size += len(segment["text"])
+        if size >= BLOCK_CHARS or segment["end"] - start >= BLOCK_SECONDS:
+            yield start, " ".join(parts)
+            start, parts, size = None, [], 0
+    if parts:
+        yield start, " ".join(parts)
+
+
+def _text_blocks(text):
+    """Splits plain text into paragraphs of about BLOCK_CHARS, at sentence ends."""
+    for paragraph in text.split("\n"):
+        while len(paragraph) > BLOCK_CHARS:
+            cut = paragraph.rfind(". ", 0, BLOCK_CHARS)
+            cut = cut + 1 if cut > 0 else BLOCK_CHARS
+            yield paragraph[:cut].strip()
+            paragraph = paragraph[cut:]
+        if paragraph.strip():
+            yield paragraph.strip()
+
+
+def transcript_flowables(lecture, timestamps=True):
+    """One Paragraph per block, so long transcripts split cleanly across pages."""
+    if lecture.segment_count:
+        # Read block by block: a long transcript is never all in memory at once.
+        for start, text in _segment_blocks(lecture.iter_segments()):
+            if timestamps:
+                yield Paragraph(f"[{format_timestamp(start)}]", TIMESTAMP_STYLE)
+            yield Paragraph(escape(text), BODY_STYLE)
+    else:
+        for text in _text_blocks(lecture.transcript):
+            yield Paragraph(escape(text), BODY_STYLE)
+
+
+def generate_lecture_pdf(lecture, timestamps=True):
     """
     Generates a PDF buffer containing the lecture summary and transcript.
     """
@@ -30,70 +133,29 @@ def generate_lecture_pdf(lecture):
     )
 
     Story = []
-    styles = getSampleStyleSheet()
-
-    # --- Styles ---
-    # Title Style (Emerald Green)
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=18,
-        spaceAfter=30,
-        textColor=colors.HexColor("#059669"),
-        alignment=1,  # Center
-    )
-
-    # Heading Style
-    heading_style = ParagraphStyle(
-        "CustomHeading",
-        parent=styles["Heading2"],
-        fontSize=14,
-        spaceBefore=20,
-        spaceAfter=12,
-        textColor=colors.HexColor("#1e293b"),
-        borderPadding=5,
-        borderColor=colors.HexColor("#e2e8f0"),
-        borderWidth=0,
-        borderBottomWidth=1,
-    )
-
-    # Body Text
-    body_style = styles["Normal"]
-    body_style.fontSize = 10
-    body_style.leading = 14
-    body_style.spaceAfter = 10
 
     # --- Content Construction ---
 
     # 1. Title
-    Story.append(Paragraph(lecture.title, title_style))
+    Story.append(Paragraph(escape(lecture.title), TITLE_STYLE))
 
     # 2. Metadata / Savings
     meta_text = f"<b>Data Saved:</b> {lecture.data_saved_percentage}% | <b>Original:</b> {lecture.original_size_mb}MB"
-    Story.append(
-        Paragraph(
-            meta_text,
-            ParagraphStyle(
-                "Meta", parent=body_style, alignment=1, textColor=colors.gray
-            ),
-        )
-    )
+    Story.append(Paragraph(meta_text, META_STYLE))
     Story.append(Spacer(1, 20))
 
     # 3. AI Summary Section
-    Story.append(Paragraph("AI Study Guide", heading_style))
+    Story.append(Paragraph("AI Study Guide", HEADING_STYLE))
 
     # Clean up text for PDF (ReportLab uses <br/> for newlines)
     clean_summary = lecture.summary.replace("\n", "<br/>")
-    Story.append(Paragraph(clean_summary, body_style))
+    Story.append(Paragraph(clean_summary, BODY_STYLE))
 
     Story.append(Spacer(1, 20))
 
     # 4. Transcript Section
-    Story.append(Paragraph("Full Transcript", heading_style))
-
-    clean_transcript = lecture.transcript.replace("\n", "<br/>")
-    Story.append(Paragraph(clean_transcript, body_style))
+    Story.append(Paragraph("Full Transcript", HEADING_STYLE))
+    Story.extend(transcript_flowables(lecture, timestamps))
 
     # Build
     doc.build(Story)
@@ -0,0 +1,378 @@
+import logging
+import os
+
+from django.conf import settings
+
+from . import (
+    audio_streaming,
+    dedup,
+    metrics,
+    pdf_cache,
+    renditions,
+    search,
+    transcription,
+    youtube,
+)
+from .media_processor import ContentProcessor
+from .models import AudioRendition
+
+logger = logging.getLogger(__name__)
+
+
+def move_into_storage(field_file, path, filename):
+    """
+    Atomically renames a finished file into the field's upload_to directory
+    (both live under MEDIA_ROOT) and points the field at it.
+    """
+    storage = field_file.storage
+    name = storage.get_available_name(
+        field_file.field.generate_filename(field_file.instance, filename)
+    )
+    destination = storage.path(name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(path, destination)
+    field_file.name = name
+    return name
+
+
+def store_renditions(lecture, ladder):
+    """
+    Moves each encoded rendition into storage and records it on the lecture.
+    The default rendition doubles as lecture.processed_audio (same file).
+    Returns the names of the files it replaced, for dedup.delete_unused_files
+    once the lecture no longer points at them.
+    """
+    # A retry replaces whatever an earlier attempt recorded, except renditions an
+    # interrupted attempt already moved into storage (their file left `path`).
+    stored = {rendition.name: rendition for rendition in lecture.renditions.all()}
+    replaced = []
+    for item in ladder:
+        rendition = stored.pop(item["name"], None)
+        moved = (
+            rendition is not None
+            and not os.path.exists(item["path"])
+            and rendition.file.storage.exists(rendition.file.name)
+        )
+        if not moved:
+            if rendition is not None:
+                replaced.append(rendition.file.name)
+                rendition.delete()
+            rendition = AudioRendition(
+                lecture=lecture,
+                name=item["name"],
+                codec=item["codec"],
+                bitrate_kbps=item["bitrate_kbps"],
+                mime_type=item["mime_type"],
+                size_mb=item["size_mb"],
+            )
+            extension = os.path.splitext(item["path"])[1]
+            move_into_storage(
+                rendition.file,
+                item["path"],
+                f"{lecture.title[:20]}_{item['name']}{extension}",
+            )
+            rendition.save()
+        if item["name"] == renditions.default_name():
+            lecture.processed_audio.name = rendition.file.name
+    for rendition in stored.values():
+        replaced.append(rendition.file.name)
+        rendition.delete()
+    return replaced
+
+
+def pregenerate_segments(lecture):
+    """Cuts MPEG renditions into HLS segments now rather than on the first request."""
+    if not settings.LITELEARN_AUDIO_SEGMENTS:
+        return
+    for rendition in lecture.renditions.filter(
+        mime_type__in=audio_streaming.SEGMENTED_MIME_TYPES
+    ):
+        try:
+            audio_streaming.ensure_segments(rendition.file.path)
+        except Exception as e:
+            # Not fatal: audio_segment builds them on demand.
+            logger.warning("Segmenting %s failed: %s", rendition, e)
+
+
+def pregenerate_pdf(lecture):
+    """Renders the PDF now so the first download is served from disk."""
+    try:
+        pdf_cache.ensure_pdf(lecture)
+    except Exception as e:
+        # Not fatal: download_pdf renders on demand if the file is missing.
+        logger.warning("PDF pre-generation failed for lecture %s: %s", lecture.pk, e)
+
+
+# The job pipeline, in order. Lecture.pipeline_stage is the last stage completed
+# and Lecture.checkpoint holds what the next one needs, both saved after every
+# stage, so a retry or a restarted worker carries on from there.
+STAGES = ["fetch", "encode", "transcribe", "summarize", "render"]
+PROGRESS = {"fetch": 5, "encode": 10, "transcribe": 30, "summarize": 80, "render": 95}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class LecturePipeline:
+    """
+    Runs a saved Lecture through STAGES, resuming after the last completed one.
+
+    - fetch: dedup lookup, then the YouTube download (resumable) or the upload.
+    - encode: the renditions, plus Whisper's 16 kHz input saved as PCM.
+    - transcribe: Whisper on that PCM; text and segments are saved on the lecture.
+    - summarize: the study guide.
+    - render: renditions into storage, dedup cache, search index, HLS segments, PDF.
+
+    A Whisper run that finished is never repeated because Gemini failed
+    afterwards or the worker died: the retry starts at summarize.
+    """
+
+    def __init__(
+        self, lecture, on_progress=None, transcription=None, summary_fallback=True, use_cache=True
+    ):
+        self.lecture = lecture
+        self.on_progress = on_progress
+        # False: a Gemini failure fails the stage (to be retried) instead of
+        # storing the transcript-preview fallback
+        self.summary_fallback = summary_fallback
+        # False: skip the dedup lookup, so a re-run really runs (and re-caches) everything
+        self.use_cache = use_cache
+        self.processor = ContentProcessor(transcription=transcription)
+        self.output_dir = os.path.join(settings.MEDIA_ROOT, "processed")
+
+    def run(self):
+        lecture = self.lecture
+        if lecture.pipeline_stage == STAGES[-1]:
+            # A retry of a job that finished the work but not its bookkeeping.
+            # (Re-runs reset pipeline_stage first, see restart().)
+            logger.info("Lecture %s is already processed.", lecture.pk)
+            return lecture
+        self._step_back_to_files()
+        if lecture.pipeline_stage:
+            logger.info(
+                "Lecture %s: resuming after the %s stage.", lecture.pk, lecture.pipeline_stage
+            )
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        done = STAGES.index(lecture.pipeline_stage) + 1 if lecture.pipeline_stage else 0
+        for stage in STAGES[done:]:
+            if self.on_progress is not None:
+                self.on_progress(stage, PROGRESS[stage])
+            getattr(self, stage)()
+            if lecture.pipeline_stage == STAGES[-1]:
+                break  # e.g. a dedup cache hit
+        return lecture
+
+    def _step_back_to_files(self):
+        """
+        Files can vanish between attempts (say, a cleaned-up processed/ directory).
+        Steps back to the stage that makes the ones the next stage needs.
+        """
+        lecture = self.lecture
+        stage = lecture.pipeline_stage
+        if stage in ("encode", "transcribe", "summarize") and self._renditions_missing():
+            stage = "fetch"  # render would fail to store them on every retry
+        if stage == "encode" and not os.path.exists(lecture.checkpoint["pcm"]):
+            stage = "fetch"
+        if stage == "fetch" and not os.path.exists(lecture.checkpoint["source"]):
+            stage = ""
+        if stage != lecture.pipeline_stage:
+            logger.warning(
+                "Lecture %s: files from the %s stage are gone.", lecture.pk, lecture.pipeline_stage
+            )
+            lecture.pipeline_stage = stage
+
+    def _renditions_missing(self):
+        # Same test as store_renditions: a rendition whose file left its encoded
+        # path is fine if an interrupted render already moved it into storage.
+        stored = {
+            rendition.name
+            for rendition in self.lecture.renditions.all()
+            if rendition.file.storage.exists(rendition.file.name)
+        }
+        return any(
+            not os.path.exists(item["path"]) and item["name"] not in stored
+            for item in self.lecture.checkpoint["renditions"]
+        )
+
+    def _checkpoint(self, stage, *fields):
+        """Records `stage` as completed, together with the lecture fields it set."""
+        self.lecture.pipeline_stage = stage
+        self.lecture.save(update_fields=["pipeline_stage", "checkpoint", *fields])
+
+    def fetch(self):
+        lecture = self.lecture
+        # Same file or same YouTube video as before? Reuse the earlier results.
+        cache_key = dedup.source_key(lecture)
+        entry = dedup.lookup(cache_key) if self.use_cache else None
+        video = None
+        if entry is None and lecture.youtube_url:
+            # Metadata before any download: rejects over-long videos, and gives the
+            # canonical video ID for URL shapes source_key cannot parse.
+            video = youtube.fetch_metadata(lecture.youtube_url)
+            if video.cache_key != cache_key:
+                cache_key = video.cache_key
+                entry = dedup.lookup(cache_key) if self.use_cache else None
+        if entry is not None:
+            logger.info("Dedup cache hit for %s, skipping the pipeline.", cache_key)
+            dedup.apply(entry, lecture)
+            search.index_lecture(lecture)
+            pregenerate_pdf(lecture)
+            lecture.checkpoint = {}
+            self._checkpoint(STAGES[-1])
+            return
+
+        # BRANCH A: YouTube URL
+        if lecture.youtube_url:
+            source, meta = self.processor.fetch_youtube(
+                lecture.youtube_url, self.output_dir, video
+            )
+            # Use the title from YouTube if user didn't provide one
+            if not lecture.title:
+                lecture.title = meta["title"][:200]
+        # BRANCH B: File Upload
+        elif lecture.original_video:
+            source = lecture.original_video.path
+        else:
+            raise ValueError(f"Lecture {lecture.pk} has neither a video nor a YouTube URL.")
+
+        lecture.checkpoint = {
+            "cache_key": cache_key,
+            "source": source,
+            "downloaded": bool(lecture.youtube_url),  # ours to delete once encoded
+        }
+        self._checkpoint("fetch", "title")
+
+    def encode(self):
+        lecture = self.lecture
+        base_path = os.path.join(self.output_dir, f"lecture_{lecture.pk}")
+        encoded = self.processor.encode_audio(lecture.checkpoint["source"], base_path)
+        pcm_path = f"{base_path}_pcm.npy"
+        transcription.save_pcm(pcm_path, encoded.samples)
+
+        lecture.duration_seconds = round(encoded.duration, 2)
+        lecture.trimmed_seconds = encoded.trimmed_seconds
+        lecture.time_map = encoded.time_map
+        lecture.checkpoint = {
+            **lecture.checkpoint,
+            "renditions": self.processor.rendition_ladder(encoded.paths),
+            "pcm": pcm_path,
+        }
+        self._checkpoint("encode", "duration_seconds", "trimmed_seconds", "time_map")
+        if lecture.checkpoint["downloaded"]:
+            _remove(lecture.checkpoint["source"])
+
+    def transcribe(self):
+        lecture = self.lecture
+        pcm_path = lecture.checkpoint["pcm"]
+        samples = transcription.load_pcm(pcm_path)
+
+        # Start from a clean slate (an interrupted attempt may have left partial
+        # text behind), then persist each window's segments as soon as Whisper
+        # finishes it, for the live transcript on the lecture page.
+        lecture.transcript = ""
+        lecture.replace_segments([])
+        lecture.save(update_fields=["transcript", "segments_file", "segment_count"])
+
+        def on_segments(partial):
+            lecture.transcript += partial["text"]
+            lecture.append_segments(partial["segments"])
+            lecture.save(update_fields=["transcript", "segment_count"])
+
+        logger.info("Transcribing lecture %s...", lecture.pk)
+        result = self.processor.transcribe(samples, on_segments, lecture.time_map)
+        lecture.transcript = result["text"]
+        # Rewritten in full: the windows appended while transcribing become fewer,
+        # larger blocks.
+        lecture.replace_segments(result["segments"])
+        self._checkpoint("transcribe", "transcript", "segments_file", "segment_count")
+        _remove(pcm_path)
+
+    def summarize(self):
+        lecture = self.lecture
+        lecture.summary = self.processor.generate_ai_summary(
+            lecture.transcript, fallback=self.summary_fallback
+        )
+        self._checkpoint("summarize", "summary")
+
+    def render(self):
+        lecture = self.lecture
+        checkpoint = lecture.checkpoint
+        # Safe to repeat if interrupted: store_renditions keeps what it already moved.
+        publish_lecture(lecture, checkpoint["renditions"], checkpoint.get("cache_key"))
+        lecture.checkpoint = {}
+        self._checkpoint("render")
+        _remove(checkpoint.get("pcm", ""))
+        if checkpoint.get("downloaded"):
+            _remove(checkpoint["source"])
+
+
+def restart(lectures):
+    """Makes the next job for these lectures (a queryset) run the whole pipeline again."""
+    return lectures.update(pipeline_stage="", checkpoint={})
+
+
+def process_lecture_record(
+    lecture, on_progress=None, transcription=None, summary_fallback=True, use_cache=True
+):
+    """
+    Runs the media pipeline for a saved Lecture and stores the results on it,
+    resuming after the last stage an earlier attempt completed (see LecturePipeline).
+    This is what upload_lecture used to do inline; it now runs inside a worker.
+    transcription overrides the transcription options (see ProcessingJob.transcription).
+    use_cache=False ignores an earlier result for the same source (ProcessingJob.reprocess).
+    """
+    return LecturePipeline(
+        lecture, on_progress, transcription, summary_fallback, use_cache
+    ).run()
+
+
+def finalize_lecture(lecture, results, cache_key=None, on_progress=None):
+    """Stores a ContentProcessor result dict on the lecture and caches it."""
+    lecture.transcript = results["transcript"]
+    # Rewritten in full: the windows appended while transcribing become fewer,
+    # larger blocks.
+    lecture.replace_segments(results["segments"])
+    lecture.summary = results["summary"]
+    lecture.duration_seconds = results["duration_seconds"]
+    lecture.trimmed_seconds = results["trimmed_seconds"]
+    lecture.time_map = results["time_map"]
+    return publish_lecture(lecture, results["renditions"], cache_key, on_progress)
+
+
+def publish_lecture(lecture, ladder, cache_key=None, on_progress=None):
+    """
+    Moves the encoded renditions into storage, saves the lecture, caches it for
+    dedup, indexes it for search and pre-renders its HLS segments and PDF.
+    """
+    with metrics.stage("finalize"):
+        # Common Wrap-up
+        if on_progress is not None:
+            on_progress("save", 95)
+
+        # Register the processed audio in place: renames, not a read + rewrite.
+        replaced = store_renditions(lecture, ladder)
+        default = next(r for r in ladder if r["name"] == renditions.default_name())
+        lecture.new_size_mb = default["size_mb"]
+        # For YouTube, we don't know "original size" exactly,
+        # so we can mock it or leave it 0.
+        if lecture.youtube_url and lecture.original_size_mb == 0:
+            # Estimate: 1 minute of 1080p video is roughly 20MB
+            # This is a rough heuristic for the 'Data Saved' display
+            lecture.original_size_mb = lecture.new_size_mb * 15
+
+        lecture.save()
+        dedup.store(cache_key, lecture)
+        # A reprocess or a re-encoding retry: drop the old audio nothing uses now.
+        dedup.delete_unused_files(replaced)
+        search.index_lecture(lecture)
+
+        if on_progress is not None:
+            on_progress("render", 98)
+        pregenerate_segments(lecture)
+        pregenerate_pdf(lecture)
+    return lecture
@@ -0,0 +1,94 @@
+"""
+The audio ladder: every lecture is encoded into several renditions (e.g. Opus
+12k for 2G, Opus 24k, MP3 32k for old browsers) from one ffmpeg decode, and
+each client is served the one that fits its connection.
+
+The client's connection is read from, in order: an explicit `?rendition=` or
+`?kbps=` parameter, the Save-Data header, and the ECT / Downlink client hints.
+"""
+
+from django.conf import settings
+
+# Effective connection types (ECT client hint) that always get the smallest file.
+SLOW_CONNECTIONS = {"slow-2g", "2g"}
+
+# Request headers the choice depends on (for Vary and Accept-CH).
+HINT_HEADERS = ["Save-Data", "ECT", "Downlink"]
+
+
+def ladder():
+    """The configured renditions, lowest bitrate first."""
+    return sorted(settings.LITELEARN_AUDIO_RENDITIONS, key=lambda spec: spec["bitrate"])
+
+
+def default_name():
+    return settings.LITELEARN_DEFAULT_RENDITION
+
+
+def output_path(base_path, spec):
+    """Where a rendition of `base_path` (no extension) is written."""
+    return f"{base_path}_{spec['name']}.{spec['ext']}"
+
+
+def ffmpeg_output_args(spec, path, audio_filter=None):
+    """ffmpeg arguments for one mono rendition output of the first audio stream."""
+    return [
+        "-map",
+        "0:a:0",
+        "-vn",
+        *(["-af", audio_filter] if audio_filter else []),
+        "-ac",
+        "1",
+        "-c:a",
+        spec["codec"],
+        "-b:a",
+        f"{spec['bitrate']}k",
+        "-ar",
+        str(spec["sample_rate"]),
+        *spec.get("options", []),
+        path,
+    ]
+
+
+def bandwidth_hint_kbps(request):
+    """The client's bandwidth in kbps from `?kbps=` or the Downlink hint (Mbps), or None."""
+    try:
+        if "kbps" in request.GET:
+            return float(request.GET["kbps"])
+        if "Downlink" in request.headers:
+            return float(request.headers["Downlink"]) * 1000
+    except ValueError:
+        pass
+    return None
+
+
+def wants_smallest(request):
+    return (
+        request.headers.get("Save-Data", "").strip().lower() == "on"
+        or request.headers.get("ECT", "").strip().lower() in SLOW_CONNECTIONS
+    )
+
+
+def choose(renditions, request):
+    """
+    Picks one of a lecture's renditions (sorted by bitrate, lowest first) for
+    this request, or None if there are none.
+    """
+    if not renditions:
+        return None
+
+    by_name = {rendition.name: rendition for rendition in renditions}
+    if request.GET.get("rendition") in by_name:
+        return by_name[request.GET["rendition"]]
+
+    if wants_smallest(request):
+        return renditions[0]
+
+    kbps = bandwidth_hint_kbps(request)
+    if kbps is not None:
+        # Leave headroom so playback does not stall when the connection dips.
+        budget = kbps * settings.LITELEARN_AUDIO_BANDWIDTH_SHARE
+        fitting = [r for r in renditions if r.bitrate_kbps <= budget]
+        return fitting[-1] if fitting else renditions[0]
+
+    return by_name.get(default_name(), renditions[-1])
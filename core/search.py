@@ -0,0 +1,310 @@
+"""
+Full-text search over lecture titles, study guides and transcripts.
+
+The backend is pluggable (LITELEARN_SEARCH_BACKEND is a dotted path). The
+default, SQLiteFTSBackend, keeps two FTS5 tables in the main database (created
+by migration 0018 when the database is SQLite):
+
+- search_lecture: one row per lecture (rowid = lecture id), used to rank lectures.
+- search_segment: one row per Whisper segment, used to find where in the
+  lecture the words are. Its rowid is lecture_id * SEGMENT_SLOTS + segment
+  index, so "segments of lecture N" is a rowid range, which FTS5 can answer
+  without scanning.
+
+A query ranks lectures with bm25 on the small table first, then picks the first
+few matching segments (in time order) of just those lectures. Ranking a term
+that appears nearly everywhere costs time in proportion to its matches, so
+such queries rank only the newest LITELEARN_SEARCH_MAX_CANDIDATES matching
+lectures. This keeps every query fast at 100k+ lectures.
+"""
+
+import itertools
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass, field
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from . import silence
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SLOTS = 100_000  # max segments indexed per lecture
+# bm25 column weights for search_lecture: title, summary, transcript
+LECTURE_WEIGHTS = (10.0, 3.0, 1.0)
+
+# snippet() markers; swapped for <mark> after the text around them is escaped
+_HIT_START, _HIT_END = "\x02", "\x03"
+_TOKEN_RE = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+
+def to_fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must appear, and a word
+    ending in * matches as a prefix ("therm*"). Returns "" if there are no words.
+    """
+    terms = [f'"{word}"{star}' for word, star in _TOKEN_RE.findall(text.lower())]
+    return " ".join(terms)
+
+
+def snippet_html(snippet):
+    return (
+        escape(snippet)
+        .replace(_HIT_START, "<mark>")
+        .replace(_HIT_END, "</mark>")
+    )
+
+
+@dataclass
+class SegmentHit:
+    start: float  # seconds in the original recording
+    end: float
+    snippet: str  # HTML, matches wrapped in <mark>
+    audio_start: float = 0.0  # seconds in the (possibly silence-trimmed) audio
+
+
+@dataclass
+class LectureHit:
+    lecture_id: int
+    title: str
+    score: float  # higher is better
+    snippet: str  # HTML, from the title/summary/transcript
+    segments: list = field(default_factory=list)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class SearchBackend:
+    """Interface for search backends; see SQLiteFTSBackend for the default."""
+
+    def index_lecture(self, lecture):
+        raise NotImplementedError
+
+    def remove_lecture(self, lecture_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=20, offset=0):
+        """Returns a list of LectureHit, best first."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    segments_per_lecture = 3
+
+    def _delete(self, cursor, lecture_id):
+        cursor.execute("DELETE FROM search_lecture WHERE rowid = %s", [lecture_id])
+        cursor.execute(
+            "DELETE FROM search_segment WHERE rowid BETWEEN %s AND %s",
+            [lecture_id * SEGMENT_SLOTS, (lecture_id + 1) * SEGMENT_SLOTS - 1],
+        )
+
+    def index_lecture(self, lecture):
+        summary_text = re.sub(r"<[^>]+>", " ", lecture.summary or "")
+        base = lecture.pk * SEGMENT_SLOTS
+        rows = [
+            (base + i, segment["text"].strip(), segment["start"], segment["end"])
+            for i, segment in enumerate(lecture.load_segments(0, SEGMENT_SLOTS))
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._delete(cursor, lecture.pk)
+            cursor.execute(
+                "INSERT INTO search_lecture (rowid, title, summary, transcript) "
+                "VALUES (%s, %s, %s, %s)",
+                [lecture.pk, lecture.title, summary_text, lecture.transcript],
+            )
+            cursor.executemany(
+                "INSERT INTO search_segment (rowid, text, start, end) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove_lecture(self, lecture_id):
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._delete(cursor, lecture_id)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_lecture")
+            cursor.execute("DELETE FROM search_segment")
+            # Rebuild the index b-trees compactly after a mass delete.
+            for table in ("search_lecture", "search_segment"):
+                cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def search(self, query, limit=20, offset=0):
+        from .models import Lecture
+
+        match = to_fts_query(query)
+        if not match:
+            return []
+
+        with connection.cursor() as cursor:
+            # Rowid of the Nth newest match; older ones are left out of ranking.
+            cursor.execute(
+                "SELECT rowid FROM search_lecture WHERE search_lecture MATCH %s "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET %s",
+                [match, settings.LITELEARN_SEARCH_MAX_CANDIDATES - 1],
+            )
+            oldest = cursor.fetchone()
+            rank = "bm25(search_lecture, {}, {}, {})".format(*LECTURE_WEIGHTS)
+            cursor.execute(
+                f"SELECT rowid, -{rank} FROM search_lecture "
+                "WHERE search_lecture MATCH %s AND rowid >= %s "
+                f"ORDER BY {rank} LIMIT %s OFFSET %s",
+                [match, oldest[0] if oldest else 0, limit, offset],
+            )
+            ranked = cursor.fetchall()
+
+            # snippet() reads the stored text, so only compute it for the page.
+            snippets, segments = {}, {}
+            for lecture_id, _ in ranked:
+                cursor.execute(
+                    "SELECT snippet(search_lecture, -1, %s, %s, '…', 16) "
+                    "FROM search_lecture WHERE search_lecture MATCH %s AND rowid = %s",
+                    [_HIT_START, _HIT_END, match, lecture_id],
+                )
+                snippets[lecture_id] = cursor.fetchone()[0]
+                # No bm25 here: it would count matches over the whole table for
+                # every lecture on the page.
+                cursor.execute(
+                    "SELECT start, end, snippet(search_segment, 0, %s, %s, '…', 12) "
+                    "FROM search_segment WHERE search_segment MATCH %s "
+                    "AND rowid BETWEEN %s AND %s ORDER BY rowid LIMIT %s",
+                    [
+                        _HIT_START,
+                        _HIT_END,
+                        match,
+                        lecture_id * SEGMENT_SLOTS,
+                        (lecture_id + 1) * SEGMENT_SLOTS - 1,
+                        self.segments_per_lecture,
+                    ],
+                )
+                segments[lecture_id] = cursor.fetchall()
+
+        # Lectures deleted since they were indexed simply drop out here.
+        lectures = Lecture.objects.only("title", "time_map").in_bulk(
+            [lecture_id for lecture_id, _ in ranked]
+        )
+        hits = []
+        for lecture_id, score in ranked:
+            lecture = lectures.get(lecture_id)
+            if lecture is None:
+                continue
+            hits.append(
+                LectureHit(
+                    lecture_id=lecture_id,
+                    title=lecture.title,
+                    score=round(score, 4),
+                    snippet=snippet_html(snippets[lecture_id]),
+                    segments=[
+                        SegmentHit(
+                            start=start,
+                            end=end,
+                            snippet=snippet_html(text),
+                            audio_start=silence.to_trimmed(start, lecture.time_map),
+                        )
+                        for start, end, text in segments[lecture_id]
+                    ],
+                )
+            )
+        return hits
+
+
+class SimpleBackend(SearchBackend):
+    """
+    Index-free fallback for databases without FTS5: substring matching over
+    the Lecture table, newest first. Fine for small installations only.
+    """
+
+    def index_lecture(self, lecture):
+        pass
+
+    def remove_lecture(self, lecture_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit=20, offset=0):
+        from django.db.models import Q
+
+        from .models import Lecture
+
+        words = [word for word, _ in _TOKEN_RE.findall(query)]
+        if not words:
+            return []
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(title__icontains=word)
+                | Q(summary__icontains=word)
+                | Q(transcript__icontains=word)
+            )
+        hits = []
+        lectures = Lecture.objects.filter(condition).order_by("-created_at")
+        for lecture in lectures[offset : offset + limit]:
+            first = words[0].lower()
+            matches = itertools.islice(
+                (s for s in lecture.iter_segments() if first in s["text"].lower()), 3
+            )
+            hits.append(
+                LectureHit(
+                    lecture_id=lecture.pk,
+                    title=lecture.title,
+                    score=0.0,
+                    snippet=escape(lecture.transcript[:200]),
+                    segments=[
+                        SegmentHit(
+                            start=s["start"],
+                            end=s["end"],
+                            snippet=escape(s["text"].strip()),
+                            audio_start=silence.to_trimmed(
+                                s["start"], lecture.time_map
+                            ),
+                        )
+                        for s in matches
+                    ],
+                )
+            )
+        return hits
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend (LITELEARN_SEARCH_BACKEND), created once per process."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.LITELEARN_SEARCH_BACKEND)()
+    return _backend
+
+
+def index_lecture(lecture):
+    """Indexes a processed lecture. Never fatal: `reindex_search` can catch up."""
+    try:
+        get_backend().index_lecture(lecture)
+    except Exception as e:
+        logger.warning("Search indexing failed for lecture %s: %s", lecture.pk, e)
+
+
+def remove_lecture(lecture_id):
+    """Drops a deleted lecture from the index. Never fatal, like index_lecture."""
+    try:
+        get_backend().remove_lecture(lecture_id)
+    except Exception as e:
+        logger.warning("Removing lecture %s from the search index failed: %s", lecture_id, e)
+
+
+def search(query, limit=20, offset=0):
+    """Runs a query; returns (hits, milliseconds taken)."""
+    start = time.perf_counter()
+    hits = get_backend().search(query, limit=limit, offset=offset)
+    return hits, round((time.perf_counter() - start) * 1000, 2)
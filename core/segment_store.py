@@ -0,0 +1,194 @@
+"""
+Compact on-disk store for Whisper segments (start, end, text, avg_logprob).
+
+A lecture's segments live in a sidecar file next to its audio rather than in
+a JSON column. The file is a short header followed by blocks, and each block
+is laid out column by column:
+
+    header   b"LLSG", version (u16), reserved (u16)
+    block    count, text_bytes, first_start_ms, last_end_ms   (4 x u32)
+             start_ms[count]      u32
+             end_ms[count]        u32
+             avg_logprob[count]   f16
+             text_end[count]      u32, end offset of each text in the blob
+             text                 UTF-8, text_bytes long
+
+That costs 14 bytes per segment plus its text. New segments are appended as a
+new block, so writing Whisper's output as it arrives never rewrites what is
+already on disk. Readers walk the 16-byte block headers and decode only the
+blocks that overlap the index or time range they were asked for. A block cut
+short by a crash mid-append is ignored.
+"""
+
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"LLSG"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")
+BLOCK_HEADER = struct.Struct("<IIII")
+# Segments per block when writing a whole transcript at once (appends keep
+# Whisper's window as one block). Smaller blocks mean finer-grained range reads.
+BLOCK_SEGMENTS = 256
+
+_COLUMNS = [
+    ("start", "<u4"),
+    ("end", "<u4"),
+    ("avg_logprob", "<f2"),
+    ("text_end", "<u4"),
+]
+
+
+def _ms(seconds):
+    return max(0, int(round(seconds * 1000)))
+
+
+def _encode_block(segments):
+    texts = [segment["text"].encode("utf-8") for segment in segments]
+    starts = np.array([_ms(s["start"]) for s in segments], dtype="<u4")
+    ends = np.array([_ms(s["end"]) for s in segments], dtype="<u4")
+    logprobs = np.array([s.get("avg_logprob", 0.0) for s in segments], dtype="<f2")
+    text_ends = np.cumsum([len(text) for text in texts], dtype="<u4")
+    blob = b"".join(texts)
+    header = BLOCK_HEADER.pack(len(segments), len(blob), starts[0], ends[-1])
+    return b"".join(
+        [
+            header,
+            starts.tobytes(),
+            ends.tobytes(),
+            logprobs.tobytes(),
+            text_ends.tobytes(),
+            blob,
+        ]
+    )
+
+
+def _decode_block(data, count):
+    columns = {}
+    offset = 0
+    for name, dtype in _COLUMNS:
+        column = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += column.nbytes
+        columns[name] = column.tolist()
+    blob = data[offset:]
+    segments = []
+    text_start = 0
+    for start, end, logprob, text_end in zip(*columns.values()):
+        segments.append(
+            {
+                "start": start / 1000,
+                "end": end / 1000,
+                "text": blob[text_start:text_end].decode("utf-8"),
+                "avg_logprob": round(logprob, 3),
+            }
+        )
+        text_start = text_end
+    return segments
+
+
+def _block_size(count, text_bytes):
+    return BLOCK_HEADER.size + 14 * count + text_bytes
+
+
+def _check_header(f, path):
+    magic, version, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a segment store (version {VERSION})")
+
+
+def write(path, segments):
+    """Writes `segments` as a new file at `path` (atomically)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+            for i in range(0, len(segments), BLOCK_SEGMENTS):
+                f.write(_encode_block(segments[i : i + BLOCK_SEGMENTS]))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def append(path, segments):
+    """Appends `segments` as one block, creating the file if needed."""
+    if not segments:
+        return
+    if not os.path.exists(path):
+        write(path, [])
+    with open(path, "ab") as f:
+        f.write(_encode_block(segments))
+
+
+def iter_blocks(path):
+    """
+    Yields (first_index, count, first_start, last_end, read) for each complete
+    block, where read() decodes the block's segments. Only headers are read here.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        _check_header(f, path)
+        index = 0
+        position = FILE_HEADER.size
+        while position + BLOCK_HEADER.size <= size:
+            f.seek(position)
+            count, text_bytes, first_ms, last_ms = BLOCK_HEADER.unpack(
+                f.read(BLOCK_HEADER.size)
+            )
+            block_size = _block_size(count, text_bytes)
+            if position + block_size > size:
+                break  # torn append
+
+            def read(offset=position + BLOCK_HEADER.size, n=count, size=block_size):
+                f.seek(offset)
+                return _decode_block(f.read(size - BLOCK_HEADER.size), n)
+
+            yield index, count, first_ms / 1000, last_ms / 1000, read
+            index += count
+            position += block_size
+
+
+def count(path):
+    return sum(block[1] for block in iter_blocks(path))
+
+
+def read(path, start=0, stop=None):
+    """Segments [start:stop] (by index), decoding only the blocks involved."""
+    segments = []
+    for first, n, _, _, read_block in iter_blocks(path):
+        if stop is not None and first >= stop:
+            break
+        if first + n <= start:
+            continue
+        block = read_block()
+        lo = max(start - first, 0)
+        hi = n if stop is None else min(stop - first, n)
+        segments.extend(block[lo:hi])
+    return segments
+
+
+def read_between(path, start_seconds, end_seconds):
+    """Segments overlapping [start_seconds, end_seconds)."""
+    segments = []
+    for _, _, first_start, last_end, read_block in iter_blocks(path):
+        if first_start >= end_seconds:
+            break
+        if last_end <= start_seconds:
+            continue
+        segments.extend(
+            s
+            for s in read_block()
+            if s["end"] > start_seconds and s["start"] < end_seconds
+        )
+    return segments
+
+
+def iter_segments(path):
+    """Every segment in order, one block in memory at a time."""
+    for *_, read_block in iter_blocks(path):
+        yield from read_block()
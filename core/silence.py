@@ -0,0 +1,138 @@
+"""
+Dead-air trimming before encoding (optional, LITELEARN_TRIM_SILENCE).
+
+Speech is found with a frame-energy detector on the 16 kHz signal Whisper
+uses. Pauses longer than LITELEARN_SILENCE_MIN_SECONDS are shortened to
+LITELEARN_SILENCE_KEEP_SECONDS, and everything else is kept. The kept
+stretches form a time map of [trimmed_start, original_start, duration]
+triples, in seconds. It maps transcript timestamps from the trimmed audio back
+onto the original recording, and the other way for players of the trimmed audio.
+"""
+
+import bisect
+
+import numpy as np
+from django.conf import settings
+
+from .transcription import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# Adaptive threshold: this far below the loud end of the recording counts as silence.
+DYNAMIC_RANGE_DB = 30
+MIN_THRESHOLD_DB = -50
+
+
+def frame_levels(samples):
+    """Loudness of each FRAME_SECONDS frame, in dBFS."""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.zeros(0)
+    rms = np.sqrt(
+        np.mean(np.square(samples[: n_frames * frame].reshape(n_frames, frame)), axis=1)
+    )
+    return 20 * np.log10(rms + 1e-10)
+
+
+def keep_intervals(samples, min_silence=None, keep=None, threshold_db=None):
+    """
+    Returns the (start, end) stretches of `samples` to keep, in seconds:
+    everything except the middle of each silence longer than min_silence, of
+    which `keep` seconds remain (half on each side).
+    """
+    if min_silence is None:
+        min_silence = settings.LITELEARN_SILENCE_MIN_SECONDS
+    if keep is None:
+        keep = settings.LITELEARN_SILENCE_KEEP_SECONDS
+    if threshold_db is None:
+        threshold_db = settings.LITELEARN_SILENCE_THRESHOLD_DB
+
+    duration = len(samples) / SAMPLE_RATE
+    levels = frame_levels(samples)
+    if len(levels) == 0:
+        return [(0.0, duration)]
+    if threshold_db is None:
+        threshold_db = max(MIN_THRESHOLD_DB, np.percentile(levels, 95) - DYNAMIC_RANGE_DB)
+
+    silent = levels < threshold_db
+    # Run boundaries of the silent mask: starts and ends of each quiet stretch.
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    intervals = []
+    position = 0.0
+    for start, end in zip(starts, ends):
+        start_s, end_s = start * FRAME_SECONDS, min(end * FRAME_SECONDS, duration)
+        if end_s - start_s < min_silence:
+            continue
+        cut_start, cut_end = start_s + keep / 2, end_s - keep / 2
+        if cut_start > position:
+            intervals.append((position, cut_start))
+        position = cut_end
+    if position < duration:
+        intervals.append((position, duration))
+    return intervals
+
+
+def build_time_map(intervals):
+    """[trimmed_start, original_start, duration] for each kept stretch."""
+    time_map = []
+    trimmed = 0.0
+    for start, end in intervals:
+        time_map.append([round(trimmed, 3), round(start, 3), round(end - start, 3)])
+        trimmed += end - start
+    return time_map
+
+
+def trimmed_duration(time_map):
+    return sum(length for _, _, length in time_map)
+
+
+def apply(samples, time_map):
+    """The kept stretches of `samples`, joined (what Whisper transcribes)."""
+    return np.concatenate(
+        [
+            samples[int(start * SAMPLE_RATE) : int((start + length) * SAMPLE_RATE)]
+            for _, start, length in time_map
+        ]
+    )
+
+
+def ffmpeg_filter(time_map):
+    """An ffmpeg audio filter that keeps the same stretches of the source."""
+    ranges = "+".join(
+        f"between(t,{start:.3f},{start + length:.3f})" for _, start, length in time_map
+    )
+    return f"aselect='{ranges}',asetpts=N/SR/TB"
+
+
+def to_original(seconds, time_map):
+    """Trimmed-audio time -> original-recording time."""
+    if not time_map:
+        return seconds
+    index = max(bisect.bisect_right([row[0] for row in time_map], seconds) - 1, 0)
+    trimmed_start, original_start, _ = time_map[index]
+    return round(original_start + seconds - trimmed_start, 3)
+
+
+def to_trimmed(seconds, time_map):
+    """Original-recording time -> trimmed-audio time (cut pauses collapse to a point)."""
+    if not time_map:
+        return seconds
+    index = max(bisect.bisect_right([row[1] for row in time_map], seconds) - 1, 0)
+    trimmed_start, original_start, length = time_map[index]
+    return round(trimmed_start + min(max(seconds - original_start, 0), length), 3)
+
+
+def remap_segments(segments, time_map, convert=to_original):
+    """Copies of Whisper segments with start/end moved to the other timeline."""
+    if not time_map:
+        return segments
+    remapped = []
+    for segment in segments:
+        segment = dict(segment)
+        segment["start"] = convert(segment["start"], time_map)
+        segment["end"] = convert(segment["end"], time_map)
+        remapped.append(segment)
+    return remapped
@@ -0,0 +1,197 @@
+"""
+Map-reduce study-guide generation for transcripts of any length.
+
+Short transcripts go to the LLM in one prompt, as before. Longer ones are split
+into token-budgeted chunks, each chunk is condensed into notes (concurrently,
+with bounded parallelism), and the notes are reduced into the final guide. If
+the notes themselves are still over budget, they are condensed again.
+
+Any object with a `generate_content(prompt)` method returning something with a
+`.text` attribute works as the model, e.g. genai.GenerativeModel or StubModel.
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.conf import settings
+
+# Part of the LLM cache key: bump whenever the prompts below change.
+PROMPT_TEMPLATE_VERSION = "1"
+
+STUDY_GUIDE_FORMAT = """
+Structure your response exactly like this:
+**1. Core Subject:** (One sentence on what this is about)
+**2. Key Concepts:** (3-5 bullet points of the most important ideas)
+**3. Detailed Summary:** (A 2-paragraph explanation of the content)
+"""
+
+SINGLE_PROMPT = """
+You are an expert academic tutor.
+Analyze the following lecture transcript and produce a concise study guide.
+{format}
+TRANSCRIPT:
+{text}
+"""
+
+MAP_PROMPT = """
+You are an expert academic tutor.
+Below is part {index} of {total} of a lecture transcript. Write dense study notes
+for this part only: the main ideas, definitions and examples, as bullet points.
+
+TRANSCRIPT PART:
+{text}
+"""
+
+REDUCE_PROMPT = """
+You are an expert academic tutor.
+Below are study notes taken from consecutive parts of one lecture. Combine them
+into a single concise study guide for the whole lecture.
+{format}
+NOTES:
+{text}
+"""
+
+# Leave room in every request for the instructions around the text.
+PROMPT_OVERHEAD_TOKENS = 300
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def split_text(text, max_tokens):
+    """Splits text into chunks of at most ~max_tokens, cutting at sentence ends."""
+    max_chars = max(1, max_tokens * 4)
+    chunks, current = [], ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        # A single run-on "sentence" longer than a chunk gets hard-wrapped.
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class StubModel:
+    """
+    Offline stand-in for genai.GenerativeModel with the same generate_content()
+    interface. It echoes the start of the prompt's text, so it is useful for
+    tests, benchmarks and running without an API key.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        body = prompt.rsplit(":\n", 1)[-1].strip()
+        first = _SENTENCE_END.split(body, 1)[0][:200]
+        return SimpleNamespace(
+            text=(
+                f"**1. Core Subject:** {first}\n\n"
+                f"**2. Key Concepts:**\n\n* {first}\n\n"
+                f"**3. Detailed Summary:** {body[:400]}"
+            )
+        )
+
+
+_gemini_lock = threading.Lock()
+_gemini_configured = False
+
+
+def _gemini():
+    """
+    The google.generativeai module, configured with GEMINI_API_KEY. Imported on
+    first use, so processes that never summarize (web, migrate) never load it.
+    """
+    global _gemini_configured
+    import google.generativeai as genai
+
+    with _gemini_lock:
+        if not _gemini_configured:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("No API key found. Please check your .env file.")
+            genai.configure(api_key=api_key)
+            _gemini_configured = True
+    return genai
+
+
+def get_model(name=None):
+    """
+    The configured LLM: Gemini, or the offline stub when LITELEARN_LLM_BACKEND = "stub".
+    Wrapped in the response cache (core/llm_cache.py) unless LITELEARN_LLM_CACHE is off.
+    """
+    if settings.LITELEARN_LLM_BACKEND == "stub":
+        model = StubModel()
+    else:
+        model = _gemini().GenerativeModel(name or settings.LITELEARN_LLM_MODEL)
+
+    if not settings.LITELEARN_LLM_CACHE:
+        return model
+
+    from .llm_cache import CachedModel, get_cache
+
+    return CachedModel(model, get_cache(), PROMPT_TEMPLATE_VERSION)
+
+
+class MapReduceSummarizer:
+    def __init__(self, model, token_budget=None, max_workers=None):
+        self.model = model
+        self.token_budget = token_budget or settings.LITELEARN_SUMMARY_TOKEN_BUDGET
+        self.max_workers = max_workers or settings.LITELEARN_SUMMARY_MAX_WORKERS
+
+    def _generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def _condense(self, text):
+        """Map step: one set of notes per chunk, in the original order."""
+        chunks = split_text(text, self.token_budget - PROMPT_OVERHEAD_TOKENS)
+        prompts = [
+            MAP_PROMPT.format(index=i + 1, total=len(chunks), text=chunk)
+            for i, chunk in enumerate(chunks)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            notes = list(executor.map(self._generate, prompts))
+        return "\n\n".join(notes)
+
+    def summarize(self, transcript_text):
+        """Returns the study guide as Markdown."""
+        if estimate_tokens(transcript_text) + PROMPT_OVERHEAD_TOKENS <= self.token_budget:
+            return self._generate(
+                SINGLE_PROMPT.format(format=STUDY_GUIDE_FORMAT, text=transcript_text)
+            )
+
+        notes = self._condense(transcript_text)
+        # Very long lectures: the notes can still be over budget, so condense again.
+        while estimate_tokens(notes) + PROMPT_OVERHEAD_TOKENS > self.token_budget:
+            shorter = self._condense(notes)
+            if len(shorter) >= len(notes):
+                break  # the model is not shrinking the text; reduce what we have
+            notes = shorter
+
+        return self._generate(REDUCE_PROMPT.format(format=STUDY_GUIDE_FORMAT, text=notes))
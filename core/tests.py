@@ -1,3 +1,1876 @@
-from django.test import TestCase
+import io
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import (
+    asr,
+    audio_streaming,
+    bundle,
+    catalog,
+    dedup,
+    ingest,
+    jobs,
+    llm_cache,
+    metrics,
+    model_pool,
+    pdf_cache,
+    pipeline,
+    renditions,
+    search,
+    segment_store,
+    silence,
+    summarizer,
+    transcription,
+    youtube,
+)
+from .media_processor import ContentProcessor, EncodedAudio
+from .models import AudioRendition, Lecture, MediaCacheEntry, ProcessingJob
+
+# --- Helpers ---------------------------------------------------------------------
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+
+class LiteLearnTestCase(TempDirMixin, TestCase):
+    """Media in a temp dir, a private cache and the offline LLM stub."""
+
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(
+            MEDIA_ROOT=self.tmp,
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            LITELEARN_LLM_BACKEND="stub",
+            LITELEARN_LLM_CACHE=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Locmem caches outlive the test; the database (and its ids) do not.
+        cache.clear()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves server.data, honouring (or ignoring) Range like a media CDN would."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        data = server.data
+        requested = self.headers.get("Range")
+        server.ranges.append(requested)
+        start = 0
+        if requested and server.honour_range:
+            start = int(requested.removeprefix("bytes=").rstrip("-"))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.cut_after:
+            # Drop the connection partway through, once.
+            body, server.cut_after = body[: server.cut_after], 0
+        self.wfile.write(body)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def reset(self, data, honour_range=True, cut_after=0):
+        self.data = data
+        self.honour_range = honour_range
+        self.cut_after = cut_after
+        self.ranges = []
+
+    def url(self, name="audio.webm"):
+        host, port = self.server_address
+        return f"http://{host}:{port}/{name}"
+
+
+class FixtureServerMixin(TempDirMixin):
+    """A local stand-in for YouTube's media servers, on a free port."""
+
+    data = bytes(range(256)) * 1200  # 300 KB
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FixtureServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.reset(self.data)
+        # No pauses between retries.
+        patcher = mock.patch("core.youtube.time.sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+
+# --- YouTube ingestion (core/youtube.py) -------------------------------------------
+
+
+def audio_format(format_id, abr=None, vcodec="none", acodec="opus", **extra):
+    """A yt-dlp format dict."""
+    return {"format_id": format_id, "abr": abr, "vcodec": vcodec, "acodec": acodec, **extra}
+
+
+class DownloadTests(FixtureServerMixin, SimpleTestCase):
+    def test_complete_download(self):
+        path = youtube.download(self.server.url(), os.path.join(self.tmp, "a.webm"))
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, [None])
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_resumes_after_interrupted_transfer(self):
+        self.server.reset(self.data, cut_after=100_000)
+        path = youtube.download(self.server.url(), os.path.join(self.tmp, "a.webm"))
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, [None, "bytes=100000-"])
+
+    def test_later_call_resumes_part_file(self):
+        path = os.path.join(self.tmp, "a.webm")
+        self.server.reset(self.data, cut_after=50_000)
+        with self.assertRaises(youtube.IncompleteDownload):
+            youtube.download(self.server.url(), path, retries=0)
+        self.assertEqual(os.path.getsize(path + ".part"), 50_000)
+
+        youtube.download(self.server.url(), path, retries=0)
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, [None, "bytes=50000-"])
+
+    def test_server_ignoring_range_restarts(self):
+        path = os.path.join(self.tmp, "a.webm")
+        with open(path + ".part", "wb") as f:
+            f.write(b"stale bytes")
+        self.server.reset(self.data, honour_range=False)
+        youtube.download(self.server.url(), path)
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, ["bytes=11-"])
+
+    def test_416_on_complete_part_file(self):
+        path = os.path.join(self.tmp, "a.webm")
+        with open(path + ".part", "wb") as f:
+            f.write(self.data)
+        youtube.download(self.server.url(), path)
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.data)}-"])
+
+    def test_416_on_oversized_part_file_starts_over(self):
+        path = os.path.join(self.tmp, "a.webm")
+        with open(path + ".part", "wb") as f:
+            f.write(self.data + b"junk")
+        youtube.download(self.server.url(), path)
+        self.assertEqual(self.read(path), self.data)
+        self.assertEqual(self.server.ranges, [f"bytes={len(self.data) + 4}-", None])
+
+    def test_download_audio_picks_format_and_reuses_file(self):
+        formats = [
+            audio_format("251", 160, ext="webm", url=self.server.url("251")),
+            audio_format("249", 50, ext="webm", url=self.server.url("249")),
+        ]
+        video = youtube.VideoInfo("abc", "https://youtu.be/abc", duration=60, formats=formats)
+        path = youtube.download_audio(video, self.tmp)
+        self.assertEqual(os.path.basename(path), "yt_abc_249.webm")
+        self.assertEqual(self.read(path), self.data)
+
+        self.assertEqual(youtube.download_audio(video, self.tmp), path)
+        self.assertEqual(len(self.server.ranges), 1)
+
+
+class DownloadQueueTests(TempDirMixin, SimpleTestCase):
+    def test_concurrency_cap(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def slow_download(video, output_dir):
+            with lock:
+                running.append(video)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(video)
+            return os.path.join(output_dir, video)
+
+        results = {}
+        with mock.patch("core.youtube.download_audio", slow_download):
+            with youtube.DownloadQueue(concurrency=2) as queue:
+                threads = [
+                    threading.Thread(
+                        target=lambda v=f"v{i}": results.update({v: queue.download(v, self.tmp)})
+                    )
+                    for i in range(6)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(results["v3"], os.path.join(self.tmp, "v3"))
+
+
+@override_settings(LITELEARN_YOUTUBE_MIN_AUDIO_KBPS=48, LITELEARN_YOUTUBE_MAX_DURATION=3600)
+class AudioFormatTests(SimpleTestCase):
+    def test_smallest_sufficient_audio_only(self):
+        formats = [
+            audio_format("low", 32),
+            audio_format("mid", 64),
+            audio_format("high", 160),
+            audio_format("video", 128, vcodec="avc1"),
+        ]
+        self.assertEqual(youtube.choose_audio_format(formats, 600)["format_id"], "mid")
+
+    def test_size_beats_bitrate_when_known(self):
+        formats = [audio_format("mid", 64, filesize=9_000_000), audio_format("high", 160, filesize=4_000_000)]
+        self.assertEqual(youtube.choose_audio_format(formats, 600)["format_id"], "high")
+
+    def test_best_when_all_below_minimum(self):
+        formats = [audio_format("a", 24), audio_format("b", 40)]
+        self.assertEqual(youtube.choose_audio_format(formats)["format_id"], "b")
+
+    def test_smallest_muxed_without_audio_only(self):
+        formats = [
+            audio_format("720p", vcodec="avc1", tbr=2500),
+            audio_format("360p", vcodec="avc1", tbr=700),
+            audio_format("mute", vcodec="avc1", acodec="none", tbr=100),
+        ]
+        self.assertEqual(youtube.choose_audio_format(formats, 600)["format_id"], "360p")
+
+    def test_no_audio_rejected(self):
+        with self.assertRaises(youtube.VideoRejected):
+            youtube.choose_audio_format([audio_format("mute", vcodec="avc1", acodec="none")])
+
+    def test_too_long_rejected(self):
+        youtube.check(youtube.VideoInfo("ok", "u", duration=3600))
+        with self.assertRaises(youtube.VideoRejected):
+            youtube.check(youtube.VideoInfo("long", "u", duration=3601))
+
+    @override_settings(LITELEARN_YOUTUBE_MAX_DURATION=0)
+    def test_no_limit(self):
+        youtube.check(youtube.VideoInfo("long", "u", duration=100 * 3600))
+
+
+# --- Job queue (core/jobs.py) ---------------------------------------------------------
+
+
+@override_settings(
+    LITELEARN_JOB_RETRY_BACKOFF=30,
+    LITELEARN_JOB_RETRY_BACKOFF_MAX=100,
+    LITELEARN_JOB_HEARTBEAT_SECONDS=3600,
+)
+class JobQueueTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecture = Lecture.objects.create(title="Lecture")
+        patcher = mock.patch("core.pipeline.process_lecture_record")
+        self.process = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_next(self):
+        job = jobs.claim_next_job("test-worker")
+        self.assertIsNotNone(job)
+        return jobs.run_job(job), ProcessingJob.objects.get(pk=job.pk)
+
+    def test_claims_oldest_due_job_once(self):
+        later = jobs.enqueue(self.lecture)
+        later.run_after = timezone.now() + timedelta(hours=1)
+        later.save()
+        due = jobs.enqueue(self.lecture)
+
+        job = jobs.claim_next_job("test-worker")
+        self.assertEqual(job.pk, due.pk)
+        self.assertEqual(job.status, ProcessingJob.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.worker, "test-worker")
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertIsNone(jobs.claim_next_job("other-worker"))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([jobs.backoff_delay(n) for n in range(1, 5)], [30, 60, 100, 100])
+
+    def test_success(self):
+        jobs.enqueue(self.lecture)
+        ok, job = self.run_next()
+        self.assertTrue(ok)
+        self.assertEqual(job.status, ProcessingJob.SUCCEEDED)
+        self.assertEqual(job.progress, 100)
+        self.assertIsNotNone(job.finished_at)
+        # Not the last attempt, so a Gemini failure should raise and be retried.
+        self.assertFalse(self.process.call_args.kwargs["summary_fallback"])
+
+    def test_failure_is_retried_with_backoff_then_fails(self):
+        self.process.side_effect = RuntimeError("ffmpeg crashed")
+        jobs.enqueue(self.lecture, max_attempts=2)
+
+        before = timezone.now()
+        ok, job = self.run_next()
+        self.assertFalse(ok)
+        self.assertEqual(job.status, ProcessingJob.QUEUED)
+        self.assertIn("ffmpeg crashed", job.error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=30))
+        self.assertIsNone(jobs.claim_next_job("test-worker"))
+
+        ProcessingJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        ok, job = self.run_next()
+        self.assertFalse(ok)
+        self.assertEqual(job.status, ProcessingJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(self.process.call_args.kwargs["summary_fallback"])
+
+    def test_rejected_video_is_not_retried(self):
+        self.process.side_effect = youtube.VideoRejected("too long")
+        jobs.enqueue(self.lecture)
+        ok, job = self.run_next()
+        self.assertEqual(job.status, ProcessingJob.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_requeue_stalled(self):
+        now = timezone.now()
+        old = now - timedelta(minutes=10)
+
+        def running(attempts, heartbeat_at):
+            job = jobs.enqueue(self.lecture, max_attempts=3)
+            ProcessingJob.objects.filter(pk=job.pk).update(
+                status=ProcessingJob.RUNNING,
+                attempts=attempts,
+                started_at=old,
+                heartbeat_at=heartbeat_at,
+                stage="transcribe",
+            )
+            return job.pk
+
+        stalled = running(1, old)
+        exhausted = running(3, old)
+        alive = running(1, now)
+
+        found = jobs.requeue_stalled(stall_seconds=300, dry_run=True)
+        self.assertEqual({job.pk for job in found}, {stalled, exhausted})
+        self.assertEqual(ProcessingJob.objects.get(pk=stalled).status, ProcessingJob.RUNNING)
+
+        jobs.requeue_stalled(stall_seconds=300)
+        statuses = dict(ProcessingJob.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[stalled], ProcessingJob.QUEUED)
+        self.assertEqual(statuses[exhausted], ProcessingJob.FAILED)
+        self.assertEqual(statuses[alive], ProcessingJob.RUNNING)
+        self.assertIn("during transcribe", ProcessingJob.objects.get(pk=stalled).error)
+        self.assertEqual(jobs.claim_next_job("test-worker").pk, stalled)
+
+
+# --- Dedup cache (core/dedup.py) ------------------------------------------------------
+
+
+@override_settings(LITELEARN_DEDUP_CACHE_MAX_MB=100)
+class DedupTests(LiteLearnTestCase):
+    def processed(self, name, size=1000):
+        lecture = Lecture(title=name, transcript=f"{name} transcript", summary=f"{name} summary")
+        lecture.processed_audio.save(f"{name}.mp3", ContentFile(b"x" * size), save=False)
+        lecture.new_size_mb = 0.5
+        lecture.save()
+        return lecture
+
+    def test_youtube_video_id(self):
+        for url in (
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://m.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+        ):
+            self.assertEqual(dedup.youtube_video_id(url), "dQw4w9WgXcQ", url)
+        self.assertIsNone(dedup.youtube_video_id("https://www.youtube.com/playlist?list=abc"))
+        self.assertIsNone(dedup.youtube_video_id("https://example.com/watch?v=dQw4w9WgXcQ"))
+
+    def test_source_key(self):
+        self.assertEqual(
+            dedup.source_key(Lecture(youtube_url="https://youtu.be/dQw4w9WgXcQ")),
+            "youtube:dQw4w9WgXcQ",
+        )
+        self.assertEqual(dedup.source_key(Lecture(source_hash="ab12")), "sha256:ab12")
+        self.assertIsNone(dedup.source_key(Lecture()))
+
+    def test_store_then_lookup_and_apply(self):
+        self.assertIsNone(dedup.lookup("sha256:abc"))
+        original = self.processed("first")
+        dedup.store("sha256:abc", original)
+
+        entry = dedup.lookup("sha256:abc")
+        self.assertEqual(entry.transcript, "first transcript")
+        self.assertEqual(MediaCacheEntry.objects.get(pk=entry.pk).hits, 1)
+        self.assertEqual(entry.size_bytes, 1000)
+
+        copy = dedup.apply(entry, Lecture.objects.create())
+        copy.refresh_from_db()
+        self.assertEqual(copy.title, "first")
+        self.assertEqual(copy.summary, "first summary")
+        self.assertEqual(copy.processed_audio.name, original.processed_audio.name)
+
+    def test_store_without_audio_is_a_no_op(self):
+        self.assertIsNone(dedup.store("sha256:abc", Lecture.objects.create()))
+        self.assertIsNone(dedup.store(None, self.processed("first")))
+        self.assertFalse(MediaCacheEntry.objects.exists())
+
+    def test_evicts_least_recently_used_and_keeps_files_in_use(self):
+        old = self.processed("old")
+        new = self.processed("new")
+        dedup.store("sha256:old", old)
+        dedup.store("sha256:new", new)
+        MediaCacheEntry.objects.filter(source_key="sha256:old").update(
+            last_used_at=timezone.now() - timedelta(days=1)
+        )
+        old_audio = old.processed_audio.path
+        old.delete()
+
+        self.assertEqual(dedup.evict(max_bytes=500), 1)
+        self.assertEqual(
+            list(MediaCacheEntry.objects.values_list("source_key", flat=True)), ["sha256:new"]
+        )
+        self.assertFalse(os.path.exists(old_audio))
+
+        # The remaining entry's audio still belongs to a lecture: evicting it would
+        # free nothing, so it stays.
+        self.assertEqual(dedup.evict(max_bytes=0), 0)
+        self.assertTrue(MediaCacheEntry.objects.filter(source_key="sha256:new").exists())
+        self.assertTrue(os.path.exists(new.processed_audio.path))
+
+    def test_size_limit_counts_only_files_of_deleted_lectures(self):
+        kept, deleted = self.processed("kept"), self.processed("deleted")
+        dedup.store("sha256:kept", kept)
+        dedup.store("sha256:deleted", deleted)
+        MediaCacheEntry.objects.filter(source_key="sha256:kept").update(
+            last_used_at=timezone.now() - timedelta(days=1)
+        )
+        deleted.delete()
+
+        # 2000 bytes referenced, but only the deleted lecture's 1000 are the cache's.
+        self.assertEqual(dedup.evict(max_bytes=1000), 0)
+        # Over the limit: the older entry frees nothing, so the newer one goes.
+        self.assertEqual(dedup.evict(max_bytes=999), 1)
+        self.assertEqual(
+            list(MediaCacheEntry.objects.values_list("source_key", flat=True)), ["sha256:kept"]
+        )
+        self.assertFalse(os.path.exists(deleted.processed_audio.path))
+
+    def test_file_shared_by_two_entries_is_freed_with_the_last_one(self):
+        lecture = self.processed("shared")
+        dedup.store("sha256:one", lecture)
+        dedup.store("youtube:aaaaaaaaaaa", lecture)
+        path = lecture.processed_audio.path
+        lecture.delete()
+
+        MediaCacheEntry.objects.filter(source_key="sha256:one").update(
+            last_used_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(dedup.evict(max_bytes=0), 2)
+        self.assertFalse(os.path.exists(path))
+
+
+# --- Ranged audio responses (core/audio_streaming.py) -------------------------------
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        parse = audio_streaming.parse_range
+        self.assertEqual(parse("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse("bytes=900-5000", 1000), (900, 999))
+        self.assertEqual(parse("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse("bytes=-5000", 1000), (0, 999))
+
+    def test_whole_file(self):
+        for header in (None, "", "bytes=-", "items=0-9", "bytes=0-9,20-29"):
+            self.assertIsNone(audio_streaming.parse_range(header, 1000), header)
+
+    def test_not_satisfiable(self):
+        for header in ("bytes=1000-", "bytes=50-10", "bytes=-0"):
+            with self.assertRaises(audio_streaming.RangeNotSatisfiable):
+                audio_streaming.parse_range(header, 1000)
+
+
+@override_settings(LITELEARN_AUDIO_CACHE_MAX_AGE=86400)
+class RangedResponseTests(TempDirMixin, SimpleTestCase):
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp, "audio.mp3")
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+        self.version = audio_streaming.file_version(self.path)
+        self.etag = f'"{self.version}"'
+
+    def get(self, method="get", query="", **headers):
+        request = getattr(RequestFactory(), method)(f"/audio/{query}", headers=headers)
+        return audio_streaming.ranged_file_response(request, self.path, "audio/mpeg")
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_partial_content(self):
+        response = self.get(Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 100-199/1024")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(self.body(response), self.data[100:200])
+
+    def test_range_past_the_end(self):
+        response = self.get(Range="bytes=1024-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range(self):
+        response = self.get(Range="bytes=100-", **{"If-Range": self.etag})
+        self.assertEqual(response.status_code, 206)
+        # The client's partial copy is of another version: send the whole file.
+        response = self.get(Range="bytes=100-", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+    def test_not_modified(self):
+        response = self.get(**{"If-None-Match": self.etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_head(self):
+        response = self.get(method="head", Range="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(response.content, b"")
+
+    def test_versioned_url_is_immutable(self):
+        response = self.get(query=f"?v={self.version}")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=86400", response["Cache-Control"])
+
+
+@override_settings(
+    LITELEARN_DEFAULT_RENDITION="mp3-32k", LITELEARN_AUDIO_BANDWIDTH_SHARE=0.5
+)
+class RenditionChoiceTests(SimpleTestCase):
+    ladder = [
+        AudioRendition(name=name, bitrate_kbps=kbps)
+        for name, kbps in (("opus-12k", 12), ("opus-24k", 24), ("mp3-32k", 32))
+    ]
+
+    def choose(self, query="", headers=None):
+        request = RequestFactory().get(f"/audio/{query}", headers=headers)
+        chosen = renditions.choose(self.ladder, request)
+        return chosen.name if chosen else None
+
+    def test_default_without_hints(self):
+        self.assertEqual(self.choose(), "mp3-32k")
+        with self.settings(LITELEARN_DEFAULT_RENDITION="gone"):
+            self.assertEqual(self.choose(), "mp3-32k")  # falls back to the best
+
+    def test_explicit_rendition_wins(self):
+        self.assertEqual(self.choose("?rendition=opus-24k", {"Save-Data": "on"}), "opus-24k")
+        self.assertEqual(self.choose("?rendition=nope"), "mp3-32k")
+
+    def test_save_data_and_slow_connections_get_the_smallest(self):
+        for headers in ({"Save-Data": "on"}, {"ECT": "2g"}, {"ECT": "slow-2g"}):
+            self.assertEqual(self.choose(headers=headers), "opus-12k", headers)
+        self.assertEqual(self.choose(headers={"ECT": "4g"}), "mp3-32k")
+
+    def test_bandwidth_with_headroom(self):
+        self.assertEqual(self.choose("?kbps=64"), "mp3-32k")
+        self.assertEqual(self.choose("?kbps=60"), "opus-24k")
+        self.assertEqual(self.choose("?kbps=10"), "opus-12k")  # nothing fits
+        # Downlink is in Mbps; ?kbps= takes precedence.
+        self.assertEqual(self.choose(headers={"Downlink": "0.03"}), "opus-12k")
+        self.assertEqual(self.choose("?kbps=100", headers={"Downlink": "0.03"}), "mp3-32k")
+        self.assertEqual(self.choose("?kbps=fast"), "mp3-32k")
+
+    def test_no_renditions(self):
+        self.assertIsNone(renditions.choose([], RequestFactory().get("/")))
+
+
+@override_settings(LITELEARN_AUDIO_SEGMENTS=True)
+class HlsSegmentTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecture = Lecture.objects.create(title="Segmented")
+        for name, codec, mime_type, extension in (
+            ("low", "opus", "audio/ogg", "ogg"),
+            ("standard", "mp3", "audio/mpeg", "mp3"),
+        ):
+            rendition = AudioRendition(
+                lecture=self.lecture,
+                name=name,
+                codec=codec,
+                bitrate_kbps=32,
+                mime_type=mime_type,
+            )
+            rendition.file.save(f"talk.{extension}", ContentFile(b"\0" * 100))
+
+    def test_only_mpeg_renditions_are_segmented(self):
+        with mock.patch.object(audio_streaming, "ensure_segments") as ensure:
+            pipeline.pregenerate_segments(self.lecture)
+        ensure.assert_called_once_with(
+            self.lecture.renditions.get(name="standard").file.path
+        )
+
+    def test_playlist_url_only_for_mpeg(self):
+        data = Client().get(
+            f"/lecture/{self.lecture.pk}/audio/", headers={"Accept": "application/json"}
+        ).json()
+        self.assertEqual(
+            {r["name"]: "playlist_url" in r for r in data["renditions"]},
+            {"low": False, "standard": True},
+        )
+
+    def test_no_playlist_for_opus(self):
+        with mock.patch.object(audio_streaming, "ensure_segments") as ensure:
+            response = Client().get(f"/lecture/{self.lecture.pk}/audio/low/hls/index.m3u8")
+        self.assertEqual(response.status_code, 404)
+        ensure.assert_not_called()
+
+
+# --- Segment store (core/segment_store.py) ----------------------------------------
+
+
+def make_segments(n, offset=0):
+    return [
+        {
+            "start": (offset + i) * 2.5,
+            "end": (offset + i) * 2.5 + 2.0,
+            "text": f" Segment {offset + i} – ဟယ်လို",
+            "avg_logprob": -0.25,
+        }
+        for i in range(n)
+    ]
+
+
+class SegmentStoreTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp, "transcripts", "lecture.seg")
+        # Small blocks, so reads have to cross block boundaries.
+        patcher = mock.patch.object(segment_store, "BLOCK_SEGMENTS", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip(self):
+        segments = make_segments(10)
+        segment_store.write(self.path, segments)
+        self.assertEqual(segment_store.count(self.path), 10)
+        self.assertEqual(list(segment_store.iter_segments(self.path)), segments)
+        self.assertEqual(len(list(segment_store.iter_blocks(self.path))), 3)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["lecture.seg"])
+
+    def test_rounds_to_milliseconds_and_half_floats(self):
+        segment_store.write(
+            self.path, [{"start": 1.23456, "end": 2.0004, "text": "x", "avg_logprob": -0.3333}]
+        )
+        (segment,) = segment_store.read(self.path)
+        self.assertEqual((segment["start"], segment["end"]), (1.235, 2.0))
+        self.assertAlmostEqual(segment["avg_logprob"], -0.333, places=2)
+
+    def test_read_by_index(self):
+        segments = make_segments(10)
+        segment_store.write(self.path, segments)
+        self.assertEqual(segment_store.read(self.path, 3, 9), segments[3:9])
+        self.assertEqual(segment_store.read(self.path, 8), segments[8:])
+        self.assertEqual(segment_store.read(self.path, 10), [])
+
+    def test_read_between(self):
+        segments = make_segments(10)
+        segment_store.write(self.path, segments)
+        # Segment i spans [2.5 i, 2.5 i + 2).
+        self.assertEqual(segment_store.read_between(self.path, 6.0, 11.0), segments[2:5])
+        self.assertEqual(segment_store.read_between(self.path, 100, 200), [])
+
+    def test_append_and_torn_block(self):
+        segment_store.append(self.path, make_segments(3))
+        segment_store.append(self.path, make_segments(2, offset=3))
+        segment_store.append(self.path, [])
+        self.assertEqual(segment_store.read(self.path), make_segments(5))
+
+        # A crash halfway through an append leaves a partial block behind.
+        with open(self.path, "ab") as f:
+            f.write(segment_store._encode_block(make_segments(2, offset=5))[:-3])
+        self.assertEqual(segment_store.count(self.path), 5)
+        self.assertEqual(segment_store.read(self.path), make_segments(5))
+
+    def test_rejects_other_files(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(b'[{"start": 0}]')
+        with self.assertRaises(ValueError):
+            segment_store.count(self.path)
+
+
+# --- Live transcript polling (views.transcript_updates) -----------------------------
+
+
+@override_settings(LITELEARN_TRANSCRIPT_POLL_INTERVAL=7)
+class TranscriptUpdatesTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecture = Lecture.objects.create(title="Live")
+        self.lecture.replace_segments(make_segments(3))
+        self.lecture.save()
+        self.job = jobs.enqueue(self.lecture)
+        ProcessingJob.objects.filter(pk=self.job.pk).update(status=ProcessingJob.RUNNING)
+
+    def poll(self, since):
+        return Client().get(f"/lecture/{self.lecture.pk}/transcript/?since={since}")
+
+    def test_returns_segments_after_since(self):
+        data = self.poll(1).json()
+        self.assertEqual(
+            [s["start"] for s in data["segments"]], [s["start"] for s in make_segments(2, 1)]
+        )
+        self.assertEqual((data["next"], data["done"], data["retry_after"]), (3, False, 7))
+
+    def test_nothing_new_answers_at_once(self):
+        with mock.patch("time.sleep") as sleep:
+            start = time.monotonic()
+            data = self.poll(3).json()
+        self.assertLess(time.monotonic() - start, 1)
+        sleep.assert_not_called()
+        self.assertEqual((data["segments"], data["next"], data["done"]), ([], 3, False))
+
+    def test_done_once_the_job_finishes(self):
+        ProcessingJob.objects.filter(pk=self.job.pk).update(status=ProcessingJob.SUCCEEDED)
+        self.assertTrue(self.poll(3).json()["done"])
+
+    def test_bad_since(self):
+        self.assertEqual(self.poll("x").status_code, 400)
+
+
+# --- Offline bundles (core/bundle.py) ------------------------------------------------
+
+
+class BundleTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecture = Lecture.objects.create(title="Offline", summary="<p>Guide</p>")
+        self.lecture.replace_segments(make_segments(3))
+        self.lecture.processed_audio.save("talk.mp3", ContentFile(b"\xff\xfb" * 500))
+
+    def download(self, have=None, **headers):
+        url = f"/lecture/{self.lecture.pk}/bundle/"
+        return Client().get(url, {"have": have} if have else {}, headers=headers)
+
+    def archive(self, response):
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def manifest(self, response):
+        return json.loads(self.archive(response).read(bundle.MANIFEST_NAME))
+
+    def test_full_bundle(self):
+        archive = self.archive(self.download())
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ["audio.mp3", "manifest.json", "summary.html", "transcript.vtt"],
+        )
+        self.assertEqual(archive.read("summary.html"), b"<p>Guide</p>")
+        self.assertIn(b"WEBVTT", archive.read("transcript.vtt"))
+
+    def test_second_download_reuses_the_built_bundle(self):
+        first = self.download()
+        body = b"".join(first.streaming_content)
+        with mock.patch.object(bundle.captions, "render") as render:
+            second = self.download()
+            partial = self.download(Range="bytes=0-9")
+        render.assert_not_called()
+        # The cached file is a plain file response: sized and resumable.
+        self.assertEqual(second["Content-Length"], str(len(body)))
+        self.assertEqual(b"".join(second.streaming_content), body)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(partial.status_code, 206)
+
+    def test_conditional_get_renders_nothing(self):
+        etag = self.download()["ETag"]
+        with mock.patch.object(bundle.captions, "render") as render:
+            response = self.download(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_delta_leaves_out_held_parts(self):
+        parts = {p["path"]: p["id"] for p in self.manifest(self.download())["parts"]}
+        response = self.download(have=f"{parts['audio.mp3']},{parts['summary.html']}")
+        archive = self.archive(response)
+        manifest = json.loads(archive.read(bundle.MANIFEST_NAME))
+
+        self.assertEqual(sorted(archive.namelist()), ["manifest.json", "transcript.vtt"])
+        self.assertTrue(manifest["delta"])
+        self.assertEqual(
+            {p["path"]: p["included"] for p in manifest["parts"]},
+            {"audio.mp3": False, "summary.html": False, "transcript.vtt": True},
+        )
+        self.assertNotEqual(response["ETag"], self.download()["ETag"])
+
+    def test_unknown_have_ids_give_the_full_bundle(self):
+        full = self.download()
+        response = self.download(have="nope")
+        self.assertEqual(response["ETag"], full["ETag"])
+        self.assertFalse(self.manifest(response)["delta"])
+
+    def test_text_change_gives_a_new_key(self):
+        before = self.manifest(self.download())
+        self.lecture.summary = "<p>Revised</p>"
+        self.lecture.save()
+        after = self.manifest(self.download())
+
+        self.assertNotEqual(after["bundle"], before["bundle"])
+        ids = lambda manifest: {p["path"]: p["id"] for p in manifest["parts"]}
+        self.assertNotEqual(ids(after)["summary.html"], ids(before)["summary.html"])
+        self.assertEqual(ids(after)["audio.mp3"], ids(before)["audio.mp3"])
+
+
+# --- Lecture listing (core/catalog.py) ----------------------------------------------
+
+
+class CatalogTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lectures = [Lecture.objects.create(title=f"Lecture {i}") for i in range(5)]
+        # Ties on created_at are broken by id.
+        now = timezone.now()
+        for lecture, minutes in zip(self.lectures, (3, 2, 2, 2, 1)):
+            lecture.created_at = now - timedelta(minutes=minutes)
+        Lecture.objects.bulk_update(self.lectures, ["created_at"])
+        self.newest_first = [lecture.pk for lecture in reversed(self.lectures)]
+
+    def get(self, **params):
+        return Client().get("/api/lectures/", params)
+
+    def walk(self, size):
+        ids, cursor = [], None
+        while True:
+            page = self.get(size=size, **({"cursor": cursor} if cursor else {})).json()
+            ids.extend(card["id"] for card in page["lectures"])
+            cursor = page["next"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_lecture_once(self):
+        for size in (1, 2, 5, 10):
+            self.assertEqual(self.walk(size), self.newest_first)
+
+    def test_new_lectures_do_not_shift_later_pages(self):
+        first = self.get(size=2).json()
+        Lecture.objects.create(title="Newer")
+        second = self.get(size=2, cursor=first["next"]).json()
+        self.assertEqual([c["id"] for c in second["lectures"]], self.newest_first[2:4])
+        # The first page was cached, but adding a lecture starts a new list version.
+        self.assertEqual(self.get(size=2).json()["lectures"][0]["title"], "Newer")
+
+    def test_edit_shows_on_a_cached_page(self):
+        self.get()
+        self.lectures[4].title = "Renamed"
+        self.lectures[4].save()
+        self.assertEqual(self.get().json()["lectures"][0]["title"], "Renamed")
+
+    def test_deleted_lecture_leaves_the_page(self):
+        self.get()
+        self.lectures[4].delete()
+        self.assertEqual([c["id"] for c in self.get().json()["lectures"]], self.newest_first[1:])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get(cursor="not-a-cursor").status_code, 400)
+        self.assertEqual(self.get(size="many").status_code, 400)
+        response = Client().get("/lectures/", {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stats_follow_saves_and_deletes(self):
+        a, b = self.lectures[:2]
+        a.original_size_mb, a.new_size_mb = 10.0, 2.0
+        a.save()
+        b.original_size_mb, b.new_size_mb = 5.0, 1.0
+        b.save()
+        b.new_size_mb = 2.0
+        b.save()
+        self.assertEqual(
+            self.get().json()["stats"],
+            {
+                "lectures": 5,
+                "processed": 2,
+                "original_mb": 15.0,
+                "compressed_mb": 4.0,
+                "saved_mb": 11.0,
+                "saved_percentage": 73.3,
+            },
+        )
+
+        a.delete()
+        stats = catalog.get_stats()
+        self.assertEqual((stats.lectures, stats.processed, stats.saved_mb), (4, 1, 3.0))
+        # Bulk updates bypass save(); recount_stats repairs the totals.
+        Lecture.objects.filter(pk=b.pk).update(new_size_mb=4.0)
+        stats = catalog.recount_stats()
+        self.assertEqual((stats.lectures, stats.processed, stats.saved_mb), (4, 1, 1.0))
+
+
+# --- Rendered PDF cache (core/pdf_cache.py) ------------------------------------------
+
+
+class PdfCacheTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lecture = Lecture.objects.create(
+            title="Notes", summary="<p>Guide</p>", transcript="Hello."
+        )
+        patcher = mock.patch(
+            "core.pdf_generator.generate_lecture_pdf",
+            side_effect=lambda lecture: io.BytesIO(f"%PDF {lecture.summary}".encode()),
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def download(self, **headers):
+        return Client().get(f"/lecture/{self.lecture.pk}/pdf/", headers=headers)
+
+    def cached_files(self):
+        return sorted(os.listdir(os.path.join(self.tmp, "pdf")))
+
+    def test_renders_once(self):
+        first = b"".join(self.download().streaming_content)
+        second = self.download()
+        self.assertEqual(b"".join(second.streaming_content), first)
+        self.assertEqual(first, b"%PDF <p>Guide</p>")
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertIn("no-cache", second["Cache-Control"])
+
+    def test_conditional_get(self):
+        self.download()
+        # Last-Modified comes from the cached file, so only once it is rendered.
+        response = self.download()
+        self.assertEqual(response["ETag"], f'"{self.lecture.content_hash}"')
+        self.assertEqual(self.download(If_None_Match=response["ETag"]).status_code, 304)
+        self.assertEqual(
+            self.download(If_Modified_Since=response["Last-Modified"]).status_code, 304
+        )
+        self.assertEqual(self.download(If_None_Match='"stale"').status_code, 200)
+
+    def test_edit_gives_a_new_file_and_drops_the_old(self):
+        etag = self.download()["ETag"]
+        self.lecture.summary = "<p>Revised</p>"
+        self.lecture.save()
+
+        response = self.download(If_None_Match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF <p>Revised</p>")
+        self.assertEqual(
+            self.cached_files(),
+            [os.path.basename(pdf_cache.pdf_path(self.lecture.pk, self.lecture.content_hash))],
+        )
+
+    def test_hash_covers_only_what_the_pdf_shows(self):
+        content_hash = self.lecture.content_hash
+        self.lecture.pipeline_stage = "render"
+        self.lecture.save()
+        self.assertEqual(self.lecture.content_hash, content_hash)
+        self.lecture.transcript = "Hello again."
+        self.lecture.save()
+        self.assertNotEqual(self.lecture.content_hash, content_hash)
+
+
+# --- Silence trimming (core/silence.py) ---------------------------------------------
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * silence.SAMPLE_RATE)) / silence.SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def quiet(seconds):
+    return np.zeros(int(seconds * silence.SAMPLE_RATE), dtype=np.float32)
+
+
+class SilenceTests(SimpleTestCase):
+    # Kept: 0-2.25 s and 6.75-9 s of the original; the pause in between is cut.
+    time_map = [[0.0, 0.0, 2.25], [2.25, 6.75, 2.25]]
+
+    def test_long_pause_is_shortened(self):
+        samples = np.concatenate([tone(2), quiet(5), tone(2), quiet(0.5), tone(1)])
+        intervals = silence.keep_intervals(samples, min_silence=1.0, keep=0.5, threshold_db=None)
+        self.assertEqual(len(intervals), 2)
+        (start_a, end_a), (start_b, end_b) = intervals
+        self.assertEqual(start_a, 0.0)
+        self.assertAlmostEqual(end_a, 2.25, delta=0.05)
+        self.assertAlmostEqual(start_b, 6.75, delta=0.05)
+        self.assertAlmostEqual(end_b, 10.5)
+
+    def test_no_long_pause_keeps_everything(self):
+        samples = np.concatenate([tone(2), quiet(0.5), tone(2)])
+        self.assertEqual(
+            silence.keep_intervals(samples, min_silence=1.0, keep=0.5, threshold_db=None),
+            [(0.0, 4.5)],
+        )
+
+    def test_time_map(self):
+        self.assertEqual(silence.build_time_map([(0.0, 2.25), (6.75, 9.0)]), self.time_map)
+        self.assertEqual(silence.trimmed_duration(self.time_map), 4.5)
+
+    def test_to_original(self):
+        self.assertEqual(silence.to_original(1.0, self.time_map), 1.0)
+        self.assertEqual(silence.to_original(2.25, self.time_map), 6.75)
+        self.assertEqual(silence.to_original(3.0, self.time_map), 7.5)
+        self.assertEqual(silence.to_original(3.0, []), 3.0)
+
+    def test_to_trimmed(self):
+        self.assertEqual(silence.to_trimmed(7.5, self.time_map), 3.0)
+        # A moment inside the cut pause collapses onto the cut.
+        self.assertEqual(silence.to_trimmed(4.0, self.time_map), 2.25)
+        self.assertEqual(silence.to_trimmed(9.0, self.time_map), 4.5)
+
+    def test_round_trip_through_both_timelines(self):
+        for trimmed in (0.0, 0.5, 2.0, 2.3, 4.4):
+            original = silence.to_original(trimmed, self.time_map)
+            self.assertAlmostEqual(silence.to_trimmed(original, self.time_map), trimmed)
+
+    def test_remap_segments(self):
+        segments = [{"start": 2.0, "end": 3.0, "text": " across the cut"}]
+        (remapped,) = silence.remap_segments(segments, self.time_map)
+        self.assertEqual((remapped["start"], remapped["end"]), (2.0, 7.5))
+        self.assertEqual(segments[0]["end"], 3.0)
+        self.assertIs(silence.remap_segments(segments, []), segments)
+
+    def test_apply_and_ffmpeg_filter(self):
+        samples = np.concatenate([tone(2), quiet(5), tone(2)])
+        self.assertEqual(len(silence.apply(samples, self.time_map)), 4.5 * silence.SAMPLE_RATE)
+        self.assertEqual(
+            silence.ffmpeg_filter(self.time_map),
+            "aselect='between(t,0.000,2.250)+between(t,6.750,9.000)',asetpts=N/SR/TB",
+        )
+
+
+# --- Whisper model pool (core/model_pool.py) -----------------------------------------
+
+
+class CountingLoader:
+    """Loader for ModelPool that numbers its models and can fail or stall."""
+
+    def __init__(self, fail=0):
+        self.calls = 0
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, name):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("out of memory")
+        return f"{name}#{self.calls}"
+
+
+class ModelPoolTests(SimpleTestCase):
+    def test_model_is_loaded_once_and_reused(self):
+        loader = CountingLoader()
+        pool = model_pool.ModelPool("base", size=2, loader=loader)
+        for _ in range(3):
+            with pool.model() as model:
+                self.assertEqual(model, "base#1")
+        self.assertEqual(loader.calls, 1)
+        self.assertEqual((pool.stats.misses, pool.stats.hits, pool.stats.waits), (1, 2, 0))
+
+    def test_loads_up_to_size_copies(self):
+        pool = model_pool.ModelPool("base", size=2, loader=CountingLoader())
+        first, second = pool.get(), pool.get()
+        self.assertEqual({first, second}, {"base#1", "base#2"})
+        with self.assertRaises(queue.Empty):
+            pool.get(timeout=0.05)
+
+    def test_full_pool_waits_for_a_model(self):
+        pool = model_pool.ModelPool("base", size=1, loader=CountingLoader())
+        model = pool.get()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.get(timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(got, [])
+        pool.put(model)
+        waiter.join(5)
+        self.assertEqual(got, ["base#1"])
+        self.assertEqual(pool.stats.waits, 1)
+
+    def test_waiter_loads_after_a_failed_load(self):
+        loader = CountingLoader(fail=1)
+        loader.release.clear()
+        pool = model_pool.ModelPool("base", size=1, loader=loader)
+        errors, got = [], []
+
+        def first():
+            try:
+                pool.get()
+            except RuntimeError as e:
+                errors.append(e)
+
+        loading = threading.Thread(target=first)
+        loading.start()
+        self.assertTrue(loader.started.wait(5))
+        waiter = threading.Thread(target=lambda: got.append(pool.get(timeout=5)))
+        waiter.start()
+        time.sleep(0.05)
+        loader.release.set()
+        loading.join(5)
+        waiter.join(5)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(got, ["base#2"])
+        self.assertEqual(loader.calls, 2)
+
+
+# --- Transcription (core/transcription.py) ------------------------------------------
+
+
+class StubBackend(asr.TranscriptionBackend):
+    """One segment per call, spanning the audio it was given."""
+
+    def load(self, model_name, threads=0):
+        return model_name
+
+    def transcribe(self, model, audio, beam_size=0):
+        end = len(audio) / transcription.SAMPLE_RATE
+        segment = {"start": 0.0, "end": end, "text": " hello world", "avg_logprob": -0.2}
+        return {"text": segment["text"], "segments": [segment]}
+
+
+stub_transcription = override_settings(
+    LITELEARN_TRANSCRIPTION_BACKENDS={"stub": "core.tests.StubBackend"},
+    LITELEARN_TRANSCRIPTION_BACKEND="stub",
+)
+
+
+def thread_pool(max_workers):
+    """Stands in for transcription.process_pool: spawned processes would not see test settings."""
+    return ThreadPoolExecutor(max_workers)
+
+
+@stub_transcription
+class TranscriptionTests(TempDirMixin, SimpleTestCase):
+    def test_pcm_round_trip_and_slices(self):
+        samples = np.linspace(-1, 1, 1000, dtype=np.float32)
+        path = os.path.join(self.tmp, "pcm.npy")
+        transcription.save_pcm(path, samples)
+        np.testing.assert_allclose(transcription.load_pcm(path), samples, atol=1e-4)
+        np.testing.assert_allclose(
+            transcription.load_pcm(path, 100, 200), samples[100:200], atol=1e-4
+        )
+
+    def test_pool_processes_are_spawned(self):
+        pool = transcription.process_pool(1)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool._mp_context.get_start_method(), "spawn")
+
+    def test_saved_audio_slice_keeps_its_offset(self):
+        rate = transcription.SAMPLE_RATE
+        path = os.path.join(self.tmp, "pcm.npy")
+        transcription.save_pcm(path, np.zeros(3 * rate, np.float32))
+        options = transcription.options_for(3)
+        result = transcription.transcribe_saved(path, options, rate, 3 * rate)
+        self.assertEqual((result["segments"][0]["start"], result["segments"][0]["end"]), (1.0, 3.0))
+
+    def speech_with_pauses(self):
+        # Pauses at 9-11 s and 20-22 s.
+        return np.concatenate([tone(9), quiet(2), tone(9), quiet(2), tone(9)])
+
+    def test_split_points_fall_in_the_pauses(self):
+        rate = transcription.SAMPLE_RATE
+        points = transcription.find_split_points(self.speech_with_pauses(), 10)
+        self.assertEqual(len(points), 2)
+        self.assertTrue(9.2 * rate < points[0] < 10.8 * rate, points[0] / rate)
+        self.assertTrue(20.2 * rate < points[1] < 21.8 * rate, points[1] / rate)
+        self.assertEqual(transcription.find_split_points(quiet(10), 10), [])
+
+    def assert_merged(self, result, bounds):
+        rate = transcription.SAMPLE_RATE
+        self.assertEqual(result["text"], " hello world" * len(bounds))
+        self.assertEqual([s["id"] for s in result["segments"]], list(range(len(bounds))))
+        self.assertEqual(
+            [(s["start"], s["end"]) for s in result["segments"]],
+            [(round(start / rate, 3), round(end / rate, 3)) for start, end in bounds],
+        )
+
+    def test_chunk_timestamps_are_offset_when_merged(self):
+        samples = self.speech_with_pauses()
+        bounds = transcription.chunk_bounds(samples, 10)
+        self.assertEqual(len(bounds), 3)
+        options = transcription.options_for(31)
+        streamed = []
+        result = transcription.transcribe_chunked(
+            samples, options, chunk_seconds=10, workers=1, on_segments=streamed.append
+        )
+        self.assert_merged(result, bounds)
+        self.assertEqual(len(streamed), 3)
+
+        with mock.patch.object(transcription, "process_pool", thread_pool):
+            result = transcription.transcribe_chunked(
+                samples, options, chunk_seconds=10, workers=2
+            )
+        self.assert_merged(result, bounds)
+
+
+@override_settings(
+    LITELEARN_TRANSCRIPTION_BACKENDS={
+        "stub": "core.tests.StubBackend",
+        "faster-whisper": "core.asr.FasterWhisperBackend",
+    },
+    LITELEARN_TRANSCRIPTION_BACKEND="stub",
+    LITELEARN_WHISPER_MODEL="base",
+    LITELEARN_TRANSCRIBE_THREADS=0,
+    LITELEARN_TRANSCRIBE_BEAM_SIZE=0,
+    LITELEARN_TRANSCRIPTION_BY_DURATION=[
+        {"max_minutes": 20, "model": "small", "beam_size": 5},
+        {"max_minutes": 60, "backend": "faster-whisper"},
+        {"model": "tiny", "threads": 2},
+    ],
+)
+class TranscriptionOptionsTests(SimpleTestCase):
+    def test_first_matching_duration_rule_wins(self):
+        options = transcription.options_for
+        self.assertEqual(
+            options(20 * 60), transcription.TranscriptionOptions("stub", "small", 0, 5)
+        )
+        self.assertEqual(
+            options(20 * 60 + 1),
+            transcription.TranscriptionOptions("faster-whisper", "base", 0, 0),
+        )
+        # A rule without max_minutes matches any length.
+        self.assertEqual(
+            options(3 * 3600), transcription.TranscriptionOptions("stub", "tiny", 2, 0)
+        )
+
+    def test_defaults_without_rules(self):
+        with self.settings(LITELEARN_TRANSCRIPTION_BY_DURATION=[]):
+            self.assertEqual(
+                transcription.options_for(60),
+                transcription.TranscriptionOptions("stub", "base", 0, 0),
+            )
+
+    def test_overrides_go_on_top(self):
+        options = transcription.options_for(60, model="medium", beam_size=None)
+        self.assertEqual((options.model, options.beam_size), ("medium", 5))
+        self.assertEqual(str(options), "stub:medium, beam 5")
+
+    def test_rejects_unknown_options_and_backends(self):
+        with self.assertRaisesMessage(ValueError, "Unknown transcription options: temp"):
+            transcription.options_for(60, temp=0.2)
+        with self.assertRaisesMessage(ValueError, "Unknown transcription backend: 'nope'"):
+            transcription.options_for(60, backend="nope")
+
+    def test_backends_are_created_once_by_name(self):
+        self.addCleanup(asr._backends.pop, "stub", None)
+        backend = asr.get_backend()
+        self.assertIsInstance(backend, StubBackend)
+        self.assertIs(asr.get_backend("stub"), backend)
+        with self.assertRaisesMessage(ValueError, "Unknown transcription backend: 'nope'"):
+            asr.get_backend("nope")
+
+    def test_model_pools_are_per_backend_model_and_threads(self):
+        self.addCleanup(asr._backends.pop, "stub", None)
+        with mock.patch.dict(model_pool._pools, clear=True):
+            pool = model_pool.get_pool("small", "stub", 2)
+            self.assertIs(model_pool.get_pool("small", "stub", 2), pool)
+            self.assertIsNot(model_pool.get_pool("small", "stub", 4), pool)
+            with pool.model() as model:
+                self.assertEqual(model, "small")
+
+
+# --- Summarizer (core/summarizer.py) -------------------------------------------------
+
+
+class RecordingModel(summarizer.StubModel):
+    """StubModel that remembers its prompts and how many ran at once."""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            return super().generate_content(prompt)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def lecture_text(sentences):
+    return " ".join(f"Sentence number {i} explains one more idea." for i in range(sentences))
+
+
+class SummarizerTests(SimpleTestCase):
+    def test_split_text_respects_budget_and_sentences(self):
+        text = lecture_text(100)
+        chunks = summarizer.split_text(text, max_tokens=100)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 400 for chunk in chunks))
+        self.assertTrue(all(chunk.endswith("idea.") for chunk in chunks))
+        self.assertEqual(" ".join(chunks), text)
+
+    def test_split_text_hard_wraps_run_on_text(self):
+        chunks = summarizer.split_text("x" * 1000, max_tokens=100)
+        self.assertEqual([len(chunk) for chunk in chunks], [400, 400, 200])
+
+    def test_short_transcript_is_one_call(self):
+        model = RecordingModel()
+        guide = summarizer.MapReduceSummarizer(model, token_budget=2000).summarize(
+            "A short lecture. About one thing."
+        )
+        self.assertEqual(len(model.prompts), 1)
+        self.assertIn("TRANSCRIPT:\nA short lecture.", model.prompts[0])
+        self.assertIn("**1. Core Subject:** A short lecture.", guide)
+
+    def test_long_transcript_is_mapped_then_reduced(self):
+        model = RecordingModel()
+        text = lecture_text(400)
+        guide = summarizer.MapReduceSummarizer(model, token_budget=2000, max_workers=3).summarize(
+            text
+        )
+        maps = [p for p in model.prompts if "TRANSCRIPT PART:" in p]
+        reduces = [p for p in model.prompts if "NOTES:" in p]
+        chunks = summarizer.split_text(text, 2000 - summarizer.PROMPT_OVERHEAD_TOKENS)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(maps), 3)
+        self.assertEqual(len(reduces), 1)
+        self.assertIs(model.prompts[-1], reduces[0])
+        self.assertIn("**1. Core Subject:**", guide)
+        # The notes reach the reduce step in transcript order.
+        notes = reduces[0]
+        self.assertLess(notes.index(chunks[0][:40]), notes.index(chunks[1][:40]))
+
+    def test_map_step_parallelism_is_bounded(self):
+        model = RecordingModel(latency=0.02)
+        summarizer.MapReduceSummarizer(model, token_budget=500, max_workers=2).summarize(
+            lecture_text(200)
+        )
+        self.assertEqual(model.peak, 2)
+
+    @override_settings(LITELEARN_LLM_BACKEND="stub", LITELEARN_LLM_CACHE=False)
+    def test_stub_backend(self):
+        self.assertIsInstance(summarizer.get_model(), summarizer.StubModel)
+
+    def test_notes_over_budget_are_condensed_again(self):
+        model = RecordingModel()
+        summarizer.MapReduceSummarizer(model, token_budget=800).summarize(lecture_text(200))
+        parts = [p.split("\n", 3)[2] for p in model.prompts if "TRANSCRIPT PART:" in p]
+        # Two map rounds: over the transcript, then over the first round's notes.
+        self.assertEqual(sum("part 1 of" in part for part in parts), 2)
+        self.assertIn("NOTES:", model.prompts[-1])
+
+
+# --- LLM response cache (core/llm_cache.py) -----------------------------------------
+
+
+class ResponseCacheTests(TempDirMixin, SimpleTestCase):
+    def cache(self, **kwargs):
+        return llm_cache.ResponseCache(directory=self.tmp, **kwargs)
+
+    def test_keys_in_one_shard_do_not_wait_for_each_other(self):
+        cache = self.cache()
+        first, second = "ab" + "0" * 62, "ab" + "1" * 62
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "first"
+
+        worker = threading.Thread(target=cache.get_or_compute, args=(first, slow))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+        done = threading.Event()
+        threading.Thread(
+            target=lambda: (cache.get_or_compute(second, lambda: "second"), done.set())
+        ).start()
+        self.assertTrue(done.wait(2), "a key in the same shard blocked on another's compute")
+        release.set()
+        worker.join()
+        self.assertEqual(cache.get(first), "first")
+        self.assertEqual(cache.get(second), "second")
+
+    def test_lock_file_is_removed_after_set(self):
+        cache = self.cache()
+        key = cache.key("model", 1, "prompt")
+        self.assertEqual(cache.get_or_compute(key, lambda: "text"), "text")
+        self.assertEqual(os.listdir(os.path.join(self.tmp, key[:2])), [f"{key}.json"])
+
+    def test_lock_file_is_kept_when_compute_fails(self):
+        cache = self.cache()
+        key = cache.key("model", 1, "prompt")
+
+        def fail():
+            raise RuntimeError("upstream down")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_compute(key, fail)
+        self.assertEqual(cache.get_or_compute(key, lambda: "text"), "text")
+        self.assertEqual(cache.stats.misses, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, key[:2], f"{key}.lock")))
+
+    def test_set_does_not_scan_the_cache_every_time(self):
+        cache = self.cache()
+        with mock.patch.object(cache, "evict", wraps=cache.evict) as evict:
+            for i in range(20):
+                cache.set(cache.key("model", 1, f"prompt {i}"), "text")
+        self.assertEqual(evict.call_count, 1)
+
+    def test_evicts_oldest_entries_once_writes_fill_the_cache(self):
+        cache = self.cache(max_mb=2000 / (1024 * 1024))
+        keys = [cache.key("model", 1, f"prompt {i}") for i in range(20)]
+        for i, key in enumerate(keys):
+            cache.set(key, "x" * 200)
+            os.utime(cache._path(key), (i, i))
+        self.assertGreater(cache.stats.evictions, 0)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[-1]), "x" * 200)
+        sizes = [
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(self.tmp)
+            for name in files
+        ]
+        self.assertLessEqual(sum(sizes), 2000)
+
+    def test_rescans_after_interval_for_other_writers(self):
+        cache = self.cache()
+        cache.set(cache.key("model", 1, "a"), "text")
+        with mock.patch.object(cache, "evict") as evict:
+            cache.set(cache.key("model", 1, "b"), "text")
+            evict.assert_not_called()
+            cache._scanned_at -= llm_cache.EVICT_CHECK_SECONDS + 1
+            cache.set(cache.key("model", 1, "c"), "text")
+            evict.assert_called_once()
+
+
+# --- Stage metrics (core/metrics.py) --------------------------------------------------
+
+
+class StageMetricsTests(SimpleTestCase):
+    def test_stage_is_recorded_and_logged(self):
+        with self.assertLogs("core.metrics", "DEBUG") as logs:
+            with metrics.recording() as recorder:
+                with self.assertRaises(ValueError):
+                    with metrics.stage("encode") as sample:
+                        sample.bytes_in = 10
+                        raise ValueError
+        self.assertEqual(
+            [(s.stage, s.ok, s.bytes_in) for s in recorder.samples], [("encode", False, 10)]
+        )
+        self.assertIn("stage encode ok=False", logs.output[0])
+
+    def test_peak_memory_without_proc_or_resource(self):
+        with mock.patch("builtins.open", side_effect=OSError), mock.patch.object(
+            metrics, "resource", None
+        ):
+            self.assertEqual(metrics._peak_rss_mb(), 0.0)
+
+    def test_overlapping_stages_keep_the_peak_memory_mark(self):
+        with mock.patch.object(metrics, "_reset_peak_rss") as reset:
+            with metrics.stage("download"):
+                with metrics.stage("summarize"):
+                    pass
+            self.assertEqual(reset.call_count, 1)
+            with metrics.stage("finalize"):
+                pass
+            self.assertEqual(reset.call_count, 2)
+
+
+# --- Checkpointed pipeline (core/pipeline.py) --------------------------------------
+
+
+@skipUnless(shutil.which("ffmpeg"), "ContentProcessor needs ffmpeg on PATH")
+@override_settings(LITELEARN_AUDIO_SEGMENTS=False)
+class PipelineResumeTests(LiteLearnTestCase):
+    """
+    Runs LecturePipeline with encode and transcribe replaced by fakes that count
+    their calls, and checks what each retry repeats.
+    """
+
+    transcript = " Hello and welcome."
+
+    def setUp(self):
+        super().setUp()
+        self.calls = {"encode": 0, "transcribe": 0}
+        self.fail = {}
+        for name, fake in (("encode_audio", self.fake_encode), ("transcribe", self.fake_transcribe)):
+            patcher = mock.patch.object(ContentProcessor, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("core.pipeline.pregenerate_pdf")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.lecture = Lecture(title="Resumable", source_hash="f00d")
+        self.lecture.original_video.save("talk.mp3", ContentFile(b"source"), save=False)
+        self.lecture.save()
+
+    def fake_encode(self, source_path, base_path):
+        self.calls["encode"] += 1
+        paths = {}
+        for spec in renditions.ladder():
+            paths[spec["name"]] = renditions.output_path(base_path, spec)
+            with open(paths[spec["name"]], "wb") as f:
+                f.write(b"\0" * 2048)
+        return EncodedAudio(paths, np.zeros(2 * silence.SAMPLE_RATE, dtype=np.float32), 2.0)
+
+    def fake_transcribe(self, audio, on_segments=None, time_map=None):
+        self.calls["transcribe"] += 1
+        if self.fail.pop("transcribe", False):
+            raise RuntimeError("worker ran out of memory")
+        segments = [{"start": 0.0, "end": 1.5, "text": self.transcript, "avg_logprob": -0.2}]
+        return {"text": self.transcript, "segments": segments}
+
+    def attempt(self, **kwargs):
+        """One job attempt, on a freshly loaded lecture as a worker would."""
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        pipeline.process_lecture_record(lecture, **kwargs)
+        return Lecture.objects.get(pk=lecture.pk)
+
+    def assert_finished(self, lecture):
+        self.assertEqual(lecture.pipeline_stage, "render")
+        self.assertEqual(lecture.checkpoint, {})
+        self.assertEqual(lecture.transcript, self.transcript)
+        self.assertEqual(lecture.renditions.count(), len(renditions.ladder()))
+        self.assertTrue(os.path.exists(lecture.processed_audio.path))
+        self.assertEqual(os.listdir(os.path.join(self.tmp, "processed")), [])
+
+    def test_runs_every_stage(self):
+        lecture = self.attempt()
+        self.assert_finished(lecture)
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 1})
+        self.assertIn("Core Subject", lecture.summary)
+        self.assertTrue(MediaCacheEntry.objects.filter(source_key="sha256:f00d").exists())
+
+    def test_summary_failure_resumes_without_whisper(self):
+        with mock.patch.object(
+            ContentProcessor, "generate_ai_summary", side_effect=RuntimeError("quota")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.attempt(summary_fallback=False)
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        self.assertEqual(lecture.pipeline_stage, "transcribe")
+        self.assertEqual(lecture.transcript, self.transcript)
+        self.assertEqual(lecture.segment_count, 1)
+        self.assertFalse(os.path.exists(lecture.checkpoint["pcm"]))
+
+        lecture = self.attempt(summary_fallback=False)
+        self.assert_finished(lecture)
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 1})
+
+    def test_transcribe_failure_resumes_without_encoding(self):
+        self.fail["transcribe"] = True
+        with self.assertRaises(RuntimeError):
+            self.attempt()
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        self.assertEqual(lecture.pipeline_stage, "encode")
+        self.assertTrue(os.path.exists(lecture.checkpoint["pcm"]))
+
+        self.assert_finished(self.attempt())
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 2})
+
+    def test_missing_pcm_steps_back_to_encode(self):
+        self.fail["transcribe"] = True
+        with self.assertRaises(RuntimeError):
+            self.attempt()
+        os.remove(Lecture.objects.get(pk=self.lecture.pk).checkpoint["pcm"])
+
+        self.assert_finished(self.attempt())
+        self.assertEqual(self.calls, {"encode": 2, "transcribe": 2})
+
+    def test_missing_renditions_step_back_to_encode(self):
+        with mock.patch.object(
+            ContentProcessor, "generate_ai_summary", side_effect=RuntimeError("quota")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.attempt(summary_fallback=False)
+        shutil.rmtree(os.path.join(self.tmp, "processed"))
+
+        self.assert_finished(self.attempt())
+        self.assertEqual(self.calls, {"encode": 2, "transcribe": 2})
+
+    def test_interrupted_render_is_repeated_safely(self):
+        with mock.patch("core.pipeline.dedup.store", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                self.attempt()
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        self.assertEqual(lecture.pipeline_stage, "summarize")
+        moved = set(lecture.renditions.values_list("file", flat=True))
+
+        lecture = self.attempt()
+        self.assert_finished(lecture)
+        self.assertEqual(set(lecture.renditions.values_list("file", flat=True)), moved)
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 1})
+
+    def test_finished_lecture_is_not_reprocessed_until_restarted(self):
+        self.attempt()
+        self.attempt()
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 1})
+
+        pipeline.restart(Lecture.objects.filter(pk=self.lecture.pk))
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        self.assertEqual((lecture.pipeline_stage, lecture.checkpoint), ("", {}))
+
+    def test_restart_hits_dedup_cache_unless_reprocessing(self):
+        self.attempt()
+        pipeline.restart(Lecture.objects.filter(pk=self.lecture.pk))
+        self.attempt()
+        self.assertEqual(self.calls, {"encode": 1, "transcribe": 1})
+
+        pipeline.restart(Lecture.objects.filter(pk=self.lecture.pk))
+        self.assert_finished(self.attempt(use_cache=False))
+        self.assertEqual(self.calls, {"encode": 2, "transcribe": 2})
+
+    def rendition_files(self, lecture):
+        return {rendition.file.path for rendition in lecture.renditions.all()}
+
+    def test_reprocessing_deletes_the_replaced_audio(self):
+        old = self.rendition_files(self.attempt())
+        segments = audio_streaming.segment_dir(sorted(old)[0])
+        os.makedirs(segments)  # as pregenerate_segments leaves them
+
+        pipeline.restart(Lecture.objects.filter(pk=self.lecture.pk))
+        new = self.rendition_files(self.attempt(use_cache=False))
+        self.assertFalse(old & new)
+        self.assertFalse(any(os.path.exists(path) for path in old))
+        self.assertFalse(os.path.exists(segments))
+        self.assertTrue(all(os.path.exists(path) for path in new))
+
+    def test_reprocessing_keeps_audio_another_lecture_shares(self):
+        old = self.rendition_files(self.attempt())
+        copy = dedup.apply(dedup.lookup("sha256:f00d"), Lecture.objects.create(title="Copy"))
+
+        pipeline.restart(Lecture.objects.filter(pk=self.lecture.pk))
+        self.attempt(use_cache=False)
+        self.assertEqual(self.rendition_files(copy), old)
+        self.assertTrue(all(os.path.exists(path) for path in old))
+
+    def test_admin_rerun_with_profiling(self):
+        from django.contrib import admin
+
+        self.attempt()
+        job = jobs.enqueue(self.lecture, max_attempts=2)
+        ProcessingJob.objects.filter(pk=job.pk).update(status=ProcessingJob.FAILED, attempts=2)
+        model_admin = admin.site._registry[ProcessingJob]
+        with mock.patch.object(model_admin, "message_user"):
+            model_admin.rerun_with_profiling(None, ProcessingJob.objects.filter(pk=job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ProcessingJob.QUEUED, 0))
+        self.assertTrue(job.profile and job.reprocess)
+        self.assertEqual(Lecture.objects.get(pk=self.lecture.pk).pipeline_stage, "")
+
+        with override_settings(
+            LITELEARN_PROFILE_DIR=os.path.join(self.tmp, "profiles"),
+            LITELEARN_JOB_HEARTBEAT_SECONDS=3600,
+        ):
+            self.assertTrue(jobs.run_job(jobs.claim_next_job("test-worker")))
+            self.assertTrue(metrics.profile_files(job))
+        self.assertEqual(self.calls, {"encode": 2, "transcribe": 2})
+
+
+# --- Bulk ingest (core/ingest.py) ------------------------------------------------------
+
+
+class WebImportTests(SimpleTestCase):
+    def test_views_load_without_batch_pipeline_or_api_key(self):
+        code = (
+            "import os, sys, django;"
+            "os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings';"
+            "django.setup();"
+            "import config.urls;"
+            "print(sorted({'core.ingest', 'core.media_processor'} & set(sys.modules)))"
+        )
+        env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=60
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLabc"
+
+
+@override_settings(LITELEARN_JOB_HEARTBEAT_SECONDS=3600, LITELEARN_INGEST_TOKEN="s3cret")
+class PlaylistIngestTests(LiteLearnTestCase):
+    videos = [
+        ingest.Source("youtube", "https://www.youtube.com/watch?v=aaaaaaaaaaa", "One"),
+        ingest.Source("youtube", "https://www.youtube.com/watch?v=bbbbbbbbbbb", "Two"),
+    ]
+
+    def post(self, body, token="s3cret"):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return Client().post(
+            "/api/ingest/", body, content_type="application/json", headers=headers
+        )
+
+    def test_api_requires_the_token(self):
+        body = {"items": [self.videos[0].location]}
+        self.assertEqual(self.post(body, token=None).status_code, 401)
+        self.assertEqual(self.post(body, token="guess").status_code, 401)
+        with override_settings(LITELEARN_INGEST_TOKEN=""):
+            self.assertEqual(self.post(body).status_code, 403)
+        self.assertFalse(ProcessingJob.objects.exists())
+
+    def test_api_queues_playlist_without_listing_it(self):
+        with mock.patch("core.ingest.expand_playlist") as expand:
+            response = self.post({"items": [PLAYLIST_URL, self.videos[0].location]})
+        expand.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        result = response.json()
+        self.assertEqual(len(result["queued"]), 1)
+        (playlist,) = result["playlists"]
+        job = ProcessingJob.objects.get(pk=playlist["job_id"])
+        self.assertEqual((job.playlist_url, job.lecture), (PLAYLIST_URL, None))
+
+        status = Client().get(f"/jobs/{job.pk}/").json()
+        self.assertEqual(status["playlist_url"], PLAYLIST_URL)
+        self.assertIsNone(status["lecture_url"])
+
+    def test_worker_lists_playlist_and_queues_videos(self):
+        job = jobs.enqueue_playlist(PLAYLIST_URL, transcription={"model": "tiny"})
+        with mock.patch("core.ingest.expand_playlist", return_value=self.videos) as expand:
+            self.assertTrue(jobs.run_job(jobs.claim_next_job("test-worker")))
+        expand.assert_called_once_with(PLAYLIST_URL)
+
+        lecture_jobs = ProcessingJob.objects.exclude(pk=job.pk)
+        self.assertEqual(lecture_jobs.count(), 2)
+        self.assertEqual({j.lecture.title for j in lecture_jobs}, {"One", "Two"})
+        self.assertTrue(all(j.transcription == {"model": "tiny"} for j in lecture_jobs))
+
+    def test_unlistable_playlist(self):
+        import yt_dlp
+
+        error = yt_dlp.utils.DownloadError("Unable to download webpage")
+        with mock.patch.object(yt_dlp.YoutubeDL, "extract_info", side_effect=error):
+            with self.assertRaisesMessage(ValueError, "Could not list playlist"):
+                ingest.expand_playlist(PLAYLIST_URL)
+            with self.assertRaises(CommandError):
+                call_command("ingest", PLAYLIST_URL)
+
+            job = jobs.enqueue_playlist(PLAYLIST_URL, max_attempts=1)
+            self.assertFalse(jobs.run_job(jobs.claim_next_job("test-worker")))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.FAILED)
+        self.assertIn("Could not list playlist", job.error)
+
+
+@skipUnless(shutil.which("ffmpeg"), "BatchIngestor needs ffmpeg on PATH")
+@override_settings(LITELEARN_AUDIO_SEGMENTS=False)
+@stub_transcription
+class BatchIngestTests(LiteLearnTestCase):
+    def test_file_is_transcribed_from_a_saved_pcm(self):
+        path = os.path.join(self.tmp, "talk.wav")
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=2", path],
+            check=True,
+        )
+        ingestor = ingest.BatchIngestor(cpu_workers=1)
+        os.makedirs(ingestor.output_dir)
+        report = ingest.IngestReport()
+        with mock.patch("core.pipeline.pregenerate_pdf"), thread_pool(1) as pool:
+            lecture = ingestor._ingest_stages(
+                ingest.Source("file", path), pool, None, report, lambda *args: None
+            )
+        self.assertEqual((report.processed, report.failed), ([lecture.pk], []))
+        self.assertEqual(lecture.title, "talk")
+        self.assertEqual(lecture.transcript, " hello world")
+        self.assertEqual(os.listdir(ingestor.output_dir), [])
+
+
+# --- Search (core/search.py) ----------------------------------------------------------
+
+
+@override_settings(LITELEARN_SEARCH_BACKEND="core.search.SQLiteFTSBackend")
+class SearchTests(LiteLearnTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(search, "_backend", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def indexed(self, title, text):
+        lecture = Lecture.objects.create(title=title, transcript=text, summary=f"About {title}.")
+        lecture.replace_segments([{"start": 0.0, "end": 2.0, "text": text, "avg_logprob": -0.1}])
+        lecture.save()
+        search.index_lecture(lecture)
+        return lecture
+
+    def ids(self, query):
+        hits, _ = search.search(query)
+        return [hit.lecture_id for hit in hits]
+
+    def count_rows(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def test_title_ranks_above_transcript(self):
+        body = self.indexed("Cells", "Entropy always increases in a closed system.")
+        title = self.indexed("Entropy", "Heat flows from hot to cold.")
+        self.assertEqual(self.ids("entropy"), [title.pk, body.pk])
+        self.assertEqual(self.ids("entr*"), [title.pk, body.pk])
+        (hit,) = search.search("closed system")[0]
+        self.assertIn("<mark>closed</mark>", hit.segments[0].snippet)
+
+    def test_deleting_a_lecture_removes_its_rows(self):
+        gone = self.indexed("Thermodynamics", "Entropy always increases.")
+        kept = self.indexed("Optics", "Entropy of light.")
+        Lecture.objects.filter(pk=gone.pk).delete()
+        self.assertEqual(self.ids("entropy"), [kept.pk])
+        self.assertEqual(self.count_rows("search_lecture"), 1)
+        self.assertEqual(self.count_rows("search_segment"), 1)
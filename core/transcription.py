@@ -0,0 +1,287 @@
+"""
+Whisper transcription, optionally segmented for long lectures.
+
+A single Whisper pass runs on one core. For long audio we cut the 16 kHz signal
+at quiet points near every `chunk_seconds`, transcribe the chunks in a process
+pool (spawned, see process_pool()), and shift each chunk's segment timestamps by
+the chunk's start offset.
+
+Which engine does the work is a TranscriptionOptions: backend (see core/asr.py),
+model size, CPU threads and beam size. options_for() builds one from the
+settings, the LITELEARN_TRANSCRIPTION_BY_DURATION rule matching the lecture's
+length, and any per-job overrides (ProcessingJob.transcription).
+"""
+
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+from django.conf import settings
+
+from . import asr, model_pool
+
+SAMPLE_RATE = 16000  # Whisper resamples everything to 16 kHz mono
+FRAME_SECONDS = 0.03
+SMOOTH_SECONDS = 0.5  # a "silence" must be quiet for about this long
+
+
+@dataclass(frozen=True)
+class TranscriptionOptions:
+    backend: str  # a key of LITELEARN_TRANSCRIPTION_BACKENDS
+    model: str  # "tiny", "base", "small", ...
+    threads: int = 0  # CPU threads per model; 0 = the backend's default
+    beam_size: int = 0  # 0 = the backend's default
+
+    def __str__(self):
+        text = f"{self.backend}:{self.model}"
+        if self.threads:
+            text += f", {self.threads} threads"
+        if self.beam_size:
+            text += f", beam {self.beam_size}"
+        return text
+
+
+def options_for(duration=0, **overrides):
+    """
+    The TranscriptionOptions for a lecture of `duration` seconds: the settings
+    defaults, then the first LITELEARN_TRANSCRIPTION_BY_DURATION rule whose
+    max_minutes covers the lecture (a rule without max_minutes matches all),
+    then `overrides`. Raises ValueError for unknown keys or backends.
+    """
+    values = {
+        "backend": settings.LITELEARN_TRANSCRIPTION_BACKEND,
+        "model": settings.LITELEARN_WHISPER_MODEL,
+        "threads": settings.LITELEARN_TRANSCRIBE_THREADS,
+        "beam_size": settings.LITELEARN_TRANSCRIBE_BEAM_SIZE,
+    }
+    for rule in settings.LITELEARN_TRANSCRIPTION_BY_DURATION:
+        rule = dict(rule)
+        max_minutes = rule.pop("max_minutes", None)
+        if max_minutes is None or duration <= max_minutes * 60:
+            values.update(rule)
+            break
+    values.update({key: value for key, value in overrides.items() if value is not None})
+
+    unknown = set(values) - {f.name for f in fields(TranscriptionOptions)}
+    if unknown:
+        raise ValueError(f"Unknown transcription options: {', '.join(sorted(unknown))}")
+    if values["backend"] not in settings.LITELEARN_TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {values['backend']!r}")
+    return TranscriptionOptions(**values)
+
+
+def load_audio(path):
+    """Decodes any media file to float32 16 kHz mono (what Whisper consumes)."""
+    import whisper
+
+    return whisper.load_audio(path)
+
+
+def save_pcm(path, samples):
+    """
+    Stores 16 kHz samples as 16-bit PCM (.npy), the precision whisper.load_audio
+    decodes to anyway, at half the size of float32. Written atomically.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, pcm)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_pcm(path, start=0, end=None):
+    """Reads samples written by save_pcm (or samples [start:end] of them) back as float32."""
+    pcm = np.load(path, mmap_mode="r")
+    return np.asarray(pcm[start:end], dtype=np.float32) / 32768.0
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def process_pool(max_workers):
+    """
+    A process pool for Whisper work. Its processes are spawned rather than forked:
+    the callers run threads (job heartbeats, downloads, I/O pools) and hold
+    database connections, and neither survives a fork safely. Pass audio to them
+    as a save_pcm file, not as an array, which would be pickled across whole.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def find_split_points(samples, chunk_seconds, search_seconds=None):
+    """
+    Returns sample offsets at which to cut `samples` into ~chunk_seconds pieces.
+    Each cut is moved to the quietest stretch within +/- search_seconds of the
+    nominal boundary, so we avoid splitting words in half.
+    """
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    if len(samples) <= chunk:
+        return []
+    if search_seconds is None:
+        search_seconds = min(chunk_seconds / 4, 30)
+
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(samples) // frame
+    energy = np.sqrt(
+        np.mean(np.square(samples[: n_frames * frame].reshape(n_frames, frame)), axis=1)
+    )
+    smooth = max(1, int(SMOOTH_SECONDS / FRAME_SECONDS))
+    energy = np.convolve(energy, np.ones(smooth) / smooth, mode="same")
+
+    search = int(search_seconds / FRAME_SECONDS)
+    points = []
+    boundary = chunk
+    while boundary < len(samples) - chunk // 4:
+        centre = boundary // frame
+        lo = max(centre - search, 1)
+        hi = min(centre + search, n_frames - 1)
+        if hi <= lo:
+            break
+        window = energy[lo:hi]
+        start = end = int(np.argmin(window))
+        # Cut in the middle of the quiet stretch rather than at its first frame.
+        floor = window[start] * 1.05 + 1e-6
+        while end + 1 < len(window) and window[end + 1] <= floor:
+            end += 1
+        point = (lo + (start + end) // 2) * frame + frame // 2
+        points.append(point)
+        boundary = point + chunk
+    return points
+
+
+def chunk_bounds(samples, chunk_seconds):
+    """[(start, end), ...] sample offsets of the chunks, cut at silence boundaries."""
+    bounds = [0] + find_split_points(samples, chunk_seconds) + [len(samples)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def split_audio(samples, chunk_seconds):
+    """Splits into [(offset_seconds, samples), ...] at silence boundaries."""
+    return [
+        (start / SAMPLE_RATE, samples[start:end])
+        for start, end in chunk_bounds(samples, chunk_seconds)
+    ]
+
+
+def _shift_segments(result, offset):
+    segments = []
+    for segment in result.get("segments", []):
+        segment = dict(segment)
+        segment["start"] = round(segment["start"] + offset, 3)
+        segment["end"] = round(segment["end"] + offset, 3)
+        segments.append(segment)
+    return segments
+
+
+def merge_results(results):
+    """Joins per-chunk results (already offset) back into one Whisper-style result."""
+    text = ""
+    segments = []
+    for result in results:
+        text += result["text"]
+        for segment in result["segments"]:
+            segment["id"] = len(segments)
+            segments.append(segment)
+    return {"text": text, "segments": segments}
+
+
+def _transcribe_chunk(options, offset, samples):
+    backend = asr.get_backend(options.backend)
+    pool = model_pool.get_pool(options.model, options.backend, options.threads)
+    with pool.model() as model:
+        result = backend.transcribe(model, samples, options.beam_size)
+    return {"text": result["text"], "segments": _shift_segments(result, offset)}
+
+
+def transcribe_saved(pcm_path, options, start=0, end=None):
+    """
+    Transcribes samples [start:end] of audio stored with save_pcm, e.g. inside
+    process_pool(). Timestamps count from the start of the whole file.
+    """
+    return _transcribe_chunk(options, start / SAMPLE_RATE, load_pcm(pcm_path, start, end))
+
+
+def transcribe_single(audio, options=None):
+    """The plain one-pass path (audio can be a file path or a 16 kHz array)."""
+    samples = load_audio(audio) if isinstance(audio, str) else audio
+    options = options or options_for(len(samples) / SAMPLE_RATE)
+    return _transcribe_chunk(options, 0, samples)
+
+
+def transcribe_chunked(
+    audio, options=None, chunk_seconds=None, workers=None, on_segments=None
+):
+    """
+    Segmented transcription across a process pool. Returns {"text", "segments"}.
+    If given, on_segments(result) is called with each chunk's result, in order,
+    as soon as it and every chunk before it are done.
+    """
+    chunk_seconds = chunk_seconds or settings.LITELEARN_TRANSCRIBE_CHUNK_SECONDS
+    workers = workers or settings.LITELEARN_TRANSCRIBE_WORKERS or os.cpu_count() or 1
+
+    samples = load_audio(audio) if isinstance(audio, str) else audio
+    options = options or options_for(len(samples) / SAMPLE_RATE)
+    bounds = chunk_bounds(samples, chunk_seconds)
+    workers = min(workers, len(bounds))
+
+    results = []
+    if workers <= 1:
+        for start, end in bounds:
+            results.append(_transcribe_chunk(options, start / SAMPLE_RATE, samples[start:end]))
+            if on_segments is not None:
+                on_segments(results[-1])
+    else:
+        # N worker processes each using every core would oversubscribe the CPU.
+        if not options.threads:
+            options = replace(options, threads=max(1, (os.cpu_count() or 1) // workers))
+        # The workers read their chunk from one PCM file rather than each
+        # getting a pickled copy of it.
+        with tempfile.TemporaryDirectory() as directory:
+            pcm_path = os.path.join(directory, "pcm.npy")
+            save_pcm(pcm_path, samples)
+            with process_pool(workers) as executor:
+                futures = [
+                    executor.submit(transcribe_saved, pcm_path, options, start, end)
+                    for start, end in bounds
+                ]
+                for future in futures:
+                    results.append(future.result())
+                    if on_segments is not None:
+                        on_segments(results[-1])
+    return merge_results(results)
+
+
+def transcribe(audio, options=None, on_segments=None):
+    """
+    Picks the segmented path for audio longer than two chunks when
+    LITELEARN_CHUNKED_TRANSCRIPTION is on, otherwise a single Whisper pass.
+    options (a TranscriptionOptions) defaults to options_for() the audio's length.
+
+    When on_segments is given (someone is watching the lecture page), short audio
+    is also cut into LITELEARN_TRANSCRIBE_STREAM_SECONDS windows and transcribed
+    window by window, so the first text shows up after seconds, not minutes.
+    """
+    samples = load_audio(audio) if isinstance(audio, str) else audio
+    options = options or options_for(len(samples) / SAMPLE_RATE)
+    is_long = len(samples) >= 2 * settings.LITELEARN_TRANSCRIBE_CHUNK_SECONDS * SAMPLE_RATE
+
+    if settings.LITELEARN_CHUNKED_TRANSCRIPTION and is_long:
+        return transcribe_chunked(samples, options, on_segments=on_segments)
+    if on_segments is None:
+        return transcribe_single(samples, options)
+    return transcribe_chunked(
+        samples,
+        options,
+        chunk_seconds=settings.LITELEARN_TRANSCRIBE_STREAM_SECONDS,
+        workers=1,
+        on_segments=on_segments,
+    )
@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every upload straight to a temp file in fixed-size chunks (never
+    into memory) and computes its SHA-256 on the way, for the dedup cache.
+
+    The temp dir lives under MEDIA_ROOT, so saving the FileField afterwards is
+    a rename rather than a second copy of the video.
+    """
+
+    chunk_size = settings.LITELEARN_UPLOAD_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.digest.hexdigest()
+        return uploaded
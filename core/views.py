@@ -1,63 +1,82 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.conf import settings
-from django.core.files.base import ContentFile
-from django.http import FileResponse
+import hmac
+import json
 import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST, require_safe
 
 
-from .models import Lecture
+from .models import AudioRendition, Lecture, ProcessingJob
 from .forms import LectureUploadForm
-from .media_processor import ContentProcessor
-from .pdf_generator import generate_lecture_pdf
+from . import (
+    audio_streaming,
+    bundle,
+    captions,
+    catalog,
+    metrics,
+    pdf_cache,
+    renditions,
+    search,
+)
+from .jobs import enqueue
+
+
+def _wants_json(request):
+    return "application/json" in request.headers.get("Accept", "")
+
+
+def _job_payload(job):
+    return {
+        "id": job.pk,
+        "lecture_id": job.lecture_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after.isoformat(),
+        "error": job.error.strip().splitlines()[-1] if job.error else "",
+        "status_url": reverse("job_status", args=[job.pk]),
+        "lecture_url": (
+            reverse("lecture_detail", args=[job.lecture_id]) if job.lecture_id else None
+        ),
+        "playlist_url": job.playlist_url,
+    }
 
 
 def upload_lecture(request):
     if request.method == "POST":
         form = LectureUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            lecture = form.save(commit=False)  # Don't save to DB yet
-
-            processor = ContentProcessor()
-            output_dir = os.path.join(settings.MEDIA_ROOT, "processed")
-            os.makedirs(output_dir, exist_ok=True)
-
-            try:
-                # BRANCH A: YouTube URL
-                if lecture.youtube_url:
-                    results = processor.process_youtube(lecture.youtube_url, output_dir)
-                    # Use the title from YouTube if user didn't provide one
-                    if not lecture.title:
-                        lecture.title = results["title"]
-                    lecture.save()  # Now we save to get an ID
-
-                # BRANCH B: File Upload
-                elif lecture.original_video:
-                    lecture.save()  # Save first to get file path
-                    video_path = lecture.original_video.path
-                    results = processor.process_lecture(video_path, output_dir)
-
-                # Common Wrap-up
-                with open(results["audio_url"], "rb") as f:
-                    lecture.processed_audio.save(
-                        f"{lecture.title[:20]}_audio.mp3", ContentFile(f.read())
-                    )
-
-                lecture.transcript = results["transcript"]
-                lecture.summary = results["summary"]
-                lecture.new_size_mb = results["new_size_mb"]
-                # For YouTube, we don't know "original size" exactly,
-                # so we can mock it or leave it 0.
-                if lecture.youtube_url and lecture.original_size_mb == 0:
-                    # Estimate: 1 minute of 1080p video is roughly 20MB
-                    # This is a rough heuristic for the 'Data Saved' display
-                    lecture.original_size_mb = lecture.new_size_mb * 15
-
-                lecture.save()
-                return redirect("lecture_detail", pk=lecture.pk)
-
-            except Exception as e:
-                print(f"Error: {e}")
-                # Add error handling here
+            # Store the upload and hand the heavy lifting to a background worker
+            # (`manage.py runworker`) so this request returns right away.
+            lecture = form.save(commit=False)
+            upload = request.FILES.get("original_video")
+            lecture.source_hash = getattr(upload, "sha256", "")
+            lecture.save()
+            job = enqueue(lecture)
+
+            if _wants_json(request):
+                return JsonResponse(_job_payload(job), status=202)
+            return redirect("lecture_detail", pk=lecture.pk)
 
     else:
         form = LectureUploadForm()
@@ -65,17 +84,391 @@ def upload_lecture(request):
     return render(request, "core/upload.html", {"form": form})
 
 
+def search_lectures(request):
+    """
+    Ranked keyword search over titles, study guides and transcripts
+    (`?q=...&page=N`). Each hit carries the transcript timestamps it matched,
+    so the player can jump there. JSON with `Accept: application/json`.
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        return HttpResponseBadRequest("page must be a number")
+    size = settings.LITELEARN_SEARCH_PAGE_SIZE
+
+    hits, took_ms = search.search(query, limit=size + 1, offset=(page - 1) * size)
+    has_next = len(hits) > size
+    hits = hits[:size]
+
+    if _wants_json(request):
+        return JsonResponse(
+            {
+                "query": query,
+                "page": page,
+                "has_next": has_next,
+                "took_ms": took_ms,
+                "results": [hit.as_dict() for hit in hits],
+            }
+        )
+    return render(
+        request,
+        "core/search.html",
+        {
+            "query": query,
+            "hits": hits,
+            "page": page,
+            "has_next": has_next,
+            "took_ms": took_ms,
+        },
+    )
+
+
+def _catalog_page(request):
+    cursor = request.GET.get("cursor") or None
+    try:
+        size = int(request.GET["size"]) if "size" in request.GET else None
+    except ValueError:
+        raise ValueError("size must be a number") from None
+    return catalog.page(cursor, size)
+
+
+@require_safe
+def lecture_list(request):
+    """
+    All lectures, newest first, with the library's data-saved totals
+    (`?cursor=...` for the next page). JSON with `Accept: application/json`.
+    """
+    try:
+        page = _catalog_page(request)
+    except ValueError as e:  # includes catalog.InvalidCursor
+        return HttpResponseBadRequest(str(e))
+
+    if _wants_json(request):
+        response = JsonResponse(page)
+    else:
+        response = render(request, "core/lecture_list.html", page)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+@require_safe
+def lectures_api(request):
+    """The listing as JSON: {"lectures": [...], "next": cursor or null, "stats": {...}}."""
+    try:
+        return JsonResponse(_catalog_page(request))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@csrf_exempt
+@require_POST
+def ingest_api(request):
+    """
+    Queues a batch of lectures: {"items": ["<youtube url or playlist>", ...]},
+    optionally with "transcription": {"backend": ..., "model": ...} for all of them.
+    Meant for scripts: instead of a CSRF token it takes the LITELEARN_INGEST_TOKEN
+    bearer token, and it is off until one is set. Playlists are queued as jobs of
+    their own and listed by a worker: this process never runs yt-dlp.
+    """
+    token = settings.LITELEARN_INGEST_TOKEN
+    if not token:
+        return JsonResponse({"error": "Set LITELEARN_INGEST_TOKEN to enable this API."}, status=403)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    # Imported here: core.ingest pulls in the whole batch pipeline, which the
+    # web process otherwise never needs.
+    from .ingest import enqueue_sources, expand_sources
+
+    try:
+        body = json.loads(request.body)
+        items = body["items"]
+        if isinstance(items, str) or not all(isinstance(i, str) for i in items):
+            raise TypeError
+        transcription = body.get("transcription") or {}
+        if not isinstance(transcription, dict):
+            raise TypeError
+        sources = expand_sources(items, allow_paths=False, expand_playlists=False)
+    except (ValueError, KeyError, TypeError) as e:
+        return JsonResponse({"error": f"Expected {{\"items\": [urls]}}: {e}"}, status=400)
+
+    try:
+        result = enqueue_sources(sources, transcription)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(result, status=202)
+
+
+def _rendition_response(response):
+    """Marks a response as depending on the client's bandwidth hints."""
+    patch_vary_headers(response, renditions.HINT_HEADERS)
+    # Ask Chromium-based browsers to send ECT/Downlink on later requests.
+    response["Accept-CH"] = ", ".join(renditions.HINT_HEADERS)
+    return response
+
+
+def _rendition_payload(rendition):
+    payload = {
+        "name": rendition.name,
+        "codec": rendition.codec,
+        "bitrate_kbps": rendition.bitrate_kbps,
+        "mime_type": rendition.mime_type,
+        "url": rendition.stream_url,
+        "size_mb": rendition.size_mb,
+        "data_saved_percentage": rendition.data_saved_percentage,
+    }
+    if settings.LITELEARN_AUDIO_SEGMENTS and rendition.playlist_url:
+        payload["playlist_url"] = rendition.playlist_url
+    return payload
+
+
 def lecture_detail(request, pk):
     lecture = get_object_or_404(Lecture, pk=pk)
-    return render(request, "core/lecture_detail.html", {"lecture": lecture})
+    job = lecture.jobs.first()
+    ladder = list(lecture.renditions.all())
+    chosen = renditions.choose(ladder, request)
+    # Offer the chosen rendition first and the rest as fallbacks, in case the
+    # browser cannot play it (e.g. Opus on older Safari).
+    sources = [chosen] + [r for r in reversed(ladder) if r != chosen] if chosen else []
+    # HLS players (Safari) can fetch the MP3 rendition segment by segment.
+    hls = None
+    if settings.LITELEARN_AUDIO_SEGMENTS:
+        hls = next((r for r in sources if r.playlist_url), None)
+    response = render(
+        request,
+        "core/lecture_detail.html",
+        {
+            "lecture": lecture,
+            "job": job,
+            "renditions": ladder,
+            "rendition": chosen,
+            "sources": sources,
+            "hls": hls,
+        },
+    )
+    return _rendition_response(response)
+
 
+def lecture_audio(request, pk):
+    """
+    The lecture's audio at the quality that suits the client (see core/renditions.py).
+    Redirects to the chosen file; with `Accept: application/json` it lists the
+    renditions and the choice instead.
+    """
+    lecture = get_object_or_404(Lecture, pk=pk)
+    ladder = list(lecture.renditions.all())
+    chosen = renditions.choose(ladder, request)
 
+    if _wants_json(request):
+        response = JsonResponse(
+            {
+                "lecture_id": lecture.pk,
+                "original_size_mb": lecture.original_size_mb,
+                "chosen": chosen.name if chosen else None,
+                "renditions": [_rendition_payload(r) for r in ladder],
+            }
+        )
+    elif chosen is not None:
+        response = HttpResponseRedirect(chosen.stream_url)
+    elif lecture.processed_audio:
+        # Processed before renditions existed
+        response = HttpResponseRedirect(
+            reverse("stream_audio", args=[lecture.pk, renditions.default_name()])
+        )
+    else:
+        raise Http404("This lecture has no audio yet.")
+    return _rendition_response(response)
+
+
+def _audio_file(pk, name):
+    """(path, MIME type) of one of a lecture's audio renditions, or 404."""
+    rendition = AudioRendition.objects.filter(lecture_id=pk, name=name).first()
+    if rendition is not None:
+        path, content_type = rendition.file.path, rendition.mime_type
+    else:
+        lecture = get_object_or_404(Lecture, pk=pk)
+        if name != renditions.default_name() or not lecture.processed_audio:
+            raise Http404("No such audio rendition.")
+        # Processed before renditions existed
+        path, content_type = lecture.processed_audio.path, "audio/mpeg"
+
+    if not os.path.exists(path):
+        raise Http404("Audio file is missing.")
+    return path, content_type
+
+
+@require_safe
+def stream_audio(request, pk, name):
+    """One audio rendition, with Range/206 support for resuming and seeking."""
+    path, content_type = _audio_file(pk, name)
+    return audio_streaming.ranged_file_response(request, path, content_type)
+
+
+@require_safe
+def audio_segment(request, pk, name, filename):
+    """The HLS playlist or one fixed-duration segment of an audio rendition."""
+    is_playlist = filename == audio_streaming.PLAYLIST_NAME
+    if not settings.LITELEARN_AUDIO_SEGMENTS or not (
+        is_playlist or audio_streaming.SEGMENT_NAME_RE.match(filename)
+    ):
+        raise Http404("No such segment.")
+
+    path, content_type = _audio_file(pk, name)
+    if content_type not in audio_streaming.SEGMENTED_MIME_TYPES:
+        raise Http404("This rendition is not segmented.")
+    version = audio_streaming.file_version(path)
+    directory = audio_streaming.ensure_segments(path)
+    if is_playlist:
+        return audio_streaming.playlist_response(request, directory, version)
+
+    segment_path = os.path.join(directory, filename)
+    if not os.path.exists(segment_path):
+        raise Http404("No such segment.")
+    return audio_streaming.ranged_file_response(
+        request, segment_path, content_type, version
+    )
+
+
+def job_status(request, pk):
+    job = get_object_or_404(ProcessingJob, pk=pk)
+    return JsonResponse(_job_payload(job))
+
+
+@require_safe
+def metrics_endpoint(request):
+    """Per-stage pipeline metrics for Prometheus to scrape (see core/metrics.py)."""
+    token = settings.LITELEARN_METRICS_TOKEN
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(
+        metrics.prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def transcript_updates(request, pk):
+    """
+    Polled by the page of a lecture that is still being transcribed.
+    `?since=N` returns the segments after the first N, right away (holding the
+    request open would tie up a sync worker per open page). "retry_after" tells
+    the client how many seconds to wait before asking again.
+    """
+    try:
+        since = max(0, int(request.GET.get("since", 0)))
+    except ValueError:
+        return HttpResponseBadRequest("since must be a number")
+
+    lecture = get_object_or_404(Lecture.objects.only("segments_file", "segment_count"), pk=pk)
+    job = lecture.jobs.only("status").first()
+    done = job is None or job.is_finished
+    new_segments = []
+    if lecture.segment_count > since:
+        # Only the blocks after `since` are read from the segment file.
+        new_segments = lecture.load_segments(since)
+
+    return JsonResponse(
+        {
+            "segments": [
+                {"start": s["start"], "end": s["end"], "text": s["text"]}
+                for s in new_segments
+            ],
+            "next": since + len(new_segments),
+            "done": done,
+            "retry_after": settings.LITELEARN_TRANSCRIPT_POLL_INTERVAL,
+        }
+    )
+
+
+def _pdf_etag(request, pk):
+    content_hash = (
+        Lecture.objects.filter(pk=pk).values_list("content_hash", flat=True).first()
+    )
+    return content_hash or None
+
+
+def _pdf_last_modified(request, pk):
+    path = pdf_cache.cached_pdf_path(pk, _pdf_etag(request, pk) or "")
+    if path:
+        return datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+    return None
+
+
+@condition(etag_func=_pdf_etag, last_modified_func=_pdf_last_modified)
 def download_pdf(request, pk):
     lecture = get_object_or_404(Lecture, pk=pk)
 
-    # Generate the PDF in memory
-    pdf_buffer = generate_lecture_pdf(lecture)
+    # Rendered once and cached on disk (usually pre-generated by the worker)
+    pdf_path = pdf_cache.ensure_pdf(lecture)
 
     # Return as a downloadable file
     filename = f"{lecture.title[:20].replace(' ', '_')}_Notes.pdf"
-    return FileResponse(pdf_buffer, as_attachment=True, filename=filename)
+    response = FileResponse(open(pdf_path, "rb"), as_attachment=True, filename=filename)
+    # Let browsers keep the file but check the ETag before reusing it
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+def download_captions(request, pk, fmt):
+    """WebVTT or SRT subtitles, timed to the audio the player serves."""
+    if fmt not in captions.FORMATS:
+        raise Http404("Unknown subtitle format")
+    lecture = get_object_or_404(
+        Lecture.objects.only("title", "segments_file", "segment_count", "time_map"),
+        pk=pk,
+    )
+    if not lecture.segment_count:
+        raise Http404("This lecture has no timestamped transcript")
+
+    # A segment file is never rewritten in place (see Lecture.replace_segments).
+    version = f"{os.path.basename(lecture.segments_file.name)}-{lecture.segment_count}"
+    etag = f'"{fmt}-{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            captions.render(lecture, fmt), content_type=captions.FORMATS[fmt]
+        )
+        response["ETag"] = etag
+        filename = f"{lecture.title[:20].replace(' ', '_')}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+def download_bundle(request, pk):
+    """
+    The offline bundle (audio + timestamped transcript + study guide + manifest)
+    as one zip. The audio rendition is picked like the player's; `?have=id,id`
+    leaves out parts the client already holds (ids come from the manifest).
+    """
+    lecture = get_object_or_404(Lecture, pk=pk)
+    chosen = renditions.choose(list(lecture.renditions.all()), request)
+    rendition = bundle.pick_rendition(lecture, chosen.name if chosen else None)
+    parts = bundle.collect_parts(lecture, rendition)
+    key = bundle.bundle_key(parts)
+    have = set(request.GET.get("have", "").split(",")) & {p.part_id for p in parts}
+
+    filename = f"{lecture.title[:20].replace(' ', '_')}_offline.zip"
+    cached = None if have else bundle.cached_bundle_path(lecture.pk, rendition, key)
+    if cached:
+        # Built before: serve the file itself, resumable with Range requests.
+        response = audio_streaming.ranged_file_response(
+            request, cached, "application/zip", version=key
+        )
+    else:
+        version = bundle.delta_key(key, have)
+        response = get_conditional_response(request, etag=f'"{version}"')
+        if response is None:
+            # Only full bundles are worth keeping on disk.
+            tee_path = None if have else bundle.bundle_path(lecture.pk, rendition, key)
+            response = StreamingHttpResponse(
+                bundle.iter_bundle(lecture, rendition, parts, key, have, tee_path),
+                content_type="application/zip",
+            )
+            response["ETag"] = f'"{version}"'
+        audio_streaming.patch_versioned_cache_control(request, response, version)
+
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return _rendition_response(response)
@@ -0,0 +1,254 @@
+"""
+YouTube ingestion: metadata first, then the smallest sufficient audio stream,
+downloaded resumably.
+
+1. fetch_metadata() asks yt-dlp about the video without downloading it. Videos
+   over LITELEARN_YOUTUBE_MAX_DURATION are rejected here, and callers can dedup
+   by the canonical video ID (VideoInfo.cache_key) before spending any bandwidth.
+2. choose_audio_format() picks the smallest audio-only stream whose bitrate is
+   at least LITELEARN_YOUTUBE_MIN_AUDIO_KBPS. The renditions we make top out
+   far below bestaudio, so downloading more than that is wasted.
+3. download() fetches the stream over HTTP into `<name>.part` and continues
+   from where it stopped with a Range request, both on retries within a call
+   and when a failed job runs again. Streams that are not plain HTTP (HLS,
+   DASH) go through yt-dlp, which resumes its own .part files.
+
+DownloadQueue runs downloads on one asyncio event loop with a semaphore, so a
+batch keeps at most LITELEARN_YOUTUBE_CONCURRENT_DOWNLOADS transfers open, no
+matter how many ingest threads ask for them.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+DIRECT_PROTOCOLS = {"http", "https"}
+_CONTENT_RANGE_RE = re.compile(r"bytes (?:(\d+)-\d+|\*)/(\d+|\*)")
+
+
+class VideoRejected(ValueError):
+    """The video cannot be ingested (too long, no audio). Retrying will not help."""
+
+
+class IncompleteDownload(OSError):
+    pass
+
+
+@dataclass
+class VideoInfo:
+    video_id: str
+    url: str
+    title: str = ""
+    duration: float = 0.0  # seconds, 0 if unknown
+    formats: list = field(default_factory=list)  # yt-dlp format dicts
+
+    @property
+    def cache_key(self):
+        """Dedup cache key (see core/dedup.py); same shape as dedup.source_key."""
+        return f"youtube:{self.video_id}"
+
+
+def fetch_metadata(url):
+    """Video ID, title, duration and available formats, without downloading."""
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"quiet": True, "noplaylist": True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    video = VideoInfo(
+        video_id=info["id"],
+        url=info.get("webpage_url") or url,
+        title=info.get("title") or "Unknown Title",
+        duration=info.get("duration") or 0,
+        formats=info.get("formats") or [],
+    )
+    check(video)
+    return video
+
+
+def check(video):
+    """Raises VideoRejected for videos we will not process."""
+    limit = settings.LITELEARN_YOUTUBE_MAX_DURATION
+    if limit and video.duration > limit:
+        raise VideoRejected(
+            f"{video.url} is {video.duration / 60:.0f} minutes long; "
+            f"the limit is {limit / 60:.0f} minutes."
+        )
+
+
+def _kbps(fmt):
+    return fmt.get("abr") or fmt.get("tbr") or 0
+
+
+def _estimated_size(fmt, duration):
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return size
+    if _kbps(fmt) and duration:
+        return _kbps(fmt) * 1000 / 8 * duration
+    return float("inf")
+
+
+def choose_audio_format(formats, duration=0, min_kbps=None):
+    """
+    The smallest audio-only format of at least min_kbps (default
+    LITELEARN_YOUTUBE_MIN_AUDIO_KBPS). If every audio-only format is below
+    that, the best of them; with no audio-only formats, the smallest with audio.
+    """
+    if min_kbps is None:
+        min_kbps = settings.LITELEARN_YOUTUBE_MIN_AUDIO_KBPS
+    with_audio = [f for f in formats if f.get("acodec") not in (None, "none")]
+    audio_only = [f for f in with_audio if f.get("vcodec") == "none"]
+    if not with_audio:
+        raise VideoRejected("The video has no audio stream.")
+    if not audio_only:
+        return min(with_audio, key=lambda f: _estimated_size(f, duration))
+
+    # An unknown bitrate counts as sufficient; its size estimate sorts it last.
+    sufficient = [f for f in audio_only if not _kbps(f) or _kbps(f) >= min_kbps]
+    if sufficient:
+        return min(sufficient, key=lambda f: (_estimated_size(f, duration), _kbps(f)))
+    return max(audio_only, key=_kbps)
+
+
+def _range_start(content_range):
+    match = _CONTENT_RANGE_RE.match(content_range or "")
+    return int(match.group(1)) if match and match.group(1) is not None else None
+
+
+def download(url, path, headers=None, retries=None):
+    """
+    Downloads `url` to `path` through `path.part`, resuming an existing .part
+    file. Retries with a growing pause; returns path.
+    """
+    if retries is None:
+        retries = settings.LITELEARN_YOUTUBE_DOWNLOAD_RETRIES
+    part_path = f"{path}.part"
+
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request = urllib.request.Request(url, headers=dict(headers or {}))
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                if offset and response.status != 206:
+                    offset = 0  # the server ignored Range; start over
+                elif offset and _range_start(response.headers.get("Content-Range")) != offset:
+                    os.remove(part_path)
+                    raise IncompleteDownload("server resumed at the wrong offset")
+                length = response.headers.get("Content-Length")
+                expected = offset + int(length) if length is not None else None
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                        f.write(chunk)
+            received = os.path.getsize(part_path)
+            if expected is not None and received < expected:
+                raise IncompleteDownload(f"got {received} of {expected} bytes")
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # Nothing left past our offset: done if the .part is the whole file.
+                match = _CONTENT_RANGE_RE.match(e.headers.get("Content-Range") or "")
+                if match and match.group(2) == str(offset):
+                    break
+                os.remove(part_path)
+            if attempt == retries or e.code in (403, 404, 410):
+                raise
+            logger.warning("Download of %s failed (%s), retrying.", path, e)
+        except (OSError, urllib.error.URLError) as e:
+            if attempt == retries:
+                raise
+            logger.warning("Download of %s interrupted (%s), resuming.", path, e)
+        else:
+            break
+        time.sleep(min(2**attempt, 30))
+
+    os.replace(part_path, path)
+    return path
+
+
+def download_audio(video, output_dir):
+    """
+    Downloads the chosen audio stream of `video` into output_dir and returns
+    its path. The name depends only on the video and format, so a later
+    attempt finds (and resumes) the file an earlier one left behind.
+    """
+    fmt = choose_audio_format(video.formats, video.duration)
+    path = os.path.join(
+        output_dir, f"yt_{video.video_id}_{fmt['format_id']}.{fmt.get('ext') or 'audio'}"
+    )
+    if os.path.exists(path):
+        return path
+
+    logger.info(
+        "Downloading %s audio: format %s (%s, %.0f kbps)",
+        video.video_id,
+        fmt["format_id"],
+        fmt.get("acodec"),
+        _kbps(fmt),
+    )
+    if fmt.get("protocol", "https") in DIRECT_PROTOCOLS and fmt.get("url"):
+        return download(fmt["url"], path, fmt.get("http_headers"))
+
+    import yt_dlp
+
+    options = {
+        "format": fmt["format_id"],
+        "outtmpl": path,
+        "quiet": True,
+        "continuedl": True,
+        "retries": settings.LITELEARN_YOUTUBE_DOWNLOAD_RETRIES,
+    }
+    with yt_dlp.YoutubeDL(options) as ydl:
+        ydl.download([video.url])
+    return path
+
+
+class DownloadQueue:
+    """
+    Runs downloads on an asyncio event loop in a background thread, at most
+    `concurrency` at a time. Use as a context manager; download() blocks the
+    calling thread until its transfer is done.
+    """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or settings.LITELEARN_YOUTUBE_CONCURRENT_DOWNLOADS
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="youtube-downloads", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def download_async(self, video, output_dir):
+        async with self._semaphore:
+            return await asyncio.to_thread(download_audio, video, output_dir)
+
+    def download(self, video, output_dir):
+        """Same contract as download_audio()."""
+        future = asyncio.run_coroutine_threadsafe(
+            self.download_async(video, output_dir), self._loop
+        )
+        return future.result()
+